@@ -1,12 +1,17 @@
-import streamlit as st
-import pandas as pd
+import time
+_RUN_STARTED = time.perf_counter()
+
+import math
 import os
+import re
+
+import streamlit as st
 
 # --- CONFIGURAÇÃO VISUAL ---
 st.set_page_config(page_title="NB Tech | Pricing Core", layout="wide", page_icon="⚡")
 
 # CSS BLINDADO E REFORÇADO PARA BOTÕES +/-
-st.markdown("""
+APP_CSS = """
     <style>
     /* 1. FUNDO GERAL */
     .stApp { background-color: #FFFFFF; }
@@ -99,21 +104,149 @@ st.markdown("""
         fill: #FFFFFF !important; /* Branco */
     }
     </style>
-""", unsafe_allow_html=True)
+"""
+
+# --- MEDIÇÃO DE TEMPO (relatório no fim da barra lateral) ---
+_TIMINGS = []
+
+def mark(label):
+    _TIMINGS.append((label, time.perf_counter()))
+
+@st.cache_resource(show_spinner=False)
+def process_stats():
+    # Compartilhado entre sessões: permite distinguir a 1ª execução do processo (cold start)
+    return {"runs": 0}
+
+@st.cache_resource(show_spinner=False)
+def minified_css():
+    # Remove comentários e espaços uma única vez por processo
+    css = re.sub(r"/\*.*?\*/", "", APP_CSS, flags=re.S)
+    return re.sub(r"\s+", " ", css).strip()
 
-# Importações
-try:
-    from src.models import ProductInput, CustomerContext, PricingScenario, ServiceInput
+st.markdown(minified_css(), unsafe_allow_html=True)
+mark("Inicialização e CSS")
+
+# --- CARREGAMENTO SOB DEMANDA (cada página importa só o que usa) ---
+@st.cache_resource(show_spinner=False)
+def load_product_modules():
+    from src.models import ProductInput, CustomerContext, PricingScenario
     from src.pricing_engine import ProductPricer
+    from config.tax_rates import TaxConstants
+    from config.ncm_rates import get_ncm_rates
+    return ProductInput, CustomerContext, PricingScenario, ProductPricer, TaxConstants, get_ncm_rates
+
+@st.cache_resource(show_spinner=False)
+def load_service_modules():
+    from src.models import ServiceInput, PricingScenario
     from src.service_engine import ServicePricer
+    return ServiceInput, PricingScenario, ServicePricer
+
+@st.cache_resource(show_spinner=False)
+def load_cash_flow_engine():
+    from src.cash_flow import ContractCashFlow, DEFAULT_DISCOUNT_RATE
+    return ContractCashFlow, DEFAULT_DISCOUNT_RATE
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def contract_cash_flow(service, target_margin):
+    # Indicadores e curva do contrato; recalculados só quando a entrada muda
+    from src.models import ServiceInput, PricingScenario
+    ContractCashFlow, DEFAULT_DISCOUNT_RATE = load_cash_flow_engine()
+    cash_flow = ContractCashFlow(PricingScenario(target_margin=target_margin), DEFAULT_DISCOUNT_RATE)
+    indicators = cash_flow.evaluate([service], validate=False).iloc[0].to_dict()
+    statement = cash_flow.statement(ServiceInput(**service))[["cumulative", "discounted_cumulative"]]
+    # Formato longo para o gráfico Vega-Lite (CASH_FLOW_CHART)
+    curve = statement.reset_index().melt("month", var_name="Caixa", value_name="R$")
+    return indicators, curve
+
+@st.cache_resource(show_spinner=False)
+def quote_history():
+    from src.quote_store import QUOTE_HISTORY
+    from src.quote_cache import QuoteCache
+    return QUOTE_HISTORY, QuoteCache.make_key
+
+@st.cache_resource(show_spinner=False)
+def route_planner():
+    # Uma instância por processo: matriz de distâncias e roteiros ficam em cache entre sessões
+    from src.logistics import RoutePlanner
+    return RoutePlanner()
+
+@st.cache_resource(show_spinner=False)
+def load_export_modules():
+    from src.models import PricingScenario
+    from src.price_list_export import PriceListExporter, read_catalog, CUSTOMER_LABELS
     from config.tax_rates import TaxConstants
-except ImportError as e:
-    st.error(f"Erro de Importação: {e}. Verifique arquivos.")
-    st.stop()
+    return PricingScenario, PriceListExporter, read_catalog, CUSTOMER_LABELS, TaxConstants
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def load_uploaded_catalog(content, suffix):
+    # O catálogo é pequeno (a tabela de preços é que multiplica as linhas); lido uma vez por arquivo
+    import tempfile
+    _, _, read_catalog, _, _ = load_export_modules()
+    with tempfile.NamedTemporaryFile(suffix=suffix) as handle:
+        handle.write(content)
+        handle.flush()
+        return read_catalog(handle.name)
+
+@st.cache_data(show_spinner=False)
+def load_official_tables():
+    import pandas as pd
+    df_lab = pd.DataFrame([
+        {"Produto": "Shortbreak até 1kVA", "Troca Bateria": "R$ 75,00", "Com Reparo": "R$ 90,00"},
+        {"Produto": "Shortbreak > 1kVA", "Troca Bateria": "R$ 90,00", "Com Reparo": "R$ 250,00"},
+        {"Produto": "Shortbreak até 1kVA (Senoidal)", "Troca Bateria": "R$ 90,00", "Com Reparo": "R$ 150,00"},
+        {"Produto": "Shortbreak > 1kVA (Senoidal)", "Troca Bateria": "R$ 120,00", "Com Reparo": "R$ 360,00"},
+        {"Produto": "Dupla Conv. até 3kVA", "Troca Bateria": "R$ 150,00", "Com Reparo": "R$ 750,00"},
+        {"Produto": "Dupla Conv. 5-10kVA", "Troca Bateria": "R$ 350,00", "Com Reparo": "R$ 1.600,00"},
+        {"Produto": "Dupla Conv. > 10kVA", "Troca Bateria": "R$ 550,00", "Com Reparo": "R$ 2.200,00"},
+        {"Produto": "Estabilizador até 3kVA", "Troca Bateria": "-", "Com Reparo": "R$ 90,00"}
+    ])
+    df_onsite = pd.DataFrame([
+        {"Nobreak": "Até 3kVA", "Preventiva": "R$ 220,00", "Corretiva": "R$ 280,00"},
+        {"Nobreak": "3.1 a 6kVA (Mono)", "Preventiva": "R$ 380,00", "Corretiva": "R$ 460,00"},
+        {"Nobreak": "6.1 a 10kVA (Mono)", "Preventiva": "R$ 450,00", "Corretiva": "R$ 540,00"},
+        {"Nobreak": "10.1 a 20kVA (Mono)", "Preventiva": "R$ 600,00", "Corretiva": "R$ 720,00"},
+        {"Nobreak": "Trifásico até 10kVA", "Preventiva": "R$ 550,00", "Corretiva": "R$ 660,00"},
+        {"Nobreak": "Trifásico 10-20kVA", "Preventiva": "R$ 650,00", "Corretiva": "R$ 780,00"},
+        {"Nobreak": "Trifásico 20-40kVA", "Preventiva": "R$ 900,00", "Corretiva": "R$ 1.100,00"},
+        {"Nobreak": "Trifásico 40-80kVA", "Preventiva": "R$ 1.400,00", "Corretiva": "R$ 1.680,00"}
+    ])
+    return df_lab, df_onsite
+
+def require(loader):
+    try:
+        return loader()
+    except ImportError as e:
+        st.error(f"Erro de Importação: {e}. Verifique arquivos.")
+        st.stop()
+
+def record_quote(kind, models, append, tax_table_version=None):
+    # Histórico: toda cotação exibida é gravada, uma vez por sessão (reruns do fragmento com o mesmo valor não duplicam)
+    history, make_key = quote_history()
+    if not history.enabled:
+        return
+    key = make_key(kind, *models, tax_table_version=tax_table_version)
+    recorded = st.session_state.setdefault("recorded_quotes", set())
+    if key not in recorded:
+        append(history)
+        recorded.add(key)
+
+def latency_readout(section, started, pricing_ms):
+    # Reexecuções do fragmento não passam pelo relatório da barra lateral: a latência fica junto do resultado
+    count = st.session_state[f"recalc_{section}"] = st.session_state.get(f"recalc_{section}", 0) + 1
+    st.caption(f"⏱️ Recálculo nº {count}: cálculo {pricing_ms:.1f} ms | seção {(time.perf_counter() - started) * 1000:.1f} ms")
 
 # --- OPÇÕES PADRÃO ---
-IPI_OPTIONS = {"Nobreak (9.75%)": 0.0975, "Bateria (15.00%)": 0.15, "Placas (5.00%)": 0.05, "Isento (0.00%)": 0.00, "Outros (Manual)": -1}
-MVA_OPTIONS = {"Nobreak (46%)": 0.46, "Placas (58%)": 0.58, "Bateria (S/ ST)": 0.00, "Outros (Manual)": -1}
+IPI_OPTIONS = {"Pela NCM (automático)": None, "Nobreak (9.75%)": 0.0975, "Bateria (15.00%)": 0.15, "Placas (5.00%)": 0.05, "Isento (0.00%)": 0.00, "Outros (Manual)": -1}
+MVA_OPTIONS = {"Pela NCM (automático)": None, "Nobreak (46%)": 0.46, "Placas (58%)": 0.58, "Bateria (S/ ST)": 0.00, "Outros (Manual)": -1}
+# Especificação fixa do gráfico de caixa acumulado: st.line_chart remonta o gráfico Altair a cada recálculo (~80 ms)
+CASH_FLOW_CHART = {
+    "mark": {"type": "line"},
+    "encoding": {
+        "x": {"field": "month", "type": "quantitative", "title": "Mês"},
+        "y": {"field": "R$", "type": "quantitative"},
+        "color": {"field": "Caixa", "type": "nominal"},
+    },
+}
 
 # --- CABEÇALHO ---
 col_logo, col_title = st.columns([1, 6])
@@ -126,150 +259,258 @@ with col_title:
 
 # --- MENU ---
 st.sidebar.header("NAVEGAÇÃO")
-page = st.sidebar.radio("Selecione a Ferramenta:", ["Precificador de Produtos", "Precificador de Serviços (Pontual)", "Precificador de Contratos (Recorrência)", "Tabelas Oficiais"])
+page = st.sidebar.radio("Selecione a Ferramenta:", ["Precificador de Produtos", "Precificador de Serviços (Pontual)", "Precificador de Contratos (Recorrência)", "Tabela de Preços (Exportar)", "Tabelas Oficiais"])
 st.sidebar.markdown("---")
 st.sidebar.info("NB Tech Pricing Core")
+mark("Cabeçalho e menu")
 
 # =========================================================
 # 1. PRODUTOS (HARDWARE)
 # =========================================================
 if page == "Precificador de Produtos":
+    ProductInput, CustomerContext, PricingScenario, ProductPricer, TaxConstants, get_ncm_rates = require(load_product_modules)
     st.header("📦 Precificador de Produtos")
     st.markdown("Cálculo de revenda com automação de ICMS por Estado.")
-    
-    col1, col2 = st.columns(2)
-    with col1:
-        st.subheader("Dados do Produto")
-        prod_name = st.text_input("Descrição", "Nobreak 3kVA Online")
-        ncm_code = st.text_input("NCM", "8504.40.40")
-        cost_price = st.number_input("Custo de Aquisição (R$)", value=1000.00, step=10.0)
-        
-        c1, c2 = st.columns(2)
-        ipi_sel = c1.selectbox("Selecione IPI", list(IPI_OPTIONS.keys()))
-        ipi_rate = c1.number_input("Digite IPI (%)", value=0.0)/100 if ipi_sel == "Outros (Manual)" else IPI_OPTIONS[ipi_sel]
-
-        mva_sel = c2.selectbox("Selecione MVA ST", list(MVA_OPTIONS.keys()))
-        mva_st = c2.number_input("Digite MVA (%)", value=0.0)/100 if mva_sel == "Outros (Manual)" else MVA_OPTIONS[mva_sel]
-
-        origin_uf = st.selectbox("UF Origem", TaxConstants.ESTADOS, index=TaxConstants.ESTADOS.index("SP"))
-
-    with col2:
-        st.subheader("Dados da Venda")
-        dest_uf = st.selectbox("UF Destino", TaxConstants.ESTADOS, index=TaxConstants.ESTADOS.index("BA"))
-        
-        icms_real_state = TaxConstants.ICMS_INTERNO_ESTADOS.get(dest_uf, 0.18)
-        
-        icms_dest = st.number_input(
-            f"ICMS Interno {dest_uf} (%)", 
-            value=float(icms_real_state * 100), 
-            step=0.5,
-            help="Alíquota interna padrão de 2025/2026."
-        ) / 100
-        
-        client_type = st.radio("Tipo Cliente", ["Contribuinte", "Nao_Contribuinte"])
-        target_margin = st.slider("Margem Líquida (%)", 5, 50, 25) / 100
-
-    if st.button("CALCULAR VENDA"):
-        prod = ProductInput(name=prod_name, ncm=ncm_code, cost_price=cost_price, ipi_rate=ipi_rate, mva_st=mva_st, origin_uf=origin_uf)
-        cli = CustomerContext(uf=dest_uf, type=client_type, internal_icms_dest=icms_dest)
-        cen = PricingScenario(target_margin=target_margin)
-        
-        engine = ProductPricer(prod, cli, cen)
-        res = engine.calculate_selling_price()
-        
+
+    @st.fragment
+    def product_quote():
+        started = time.perf_counter()
+        col1, col2 = st.columns(2)
+        with col1:
+            st.subheader("Dados do Produto")
+            prod_name = st.text_input("Descrição", "Nobreak 3kVA Online")
+            ncm_code = st.text_input("NCM", "8504.40.40")
+            cost_price = st.number_input("Custo de Aquisição (R$)", value=1000.00, step=10.0)
+
+            c1, c2 = st.columns(2)
+            ipi_sel = c1.selectbox("Selecione IPI", list(IPI_OPTIONS.keys()))
+            ipi_rate = c1.number_input("Digite IPI (%)", value=0.0)/100 if ipi_sel == "Outros (Manual)" else IPI_OPTIONS[ipi_sel]
+
+            mva_sel = c2.selectbox("Selecione MVA ST", list(MVA_OPTIONS.keys()))
+            mva_st = c2.number_input("Digite MVA (%)", value=0.0)/100 if mva_sel == "Outros (Manual)" else MVA_OPTIONS[mva_sel]
+
+            if ipi_rate is None or mva_st is None:
+                ncm_rates = get_ncm_rates().rates_for(ncm_code)
+                st.caption(f"Tabela NCM {ncm_code}: IPI {ncm_rates['ipi_rate']*100:.2f}% | MVA {ncm_rates['mva_st']*100:.0f}%")
+
+            origin_uf = st.selectbox("UF Origem", TaxConstants.ESTADOS, index=TaxConstants.ESTADOS.index("SP"))
+
+        with col2:
+            st.subheader("Dados da Venda")
+            dest_uf = st.selectbox("UF Destino", TaxConstants.ESTADOS, index=TaxConstants.ESTADOS.index("BA"))
+
+            icms_real_state = TaxConstants.ICMS_INTERNO_ESTADOS.get(dest_uf, 0.18)
+
+            icms_dest = st.number_input(
+                f"ICMS Interno {dest_uf} (%)",
+                value=float(icms_real_state * 100),
+                step=0.5,
+                help="Alíquota interna padrão de 2025/2026."
+            ) / 100
+
+            client_type = st.radio("Tipo Cliente", ["Contribuinte", "Nao_Contribuinte"])
+            target_margin = st.slider("Margem Líquida (%)", 5, 50, 25) / 100
+
+        # Recalcula a cada ajuste (só este fragmento reexecuta); o histórico é gravado em record_quote
+        calc_started = time.perf_counter()
+        try:
+            prod = ProductInput(name=prod_name, ncm=ncm_code, cost_price=cost_price, ipi_rate=ipi_rate, mva_st=mva_st, origin_uf=origin_uf)
+            cli = CustomerContext(uf=dest_uf, type=client_type, internal_icms_dest=icms_dest)
+            cen = PricingScenario(target_margin=target_margin)
+            engine = ProductPricer(prod, cli, cen)
+            res = engine.calculate_selling_price(record=False)
+        except ValueError as e:
+            st.error(str(e))
+            return
+        pricing_ms = (time.perf_counter() - calc_started) * 1000
+
         st.divider()
-        k1, k2, k3 = st.columns(3)
+        k1, k2, k3, k4 = st.columns(4)
         k1.metric("Preço Sugerido", f"R$ {res['selling_price_suggested']:,.2f}")
-        k2.metric("Lucro Líquido", f"R$ {res['financials']['net_profit']:,.2f}")
-        k3.metric("Margem Real", f"{res['financials']['net_margin_pct']}%")
-        
+        k2.metric("DIFAL", f"R$ {res['taxes']['difal']:,.2f}")
+        k3.metric("Lucro Líquido", f"R$ {res['financials']['net_profit']:,.2f}")
+        k4.metric("Margem Real", f"{res['financials']['net_margin_pct']}%")
+
         with st.expander("Ver Detalhes dos Impostos (DIFAL/ST)"):
             st.write("Valores em Reais (R$):")
             st.json(res['taxes'])
 
+        record_quote("product", (prod, cli, cen),
+                     lambda history: history.products.append_quote(prod, cli, cen, res, engine.tax_table.version),
+                     engine.tax_table.version)
+        latency_readout("product_quote", started, pricing_ms)
+
+    product_quote()
+
 # =========================================================
 # 2. SERVIÇOS PONTUAIS
 # =========================================================
 elif page == "Precificador de Serviços (Pontual)":
+    ServiceInput, PricingScenario, ServicePricer = require(load_service_modules)
     st.header("🛠️ Precificador de Serviços (Avulsos)")
-    col1, col2 = st.columns(2)
-    with col1:
-        ups_type = st.selectbox("Equipamento", ["Monofásico (Até 3kVA)", "Monofásico (3-10kVA)", "Trifásico (10-40kVA)", "Trifásico (>40kVA)"])
-        hours = st.number_input("Horas Técnicas", value=2.0)
-        km = st.number_input("Distância Total (KM)", value=50.0)
-    with col2:
-        margin = st.slider("Margem Alvo (%)", 10, 60, 35) / 100
-    if st.button("CALCULAR SERVIÇO"):
-        srv = ServiceInput(service_type="Serviço Pontual (Avulso)", ups_power=ups_type, ups_type=ups_type, technical_hours_per_visit=hours, distance_km_round_trip=km, contract_duration_months=1, visits_per_year=1)
-        cen = PricingScenario(target_margin=margin)
-        res = ServicePricer(srv, cen).calculate_contract_price()
+
+    @st.fragment
+    def service_quote():
+        started = time.perf_counter()
+        col1, col2 = st.columns(2)
+        with col1:
+            ups_type = st.selectbox("Equipamento", ["Monofásico (Até 3kVA)", "Monofásico (3-10kVA)", "Trifásico (10-40kVA)", "Trifásico (>40kVA)"])
+            hours = st.number_input("Horas Técnicas", value=2.0)
+            km = st.number_input("Distância Total (KM)", value=50.0)
+        with col2:
+            margin = st.slider("Margem Alvo (%)", 10, 60, 35) / 100
+
+        calc_started = time.perf_counter()
+        try:
+            srv = ServiceInput(service_type="Serviço Pontual (Avulso)", ups_power=ups_type, ups_type=ups_type, technical_hours_per_visit=hours, distance_km_round_trip=km, contract_duration_months=1, visits_per_year=1)
+            cen = PricingScenario(target_margin=margin)
+            res = ServicePricer(srv, cen).calculate_contract_price(record=False)
+        except ValueError as e:
+            st.error(str(e))
+            return
+        pricing_ms = (time.perf_counter() - calc_started) * 1000
+
         st.success(f"Valor do Serviço: R$ {res['monthly_price']:,.2f}")
         st.json(res['breakdown'])
 
+        record_quote("service", (srv, cen), lambda history: history.services.append_quote(srv, cen, res))
+        latency_readout("service_quote", started, pricing_ms)
+
+    service_quote()
+
 # =========================================================
 # 3. CONTRATOS
 # =========================================================
 elif page == "Precificador de Contratos (Recorrência)":
+    ServiceInput, PricingScenario, ServicePricer = require(load_service_modules)
     st.header("📜 Precificador de Contratos")
-    c1, c2 = st.columns(2)
-    with c1: contract_type = st.selectbox("Modalidade", ["Contrato Manutenção (Preventiva + Corretiva)", "Locação (UPS Estoque)", "Locação (Compra UPS Nova)"])
-    with c2: months = st.slider("Vigência (Meses)", 1, 48, 24)
-    st.divider()
-    col_a, col_b, col_c, col_d = st.columns(4)
-    qty_ups = col_a.number_input("Qtd. Equipamentos", min_value=1, value=1)
-    qty_locais = col_b.number_input("Qtd. de Locais", min_value=1, value=1)
-    ups_power = col_c.selectbox("Potência", ["1-3 kVA", "3-6 kVA", "6-10 kVA", "10-20 kVA", "20-80 kVA"])
-    ups_tech = col_d.selectbox("Tecnologia", ["Shortbreak", "Senoidal", "Dupla Conversão"])
-    st.subheader("Custos Operacionais")
-    c_op1, c_op2, c_op3 = st.columns(3)
-    hours_unit = c_op1.number_input("Horas Técnicas (por Máq/Visita)", value=1.0, step=0.5)
-    km_total = c_op2.number_input("KM Total (Ida/Volta Roteiro)", value=40.0)
-    visits_year = c_op3.number_input("Visitas no ANO (Total)", value=12)
-    capex = 0.0
-    parts = 0.0
-    if "Locação" in contract_type: capex = st.number_input("Valor Unitário Compra UPS (R$)", value=5000.00)
-    parts = st.number_input("Estimativa Peças (R$/Mês/Máq)", value=0.0)
-    margin = st.slider("Margem Desejada (%)", 10, 50, 30) / 100
-    if st.button("CALCULAR MENSALIDADE TOTAL", type="primary"):
-        srv_input = ServiceInput(service_type=contract_type, ups_power=ups_power, ups_type=ups_tech, ups_quantity=qty_ups, num_locations=qty_locais, visits_per_year=visits_year, technical_hours_per_visit=hours_unit, distance_km_round_trip=km_total, equipment_capex_unit=capex, contract_duration_months=months, parts_cost_estimation_monthly=parts)
-        cenario = PricingScenario(target_margin=margin)
-        res = ServicePricer(srv_input, cenario).calculate_contract_price()
+
+    @st.fragment
+    def contract_quote():
+        started = time.perf_counter()
+        c1, c2 = st.columns(2)
+        with c1: contract_type = st.selectbox("Modalidade", ["Contrato Manutenção (Preventiva + Corretiva)", "Locação (UPS Estoque)", "Locação (Compra UPS Nova)"])
+        with c2: months = st.slider("Vigência (Meses)", 1, 48, 24)
+        st.divider()
+        col_a, col_b, col_c, col_d = st.columns(4)
+        qty_ups = col_a.number_input("Qtd. Equipamentos", min_value=1, value=1)
+        qty_locais = col_b.number_input("Qtd. de Locais", min_value=1, value=1)
+        ups_power = col_c.selectbox("Potência", ["1-3 kVA", "3-6 kVA", "6-10 kVA", "10-20 kVA", "20-80 kVA"])
+        ups_tech = col_d.selectbox("Tecnologia", ["Shortbreak", "Senoidal", "Dupla Conversão"])
+        st.subheader("Custos Operacionais")
+        c_op1, c_op2, c_op3 = st.columns(3)
+        hours_unit = c_op1.number_input("Horas Técnicas (por Máq/Visita)", value=1.0, step=0.5)
+        km_total = c_op2.number_input("KM Total (Ida/Volta Roteiro)", value=40.0)
+        visits_year = c_op3.number_input("Visitas no ANO (Total)", value=12)
+        sites = st.text_input("Unidades Atendidas (opcional)", "", help="Locais da tabela de coordenadas separados por ';' (ex.: RJ;MG;ES). Preenchido, o roteiro a partir da base substitui KM x Locais.")
+        capex = 0.0
+        parts = 0.0
+        if "Locação" in contract_type: capex = st.number_input("Valor Unitário Compra UPS (R$)", value=5000.00)
+        parts = st.number_input("Estimativa Peças (R$/Mês/Máq)", value=0.0)
+        margin = st.slider("Margem Desejada (%)", 10, 50, 30) / 100
+
+        calc_started = time.perf_counter()
+        try:
+            srv_input = ServiceInput(service_type=contract_type, ups_power=ups_power, ups_type=ups_tech, ups_quantity=qty_ups, num_locations=qty_locais, visits_per_year=visits_year, technical_hours_per_visit=hours_unit, distance_km_round_trip=km_total, equipment_capex_unit=capex, contract_duration_months=months, parts_cost_estimation_monthly=parts)
+            cenario = PricingScenario(target_margin=margin)
+            plan = None
+            if sites.strip():
+                # Roteiro em cache no RoutePlanner: redigitar os mesmos locais não recalcula
+                plan = route_planner().plan(sites)
+                srv_input = route_planner().apply(srv_input, sites)
+            res = ServicePricer(srv_input, cenario).calculate_contract_price(record=False)
+        except ValueError as e:
+            st.error(str(e))
+            return
+        pricing_ms = (time.perf_counter() - calc_started) * 1000
+
+        if plan:
+            st.caption(f"Roteiro: {' → '.join(plan['route'])} | {plan['km_round_trip']:,.1f} km por visita")
         st.divider()
         col_res1, col_res2, col_res3 = st.columns(3)
         col_res1.metric("Mensalidade TOTAL", f"R$ {res['monthly_price']:,.2f}")
         col_res2.metric("Valor por Máquina", f"R$ {res['monthly_price']/qty_ups:,.2f}")
         col_res3.metric("Valor Global Contrato", f"R$ {res['total_contract_value']:,.2f}")
         st.bar_chart(res['breakdown'])
+        with st.expander("Fluxo de Caixa (VPL / TIR / Payback)", expanded="Compra UPS Nova" in contract_type):
+            _, DEFAULT_DISCOUNT_RATE = require(load_cash_flow_engine)
+            indicators, curve = contract_cash_flow(srv_input.model_dump(), margin)
+            f1, f2, f3 = st.columns(3)
+            f1.metric(f"VPL ({DEFAULT_DISCOUNT_RATE*100:.0f}% a.a.)", f"R$ {indicators['npv']:,.2f}")
+            f2.metric("TIR", "-" if math.isnan(indicators['irr_annual_pct']) else f"{indicators['irr_annual_pct']:.1f}% a.a.")
+            f3.metric("Payback", "-" if math.isnan(indicators['payback_months']) else f"{indicators['payback_months']:.0f} meses")
+            st.vega_lite_chart(curve, CASH_FLOW_CHART, width="stretch")
+
+        record_quote("service", (srv_input, cenario), lambda history: history.services.append_quote(srv_input, cenario, res))
+        latency_readout("contract_quote", started, pricing_ms)
+
+    contract_quote()
 
 # =========================================================
-# 4. TABELAS (COMPLETAS)
+# 4. TABELA DE PREÇOS (EXPORTAÇÃO XLSX)
+# =========================================================
+elif page == "Tabela de Preços (Exportar)":
+    PricingScenario, PriceListExporter, read_catalog, CUSTOMER_LABELS, TaxConstants = require(load_export_modules)
+    st.header("📑 Tabela de Preços por UF")
+    st.markdown("Catálogo (CSV/XLSX com colunas name, ncm, cost_price e opcionalmente origin_uf, ipi_rate, mva_st) precificado para cada UF de destino, uma aba por UF.")
+
+    @st.fragment
+    def price_list_export():
+        upload = st.file_uploader("Catálogo", type=["csv", "xlsx"])
+        c1, c2 = st.columns(2)
+        ufs = c1.multiselect("UFs de Destino", TaxConstants.ESTADOS, default=TaxConstants.ESTADOS)
+        types = c2.multiselect("Tipos de Cliente", list(CUSTOMER_LABELS), default=list(CUSTOMER_LABELS), format_func=CUSTOMER_LABELS.get)
+        margin = st.slider("Margem Líquida (%)", 5, 50, 25) / 100
+
+        if upload is not None and ufs and types:
+            catalog = load_uploaded_catalog(upload.getvalue(), os.path.splitext(upload.name)[1].lower())
+            exporter = PriceListExporter(PricingScenario(target_margin=margin), dest_ufs=ufs, customer_types=types)
+            try:
+                exporter.prepare(catalog)
+            except ValueError as e:
+                st.error(f"Catálogo inválido: {e}")
+                return
+            st.caption(f"{len(catalog)} produtos x {len(ufs)} UFs x {len(types)} tipos = {len(catalog) * len(ufs) * len(types):,} preços")
+
+            def build_price_list():
+                # Gerada só no clique (em outra thread), direto para arquivo temporário: em memória fica só o XLSX compactado
+                import tempfile
+                handle = tempfile.TemporaryFile()
+                exporter.write(catalog, handle)
+                handle.seek(0)
+                return handle
+
+            st.download_button("BAIXAR TABELA (XLSX)", data=build_price_list, file_name="tabela_precos.xlsx",
+                               mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", type="primary")
+
+    price_list_export()
+
+# =========================================================
+# 5. TABELAS (COMPLETAS)
 # =========================================================
 elif page == "Tabelas Oficiais":
     st.header("📋 Tabelas Oficiais - Jan/2026")
+    df_lab, df_onsite = load_official_tables()
     tab_lab, tab_onsite = st.tabs(["Laboratório (Balcão)", "On-Site (Visita)"])
     with tab_lab:
         st.subheader("Manutenção em Laboratório")
-        df_lab = pd.DataFrame([
-            {"Produto": "Shortbreak até 1kVA", "Troca Bateria": "R$ 75,00", "Com Reparo": "R$ 90,00"},
-            {"Produto": "Shortbreak > 1kVA", "Troca Bateria": "R$ 90,00", "Com Reparo": "R$ 250,00"},
-            {"Produto": "Shortbreak até 1kVA (Senoidal)", "Troca Bateria": "R$ 90,00", "Com Reparo": "R$ 150,00"},
-            {"Produto": "Shortbreak > 1kVA (Senoidal)", "Troca Bateria": "R$ 120,00", "Com Reparo": "R$ 360,00"},
-            {"Produto": "Dupla Conv. até 3kVA", "Troca Bateria": "R$ 150,00", "Com Reparo": "R$ 750,00"},
-            {"Produto": "Dupla Conv. 5-10kVA", "Troca Bateria": "R$ 350,00", "Com Reparo": "R$ 1.600,00"},
-            {"Produto": "Dupla Conv. > 10kVA", "Troca Bateria": "R$ 550,00", "Com Reparo": "R$ 2.200,00"},
-            {"Produto": "Estabilizador até 3kVA", "Troca Bateria": "-", "Com Reparo": "R$ 90,00"}
-        ])
         st.table(df_lab)
     with tab_onsite:
         st.subheader("Atendimento On-Site (Comercial)")
-        df_onsite = pd.DataFrame([
-            {"Nobreak": "Até 3kVA", "Preventiva": "R$ 220,00", "Corretiva": "R$ 280,00"},
-            {"Nobreak": "3.1 a 6kVA (Mono)", "Preventiva": "R$ 380,00", "Corretiva": "R$ 460,00"},
-            {"Nobreak": "6.1 a 10kVA (Mono)", "Preventiva": "R$ 450,00", "Corretiva": "R$ 540,00"},
-            {"Nobreak": "10.1 a 20kVA (Mono)", "Preventiva": "R$ 600,00", "Corretiva": "R$ 720,00"},
-            {"Nobreak": "Trifásico até 10kVA", "Preventiva": "R$ 550,00", "Corretiva": "R$ 660,00"},
-            {"Nobreak": "Trifásico 10-20kVA", "Preventiva": "R$ 650,00", "Corretiva": "R$ 780,00"},
-            {"Nobreak": "Trifásico 20-40kVA", "Preventiva": "R$ 900,00", "Corretiva": "R$ 1.100,00"},
-            {"Nobreak": "Trifásico 40-80kVA", "Preventiva": "R$ 1.400,00", "Corretiva": "R$ 1.680,00"}
-        ])
         st.table(df_onsite)
+
+mark("Página")
+
+# =========================================================
+# RELATÓRIO DE DESEMPENHO
+# =========================================================
+stats = process_stats()
+stats["runs"] += 1
+st.session_state["perf_runs"] = st.session_state.get("perf_runs", 0) + 1
+run_kind = "cold start do processo" if stats["runs"] == 1 else ("1ª execução da sessão" if st.session_state["perf_runs"] == 1 else "rerun")
+with st.sidebar.expander("⏱️ Desempenho"):
+    previous = _RUN_STARTED
+    for label, instant in _TIMINGS:
+        st.caption(f"{label}: {(instant - previous) * 1000:.1f} ms")
+        previous = instant
+    st.caption(f"Total ({run_kind}): {(time.perf_counter() - _RUN_STARTED) * 1000:.1f} ms")
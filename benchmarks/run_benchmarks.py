@@ -0,0 +1,256 @@
+# benchmarks/run_benchmarks.py
+"""
+Benchmarks dos motores de precificação (TaxEngine, ProductPricer, ServicePricer).
+
+Roda offline, com dados sintéticos e semente fixa. Cada benchmark reporta a
+mediana de várias repetições. Com --save-baseline grava os tempos em JSON; nas
+execuções seguintes compara com essa base e sai com código 1 se algum
+benchmark ficar mais lento que o limite (--threshold, fração).
+
+Uso:
+    python -m benchmarks.run_benchmarks --save-baseline
+    python -m benchmarks.run_benchmarks --threshold 0.25
+    python -m benchmarks.run_benchmarks --quick --only catalog
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from config.tax_rates import TaxConstants
+from src.models import ProductInput, CustomerContext, PricingScenario, ServiceInput
+from src.pricing_engine import ProductPricer, BatchProductPricer
+from src.quote_cache import QUOTE_CACHE
+from src.scenario_sweep import ScenarioSweep
+from src.service_engine import ServicePricer, BatchServicePricer
+from src.tax_engine import TaxEngine
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_THRESHOLD = 0.20
+
+SEED = 2026
+
+
+# --- Dados sintéticos ---
+
+def make_catalog(rows: int, seed: int = SEED) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "name": "SKU",
+        "ncm": "85044040",
+        "cost_price": rng.uniform(50, 20000, rows).round(2),
+        "ipi_rate": rng.choice([0.0, 0.05, 0.0975, 0.15], rows),
+        "mva_st": rng.choice([0.0, 0.46, 0.58], rows),
+        "origin_uf": rng.choice(["SP", "MG", "PR"], rows).astype(object),
+        "uf": rng.choice(TaxConstants.ESTADOS, rows).astype(object),
+        "type": rng.choice(["Contribuinte", "Nao_Contribuinte"], rows).astype(object),
+    })
+
+
+def make_portfolio(rows: int, seed: int = SEED) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "service_type": rng.choice(BatchServicePricer.SERVICE_TYPES[1:], rows).astype(object),
+        "ups_quantity": rng.integers(1, 30, rows),
+        "technical_hours_per_visit": rng.choice([0.5, 1.0, 2.0], rows),
+        "distance_km_round_trip": rng.uniform(10, 400, rows),
+        "num_locations": rng.integers(1, 6, rows),
+        "visits_per_year": rng.integers(2, 13, rows),
+        "equipment_capex_unit": rng.choice([0.0, 5000.0, 18000.0], rows),
+        "contract_duration_months": rng.integers(12, 49, rows),
+        "parts_cost_estimation_monthly": rng.uniform(0, 80, rows),
+    })
+
+
+SAMPLE_PRODUCT = dict(name="Nobreak 3kVA Online", ncm="8504.40.40", cost_price=1000.0,
+                      ipi_rate=0.0975, mva_st=0.46, origin_uf="SP")
+SAMPLE_CUSTOMER = dict(uf="BA", type="Nao_Contribuinte", internal_icms_dest=0.205)
+SAMPLE_SERVICE = dict(service_type="Locação (Compra UPS Nova)", ups_power="1-3 kVA", ups_type="Senoidal",
+                      ups_quantity=10, technical_hours_per_visit=1.0, distance_km_round_trip=40.0,
+                      num_locations=2, visits_per_year=4, equipment_capex_unit=5000.0,
+                      contract_duration_months=36, parts_cost_estimation_monthly=20.0)
+
+
+# --- Benchmarks (cada função devolve (callable, nº de operações por chamada)) ---
+
+def bench_model_construction():
+    def run():
+        ProductInput(**SAMPLE_PRODUCT)
+        CustomerContext(**SAMPLE_CUSTOMER)
+        PricingScenario()
+    return run, 1
+
+
+def bench_tax_engine_single():
+    product = ProductInput(**SAMPLE_PRODUCT)
+    customer = CustomerContext(**SAMPLE_CUSTOMER)
+    return (lambda: TaxEngine.calculate_taxes(product, customer, 2000.0)), 1
+
+
+def bench_product_quote_single():
+    product = ProductInput(**SAMPLE_PRODUCT)
+    customer = CustomerContext(**SAMPLE_CUSTOMER)
+    scenario = PricingScenario()
+    return (lambda: ProductPricer(product, customer, scenario).calculate_selling_price()), 1
+
+
+def bench_service_quote_single():
+    service = ServiceInput(**SAMPLE_SERVICE)
+    scenario = PricingScenario()
+    return (lambda: ServicePricer(service, scenario).calculate_contract_price()), 1
+
+
+def _catalog_bench(rows, validate=True):
+    def factory():
+        catalog = make_catalog(rows)
+        pricer = BatchProductPricer()
+        return (lambda: pricer.calculate_selling_prices(catalog, validate=validate)), rows
+    return factory
+
+
+def bench_contract_portfolio_100k():
+    portfolio = make_portfolio(100_000)
+    pricer = BatchServicePricer()
+    return (lambda: pricer.calculate_contract_prices(portfolio)), 100_000
+
+
+def bench_scenario_sweep():
+    sweep = ScenarioSweep(ProductInput(**SAMPLE_PRODUCT),
+                          margins=np.arange(0.15, 0.405, 0.01),
+                          commissions=np.arange(0.02, 0.0505, 0.005),
+                          admin_rates=(0.08, 0.1165))
+    return (lambda: sweep.run(max_workers=1)), sweep.size
+
+
+BENCHMARKS = {
+    "model_construction": (bench_model_construction, False),
+    "tax_engine_single": (bench_tax_engine_single, False),
+    "product_quote_single": (bench_product_quote_single, False),
+    "service_quote_single": (bench_service_quote_single, False),
+    "catalog_10k": (_catalog_bench(10_000), False),
+    "catalog_100k": (_catalog_bench(100_000), False),
+    "catalog_100k_trusted": (_catalog_bench(100_000, validate=False), False),
+    "catalog_1m": (_catalog_bench(1_000_000), True),
+    "contract_portfolio_100k": (bench_contract_portfolio_100k, False),
+    "scenario_sweep": (bench_scenario_sweep, False),
+}
+
+
+def measure(func, repeat: int = 5, min_time: float = 0.2) -> float:
+    """Mediana do tempo por chamada (s), agrupando chamadas rápidas em lotes."""
+    func()  # aquecimento
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1_000_000:
+            break
+        number *= 10
+
+    samples = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - start) / number)
+    return statistics.median(samples)
+
+
+def run_benchmarks(only: str = None, quick: bool = False, repeat: int = 5) -> dict:
+    results = {}
+    cache_enabled = QUOTE_CACHE.enabled
+    QUOTE_CACHE.enabled = False  # mede o cálculo, não o cache
+    try:
+        for name, (factory, slow) in BENCHMARKS.items():
+            if only and only not in name:
+                continue
+            if quick and slow:
+                continue
+            func, operations = factory()
+            seconds = measure(func, repeat=repeat)
+            results[name] = {
+                "seconds": seconds,
+                "operations": operations,
+                "ops_per_second": operations / seconds if seconds > 0 else float("inf"),
+            }
+    finally:
+        QUOTE_CACHE.enabled = cache_enabled
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Lista de (nome, base, atual, variação) dos benchmarks acima do limite."""
+    regressions = []
+    for name, current in results.items():
+        reference = baseline.get(name)
+        if not reference:
+            continue
+        change = current["seconds"] / reference["seconds"] - 1.0
+        if change > threshold:
+            regressions.append((name, reference["seconds"], current["seconds"], change))
+    return regressions
+
+
+def _format_seconds(seconds: float) -> str:
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:9.1f} µs"
+    if seconds < 1:
+        return f"{seconds * 1e3:9.2f} ms"
+    return f"{seconds:9.3f} s "
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks dos motores de precificação.")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Arquivo JSON de referência")
+    parser.add_argument("--save-baseline", action="store_true", help="Grava os resultados como nova referência")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Piora máxima aceita em relação à referência (fração, padrão 0.20)")
+    parser.add_argument("--only", default=None, help="Roda apenas benchmarks cujo nome contém este texto")
+    parser.add_argument("--quick", action="store_true", help="Pula os benchmarks mais pesados (1M linhas)")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetições por benchmark")
+    parser.add_argument("--output", default=None, help="Grava os resultados desta execução em JSON")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.only, args.quick, args.repeat)
+    for name, data in results.items():
+        print(f"{name:<26} {_format_seconds(data['seconds'])}  {data['ops_per_second']:>14,.0f} ops/s")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(results, handle, indent=2)
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding="utf-8") as handle:
+                baseline = json.load(handle)
+        baseline.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as handle:
+            json.dump(baseline, handle, indent=2)
+        print(f"Referência gravada em {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("Sem referência para comparar (use --save-baseline).")
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as handle:
+        baseline = json.load(handle)
+    regressions = compare(results, baseline, args.threshold)
+    for name, before, after, change in regressions:
+        print(f"REGRESSÃO {name}: {_format_seconds(before).strip()} -> {_format_seconds(after).strip()} (+{change * 100:.1f}%)")
+    if regressions:
+        return 1
+    print(f"Nenhuma regressão acima de {args.threshold * 100:.0f}%.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+# config/ncm_rates.py
+"""
+Tabela de IPI e MVA-ST por NCM com índice de prefixos.
+
+Cada entrada pode ser um capítulo (2 dígitos), posição (4), subposição (6),
+item (7) ou o código completo (8). Na consulta vale o prefixo mais longo que
+define a alíquota; IPI e MVA são resolvidos separadamente (um capítulo pode
+definir o IPI e o código completo só a MVA).
+
+Carregar outra tabela (CSV com colunas ncm, ipi_rate, mva_st; vazio = não definido):
+    from config.ncm_rates import NcmRateTable, set_ncm_rates
+    set_ncm_rates(NcmRateTable.from_csv("tipi.csv"))
+"""
+import csv
+import re
+
+import numpy as np
+import pandas as pd
+
+_NON_DIGITS = re.compile(r"\D")
+
+
+def normalize_ncm(ncm) -> str:
+    """'8504.40.40' -> '85044040' (só dígitos)."""
+    return _NON_DIGITS.sub("", str(ncm))
+
+
+class NcmRateTable:
+    """Alíquotas de IPI e MVA-ST indexadas por prefixo de NCM."""
+
+    RATE_FIELDS = ("ipi_rate", "mva_st")
+
+    def __init__(self, entries=(), default_ipi: float = 0.0, default_mva: float = 0.0):
+        """entries: iterável de (ncm ou prefixo, ipi_rate ou None, mva_st ou None)."""
+        self.defaults = {"ipi_rate": default_ipi, "mva_st": default_mva}
+        # Um dicionário por campo e por comprimento de prefixo: {8: {"85044040": 0.0975}, 4: {...}}
+        self.index = {field: {} for field in self.RATE_FIELDS}
+        for ncm, ipi_rate, mva_st in entries:
+            self.add(ncm, ipi_rate, mva_st)
+
+    def add(self, ncm, ipi_rate: float = None, mva_st: float = None):
+        prefix = normalize_ncm(ncm)
+        if not 2 <= len(prefix) <= 8:
+            raise ValueError(f"NCM/prefixo inválido: {ncm!r}")
+        for field, rate in zip(self.RATE_FIELDS, (ipi_rate, mva_st)):
+            if rate is not None and not pd.isna(rate):
+                self.index[field].setdefault(len(prefix), {})[prefix] = float(rate)
+
+    def _lengths(self, field: str) -> list:
+        return sorted(self.index[field], reverse=True)
+
+    def lookup(self, ncm, field: str):
+        """Alíquota do prefixo mais longo; None se nenhum prefixo define o campo."""
+        digits = normalize_ncm(ncm)
+        levels = self.index[field]
+        for length in self._lengths(field):
+            rate = levels[length].get(digits[:length])
+            if rate is not None:
+                return rate
+        return None
+
+    def rates_for(self, ncm) -> dict:
+        """{"ipi_rate": ..., "mva_st": ...} com o padrão da tabela quando não houver prefixo."""
+        result = {}
+        for field in self.RATE_FIELDS:
+            rate = self.lookup(ncm, field)
+            result[field] = self.defaults[field] if rate is None else rate
+        return result
+
+    def lookup_many(self, ncms, field: str) -> np.ndarray:
+        """
+        Versão vetorizada de lookup (NaN onde nenhum prefixo define o campo).
+        Resolve cada NCM distinto uma vez: catálogos grandes repetem poucos códigos.
+        """
+        codes, uniques = pd.factorize(pd.Series(ncms, dtype=object).astype(str), use_na_sentinel=False)
+        digits = pd.Series(uniques).str.replace(r"\D", "", regex=True)
+        resolved = pd.Series(np.nan, index=digits.index)
+        levels = self.index[field]
+        for length in self._lengths(field):
+            pending = resolved.isna()
+            if not pending.any():
+                break
+            candidates = digits[pending]
+            candidates = candidates[candidates.str.len() >= length]
+            resolved[candidates.index] = candidates.str[:length].map(levels[length])
+        return resolved.to_numpy(dtype=float)[codes]
+
+    def to_frame(self) -> pd.DataFrame:
+        prefixes = sorted({prefix for field in self.RATE_FIELDS
+                           for level in self.index[field].values() for prefix in level})
+        return pd.DataFrame({
+            "ncm": prefixes,
+            **{field: [self.index[field].get(len(p), {}).get(p, np.nan) for p in prefixes]
+               for field in self.RATE_FIELDS},
+        })
+
+    @classmethod
+    def from_csv(cls, path: str, sep: str = None, **kwargs) -> "NcmRateTable":
+        with open(path, newline="", encoding="utf-8-sig") as handle:
+            if sep is None:
+                sample = handle.readline()
+                sep = ";" if sample.count(";") > sample.count(",") else ","
+                handle.seek(0)
+            rows = list(csv.DictReader(handle, delimiter=sep))
+
+        def rate(row, field):
+            value = (row.get(field) or "").strip().replace(",", ".")
+            return float(value) if value else None
+
+        return cls(((row["ncm"], rate(row, "ipi_rate"), rate(row, "mva_st")) for row in rows), **kwargs)
+
+
+# Tabela base (mesmas alíquotas das opções da tela de produtos)
+DEFAULT_NCM_ENTRIES = (
+    # Nobreaks / conversores estáticos: IPI 9,75%, MVA 46%
+    ("8504.40", 0.0975, 0.46),
+    # Acumuladores (baterias): IPI 15%, sem ST
+    ("8507", 0.15, 0.00),
+    # Partes e placas de conversores: IPI 5%, MVA 58%
+    ("8504.90", 0.05, 0.58),
+    ("8473.30", 0.05, 0.58),
+)
+
+NCM_RATES = NcmRateTable(DEFAULT_NCM_ENTRIES)
+
+
+def set_ncm_rates(table: NcmRateTable):
+    """Troca a tabela usada por ProductInput e pelos precificadores em lote."""
+    global NCM_RATES
+    NCM_RATES = table
+
+
+def get_ncm_rates() -> NcmRateTable:
+    return NCM_RATES
@@ -0,0 +1,114 @@
+# config/site_coordinates.py
+"""
+Tabela local de coordenadas (latitude/longitude em graus) das bases e dos
+locais atendidos, usada pelo roteirizador de src/logistics.py.
+
+A tabela base traz as capitais, identificadas pela UF ("SP" = São Paulo), o
+que já permite roteiros aproximados entre cidades. Para endereços de clientes,
+carregar um CSV com colunas site, lat, lon (aceita vírgula decimal):
+    from config.site_coordinates import SiteCoordinates, set_site_coordinates
+    set_site_coordinates(SiteCoordinates.from_csv("unidades_clientes.csv"))
+"""
+import csv
+
+import numpy as np
+import pandas as pd
+
+# Base técnica de onde saem as visitas quando o contrato não informa outra
+DEFAULT_BASE = "SP"
+
+
+class SiteCoordinates:
+    """Coordenadas por identificador de local (texto)."""
+
+    def __init__(self, entries=()):
+        """entries: iterável de (site, lat, lon)."""
+        self.index = {}
+        self.lat = np.empty(0)
+        self.lon = np.empty(0)
+        # Muda a cada inclusão; caches de distância usam para se invalidar
+        self.version = 0
+        self.add_many(entries)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, site) -> bool:
+        return str(site) in self.index
+
+    def add_many(self, entries):
+        sites, lats, lons = [], [], []
+        for site, lat, lon in entries:
+            lat, lon = float(lat), float(lon)
+            if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+                raise ValueError(f"Coordenada inválida para {site!r}: {lat}, {lon}")
+            sites.append(str(site))
+            lats.append(lat)
+            lons.append(lon)
+        if not sites:
+            return
+
+        # Local repetido: vale a última coordenada
+        lat, lon = self.lat.tolist(), self.lon.tolist()
+        for site, site_lat, site_lon in zip(sites, lats, lons):
+            position = self.index.setdefault(site, len(lat))
+            if position == len(lat):
+                lat.append(site_lat)
+                lon.append(site_lon)
+            else:
+                lat[position], lon[position] = site_lat, site_lon
+        self.lat, self.lon = np.asarray(lat), np.asarray(lon)
+        self.version += 1
+
+    def add(self, site, lat: float, lon: float):
+        self.add_many([(site, lat, lon)])
+
+    def positions(self, sites) -> np.ndarray:
+        """Posições na tabela (ValueError para local sem coordenada)."""
+        try:
+            return np.fromiter((self.index[str(site)] for site in sites), dtype=np.int64)
+        except KeyError as e:
+            raise ValueError(f"Local sem coordenada cadastrada: {e.args[0]}") from None
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame({"site": list(self.index), "lat": self.lat, "lon": self.lon})
+
+    @classmethod
+    def from_csv(cls, path: str, sep: str = None) -> "SiteCoordinates":
+        with open(path, newline="", encoding="utf-8-sig") as handle:
+            if sep is None:
+                sample = handle.readline()
+                sep = ";" if sample.count(";") > sample.count(",") else ","
+                handle.seek(0)
+            rows = list(csv.DictReader(handle, delimiter=sep))
+
+        def number(value):
+            return float(str(value).strip().replace(",", "."))
+
+        return cls((row["site"].strip(), number(row["lat"]), number(row["lon"])) for row in rows)
+
+
+# Capitais por UF
+DEFAULT_SITE_ENTRIES = (
+    ("AC", -9.9750, -67.8243), ("AL", -9.6660, -35.7350), ("AM", -3.1190, -60.0217),
+    ("AP", 0.0349, -51.0694), ("BA", -12.9718, -38.5011), ("CE", -3.7172, -38.5434),
+    ("DF", -15.7797, -47.9297), ("ES", -20.3155, -40.3128), ("GO", -16.6864, -49.2643),
+    ("MA", -2.5307, -44.3068), ("MG", -19.9167, -43.9345), ("MS", -20.4428, -54.6464),
+    ("MT", -15.6010, -56.0974), ("PA", -1.4550, -48.5024), ("PB", -7.1151, -34.8641),
+    ("PE", -8.0467, -34.8771), ("PI", -5.0892, -42.8016), ("PR", -25.4284, -49.2733),
+    ("RJ", -22.9068, -43.1729), ("RN", -5.7945, -35.2110), ("RO", -8.7608, -63.8999),
+    ("RR", 2.8238, -60.6753), ("RS", -30.0277, -51.2287), ("SC", -27.5969, -48.5495),
+    ("SE", -10.9091, -37.0677), ("SP", -23.5505, -46.6333), ("TO", -10.1689, -48.3317),
+)
+
+SITE_COORDINATES = SiteCoordinates(DEFAULT_SITE_ENTRIES)
+
+
+def set_site_coordinates(table: SiteCoordinates):
+    """Troca a tabela usada pelo roteirizador."""
+    global SITE_COORDINATES
+    SITE_COORDINATES = table
+
+
+def get_site_coordinates() -> SiteCoordinates:
+    return SITE_COORDINATES
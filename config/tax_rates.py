@@ -1,10 +1,175 @@
 # config/tax_rates.py
+from datetime import date
+
+import numpy as np
+
+
+class RateTable:
+    """
+    Tabelas de ICMS pré-calculadas e indexadas por UF (UF -> código inteiro).
+    Construída uma única vez a partir das alíquotas internas por estado.
+    """
+
+    # Estados de Origem "Ricos" (Sul e Sudeste exceto ES)
+    SUL_SUDESTE_ORIGEM = ("MG", "PR", "RJ", "RS", "SC", "SP")
+
+    def __init__(self, icms_interno: dict, icms_padrao: float = 0.18):
+        self.icms_padrao = icms_padrao
+        self.ufs = np.array(sorted(icms_interno))
+        self.index = {uf: code for code, uf in enumerate(self.ufs.tolist())}
+
+        # Vetor de alíquotas internas (posição = código da UF)
+        self.internal = np.array([icms_interno[uf] for uf in self.ufs.tolist()], dtype=float)
+
+        # Matriz 27x27 de alíquotas interestaduais [origem, destino]
+        rich = np.isin(self.ufs, self.SUL_SUDESTE_ORIGEM)
+        self.interstate = np.where(rich[:, None] & ~rich[None, :], 0.07, 0.12)
+        np.fill_diagonal(self.interstate, 0.0)
+
+        # Acesso escalar sem custo de indexação NumPy
+        self.internal_lookup = dict(zip(self.ufs.tolist(), self.internal.tolist()))
+        self.interstate_lookup = {
+            (origin, dest): self.interstate[i, j].item()
+            for origin, i in self.index.items()
+            for dest, j in self.index.items()
+        }
+
+        # Mesmas alíquotas em pontos-base (modo ponto fixo dos motores)
+        self.internal_bp_lookup = {uf: round(rate * 10_000) for uf, rate in self.internal_lookup.items()}
+        self.interstate_bp_lookup = {key: round(rate * 10_000) for key, rate in self.interstate_lookup.items()}
+
+    def interstate_rate(self, origin_uf: str, dest_uf: str) -> float:
+        """Alíquota interestadual de um par (caminho escalar; UF fora da tabela segue a regra geral)."""
+        rate = self.interstate_lookup.get((origin_uf, dest_uf))
+        if rate is not None:
+            return rate
+        if origin_uf == dest_uf:
+            return 0.0
+        if origin_uf in self.SUL_SUDESTE_ORIGEM and dest_uf not in self.SUL_SUDESTE_ORIGEM:
+            return 0.07
+        return 0.12
+
+    def interstate_bp(self, origin_uf: str, dest_uf: str) -> int:
+        bp = self.interstate_bp_lookup.get((origin_uf, dest_uf))
+        return bp if bp is not None else round(self.interstate_rate(origin_uf, dest_uf) * 10_000)
+
+    def encode(self, ufs) -> np.ndarray:
+        """Converte siglas em códigos inteiros (-1 para UF desconhecida)."""
+        values = np.asarray(ufs).astype(str)
+        codes = np.searchsorted(self.ufs, values)
+        codes = np.minimum(codes, len(self.ufs) - 1)
+        return np.where(self.ufs[codes] == values, codes, -1)
+
+    def internal_rates(self, dest_uf) -> np.ndarray:
+        codes = self.encode(dest_uf)
+        return np.where(codes >= 0, self.internal[codes], self.icms_padrao)
+
+    def interstate_rates(self, origin_uf, dest_uf) -> np.ndarray:
+        origin_codes = self.encode(origin_uf)
+        dest_codes = self.encode(dest_uf)
+        rates = self.interstate[origin_codes, dest_codes]
+
+        unknown = (origin_codes < 0) | (dest_codes < 0)
+        if unknown.any():
+            # UF fora da tabela: aplica a regra geral diretamente
+            origin = np.asarray(origin_uf).astype(str)
+            dest = np.asarray(dest_uf).astype(str)
+            rich_origin = np.isin(origin, self.SUL_SUDESTE_ORIGEM)
+            rich_dest = np.isin(dest, self.SUL_SUDESTE_ORIGEM)
+            fallback = np.where(origin == dest, 0.0, np.where(rich_origin & ~rich_dest, 0.07, 0.12))
+            rates = np.where(unknown, fallback, rates)
+        return rates
+
+
+class TaxTableVersion:
+    """
+    Tabela fiscal com data de vigência (alíquotas internas de ICMS e federais).
+    Cotações guardam a versão usada e podem ser refeitas com qualquer versão.
+    """
+
+    def __init__(self, version: str, effective_from: date, icms_interno: dict,
+                 icms_padrao: float = 0.18, pis_rate: float = 0.0065, cofins_rate: float = 0.0300):
+        self.version = version
+        self.effective_from = effective_from
+        self.icms_interno = dict(icms_interno)
+        self.icms_padrao = icms_padrao
+        self.pis_rate = pis_rate
+        self.cofins_rate = cofins_rate
+        self.rates = RateTable(self.icms_interno, icms_padrao)
+        # Pontos-base para o modo ponto fixo
+        self.icms_padrao_bp = round(icms_padrao * 10_000)
+        self.pis_cofins_bp = round(self.pis_cofins_rate * 10_000)
+
+    @property
+    def pis_cofins_rate(self) -> float:
+        return self.pis_rate + self.cofins_rate
+
+    def revise(self, version: str, effective_from: date, icms_changes: dict = None, **overrides) -> "TaxTableVersion":
+        """Nova versão a partir desta, alterando só as UFs/alíquotas informadas."""
+        icms_interno = {**self.icms_interno, **(icms_changes or {})}
+        params = {"icms_padrao": self.icms_padrao, "pis_rate": self.pis_rate, "cofins_rate": self.cofins_rate}
+        params.update(overrides)
+        return TaxTableVersion(version, effective_from, icms_interno, **params)
+
+    def changed_rate_keys(self, other: "TaxTableVersion") -> set:
+        """
+        Chaves de alíquota que diferem entre as versões:
+        ("internal", UF), ("padrao",) e ("federal",) (PIS/COFINS).
+        """
+        keys = {
+            ("internal", uf)
+            for uf in set(self.icms_interno) | set(other.icms_interno)
+            if self.icms_interno.get(uf) != other.icms_interno.get(uf)
+        }
+        if self.icms_padrao != other.icms_padrao:
+            keys.add(("padrao",))
+        if self.pis_cofins_rate != other.pis_cofins_rate:
+            keys.add(("federal",))
+        return keys
+
+
+class TaxTableHistory:
+    """Versões da tabela fiscal ordenadas por início de vigência."""
+
+    def __init__(self, tables=()):
+        self._tables = []
+        for table in tables:
+            self.register(table)
+
+    def register(self, table: TaxTableVersion) -> TaxTableVersion:
+        if any(existing.version == table.version for existing in self._tables):
+            raise ValueError(f"Versão de tabela já registrada: {table.version}")
+        self._tables.append(table)
+        self._tables.sort(key=lambda t: t.effective_from)
+        return table
+
+    def get(self, version: str) -> TaxTableVersion:
+        for table in self._tables:
+            if table.version == version:
+                return table
+        raise KeyError(f"Versão de tabela desconhecida: {version}")
+
+    def at(self, when: date = None) -> TaxTableVersion:
+        """Versão vigente na data (hoje, se omitida)."""
+        when = when or date.today()
+        valid = [table for table in self._tables if table.effective_from <= when]
+        if not valid:
+            raise KeyError(f"Nenhuma tabela vigente em {when.isoformat()}")
+        return valid[-1]
+
+    @property
+    def versions(self) -> list:
+        return [table.version for table in self._tables]
+
 
 class TaxConstants:
     """
     Constantes fiscais e Tabela de ICMS 2025/2026.
     Fonte: Legislação Estadual atualizada (Jan/2026).
     """
+
+    # Versão da tabela (entra na chave do cache de cotações)
+    TABLE_VERSION = "2026.01"
     
     # Impostos Federais (Lucro Presumido)
     PIS_RATE = 0.0065
@@ -28,20 +193,20 @@ class TaxConstants:
     # Lista de siglas para o menu
     ESTADOS = sorted(list(ICMS_INTERNO_ESTADOS.keys()))
 
+    # Tabela vigente e suas matrizes UF x UF (montadas uma vez na importação)
+    CURRENT_TABLE = TaxTableVersion(TABLE_VERSION, date(2026, 1, 1), ICMS_INTERNO_ESTADOS,
+                                    ICMS_PADRAO, PIS_RATE, COFINS_RATE)
+    RATES = CURRENT_TABLE.rates
+
     @staticmethod
     def get_interstate_rate(origin_uf: str, dest_uf: str) -> float:
         """
         Define a alíquota interestadual (4%, 7% ou 12%).
         Regra: Sul/Sudeste (exceto ES) vendendo para Norte/Nordeste/CO/ES = 7%.
+        Tabela vigente; motores com tabela própria usam tax_table.rates.interstate_rate.
         """
-        if origin_uf == dest_uf:
-            return 0.0 # Venda Interna
-            
-        # Estados de Origem "Ricos" (Sul e Sudeste exceto ES)
-        sul_sudeste_origem = ["MG", "PR", "RJ", "RS", "SC", "SP"]
-        
-        # Se sai do Sul/Sudeste e vai para fora dessa região (ou para o ES)
-        if origin_uf in sul_sudeste_origem and dest_uf not in sul_sudeste_origem:
-            return 0.07 # 7%
-        
-        return 0.12 # 12% Regra Geral
\ No newline at end of file
+        return TaxConstants.RATES.interstate_rate(origin_uf, dest_uf)
+
+
+# Histórico de tabelas com vigência (novas versões: TAX_TABLES.register(...))
+TAX_TABLES = TaxTableHistory([TaxConstants.CURRENT_TABLE])
@@ -0,0 +1,190 @@
+# src/cash_flow.py
+"""
+Fluxo de caixa mês a mês dos contratos de serviço, com VPL, TIR e payback.
+
+A mensalidade continua vindo do BatchServicePricer; aqui ela vira um fluxo
+(contratos x meses, mês 0 = assinatura) para a carteira inteira de uma vez:
+
+    mês 0        compra dos equipamentos (Locação - Compra UPS Nova)
+    meses 1..N   mensalidade, impostos e comissão sobre ela, peças, e o custo
+                 das visitas no mês em que acontecem (visitas/ano distribuídas
+                 uniformemente: 4/ano -> meses 3, 6, 9, 12; pontual: todo mês)
+
+A amortização é só contábil (o preço a embute); sai em `amortization`, fora
+do caixa. UPS de estoque não tem desembolso no mês 0 (equipamento já pago).
+
+Uso:
+    fluxo = ContractCashFlow(PricingScenario(), discount_rate=0.12)
+    indicadores = fluxo.evaluate(carteira)     # VPL, TIR, payback por contrato
+    tabela = fluxo.statement(servico)          # um contrato, uma linha por mês
+"""
+import numpy as np
+import pandas as pd
+
+from src.models import ServiceInput, PricingScenario
+from src.service_engine import BatchServicePricer, ServicePricer
+
+# Taxa mínima de atratividade padrão (ao ano)
+DEFAULT_DISCOUNT_RATE = 0.12
+
+# Fluxos do schedule (arrays contratos x meses) e o sinal no caixa
+CASH_FLOW_ITEMS = (
+    ("revenue", 1), ("taxes", -1), ("commissions", -1), ("visit_costs", -1), ("parts", -1), ("capex", -1),
+)
+
+
+def monthly_rate(annual_rate):
+    """Taxa anual -> mensal equivalente."""
+    return (1.0 + np.asarray(annual_rate, dtype=float)) ** (1.0 / 12.0) - 1.0
+
+
+def npv(cash_flows: np.ndarray, rate_monthly) -> np.ndarray:
+    """VPL de cada linha (mês 0 na primeira coluna) à taxa mensal (escalar ou uma por linha)."""
+    cash_flows = np.atleast_2d(cash_flows)
+    # Horner em 1/(1+r): uma operação vetorial por mês, sem potências
+    factor = 1.0 / (1.0 + np.broadcast_to(np.asarray(rate_monthly, dtype=float), (len(cash_flows),)))
+    value = np.zeros(len(cash_flows))
+    for column in range(cash_flows.shape[1] - 1, -1, -1):
+        value = value * factor + cash_flows[:, column]
+    return value
+
+
+def irr(cash_flows: np.ndarray, low: float = -0.9, high: float = 1.0, tolerance: float = 1e-10,
+        max_iterations: int = 100) -> np.ndarray:
+    """
+    TIR mensal de cada linha por bisseção vetorizada (todas as linhas por iteração).
+    NaN quando o VPL não troca de sinal no intervalo (ex.: fluxo sem investimento).
+    """
+    cash_flows = np.atleast_2d(cash_flows)
+    rows = len(cash_flows)
+    low = np.full(rows, low)
+    high = np.full(rows, high)
+    npv_low = npv(cash_flows, low)
+    valid = np.sign(npv_low) * np.sign(npv(cash_flows, high)) < 0
+    for _ in range(max_iterations):
+        if not (high - low > tolerance).any():
+            break
+        middle = (low + high) / 2
+        npv_middle = npv(cash_flows, middle)
+        same_side = np.sign(npv_middle) == np.sign(npv_low)
+        low = np.where(same_side, middle, low)
+        npv_low = np.where(same_side, npv_middle, npv_low)
+        high = np.where(same_side, high, middle)
+    return np.where(valid, (low + high) / 2, np.nan)
+
+
+def payback(cash_flows: np.ndarray) -> np.ndarray:
+    """Primeiro mês com caixa acumulado >= 0 (0 se nunca fica negativo; NaN se não recupera)."""
+    cumulative = np.cumsum(np.atleast_2d(cash_flows), axis=1)
+    recovered = cumulative >= -1e-9
+    # Último mês ainda negativo + 1
+    negative = ~recovered
+    last_negative = np.where(negative.any(axis=1),
+                             negative.shape[1] - 1 - np.argmax(negative[:, ::-1], axis=1), -1)
+    months = (last_negative + 1).astype(float)
+    return np.where(recovered[:, -1], months, np.nan)
+
+
+class ContractCashFlow:
+    """Fluxo de caixa, VPL, TIR e payback da carteira de contratos (uma linha por contrato)."""
+
+    def __init__(self, scenario: PricingScenario = None, discount_rate: float = DEFAULT_DISCOUNT_RATE):
+        self.pricer = BatchServicePricer(scenario)
+        self.discount_rate = discount_rate
+
+    def _column(self, frame: pd.DataFrame, name: str) -> np.ndarray:
+        if name in frame.columns:
+            return frame[name].to_numpy(dtype=float)
+        return np.full(len(frame), self.pricer.SERVICE_DEFAULTS[name], dtype=float)
+
+    def schedule(self, portfolio, validate: bool = True) -> dict:
+        """
+        Arrays contratos x (meses + 1), coluna 0 = assinatura. Chaves: os itens de
+        CASH_FLOW_ITEMS (valores positivos), amortization, net_cash_flow e priced
+        (o resultado do BatchServicePricer).
+        """
+        frame = portfolio if isinstance(portfolio, pd.DataFrame) else pd.DataFrame(portfolio)
+        priced = self.pricer.calculate_contract_prices(frame, validate=validate)
+        type_code = self.pricer.encode_service_types(frame["service_type"].to_numpy())
+        scenario = self.pricer.scenario
+
+        price = priced["monthly_price"].to_numpy(dtype=float)
+        tax_rate = priced["tax_rate_used"].to_numpy(dtype=float)
+        commission_rate = (frame["commission_rate"].to_numpy(dtype=float) if "commission_rate" in frame.columns
+                           else np.full(len(frame), scenario.commission_rate))
+        quantity = self._column(frame, "ups_quantity")
+        months = self._column(frame, "contract_duration_months").astype(np.int64)
+        visits_year = self._column(frame, "visits_per_year").astype(np.int64)
+        capex_total = self._column(frame, "equipment_capex_unit") * quantity
+        km_per_visit = self.pricer.km_per_visit(
+            frame["distance_km_round_trip"].to_numpy(dtype=float),
+            self._column(frame, "num_locations"),
+            self._column(frame, "route_km_round_trip"),
+        )
+
+        horizon = int(months.max()) if len(months) else 0
+        month = np.arange(horizon + 1)[None, :]
+        active = (month >= 1) & (month <= months[:, None])
+
+        # 1. Receita, impostos e comissão sobre a mensalidade
+        revenue = np.where(active, price[:, None], 0.0)
+        taxes = revenue * tax_rate[:, None]
+        commissions = revenue * commission_rate[:, None]
+
+        # 2. Visitas no mês em que acontecem: floor(m*v/12) - floor((m-1)*v/12)
+        visits = (month * visits_year[:, None]) // 12 - (np.maximum(month - 1, 0) * visits_year[:, None]) // 12
+        visits = np.where(self.pricer.TYPE_IS_PONTUAL[type_code][:, None], 1, visits)
+        visit_cost = (frame["technical_hours_per_visit"].to_numpy(dtype=float) * quantity * ServicePricer.COST_HOUR_TECH
+                      + km_per_visit * ServicePricer.COST_KM)
+        visit_costs = np.where(active, visits * visit_cost[:, None], 0.0)
+
+        # 3. Peças (estimativa mensal por máquina)
+        parts = np.where(active, (self._column(frame, "parts_cost_estimation_monthly") * quantity)[:, None], 0.0)
+
+        # 4. CapEx na assinatura (só compra de UPS nova) e amortização contábil
+        is_new = self.pricer.TYPE_IS_NEW_UPS[type_code]
+        capex = np.zeros_like(revenue)
+        capex[:, 0] = np.where(is_new, capex_total, 0.0)
+        amortization = np.where(active, priced["Amortização Ativos"].to_numpy(dtype=float)[:, None], 0.0)
+
+        flows = {"revenue": revenue, "taxes": taxes, "commissions": commissions,
+                 "visit_costs": visit_costs, "parts": parts, "capex": capex}
+        net_cash_flow = sum(sign * flows[name] for name, sign in CASH_FLOW_ITEMS)
+        return {**flows, "amortization": amortization, "net_cash_flow": net_cash_flow, "priced": priced}
+
+    def evaluate(self, portfolio, validate: bool = True) -> pd.DataFrame:
+        """VPL (à taxa anual discount_rate), TIR anual, payback simples e descontado por contrato."""
+        flows = self.schedule(portfolio, validate)
+        net = flows["net_cash_flow"]
+        rate = monthly_rate(self.discount_rate)
+        discounted = net / (1.0 + rate) ** np.arange(net.shape[1])
+        # TIR só onde há investimento (sem desembolso o VPL não troca de sinal)
+        irr_monthly = np.full(len(net), np.nan)
+        invests = (net < 0).any(axis=1)
+        if invests.any():
+            irr_monthly[invests] = irr(net[invests])
+
+        priced = flows["priced"]
+        result = pd.DataFrame(index=priced.index)
+        result["service_type"] = priced["service_type"].to_numpy()
+        result["monthly_price"] = priced["monthly_price"].to_numpy()
+        result["total_contract_value"] = priced["total_contract_value"].to_numpy()
+        result["capex"] = np.round(flows["capex"][:, 0], 2)
+        result["net_cash_flow"] = np.round(net.sum(axis=1), 2)
+        result["npv"] = np.round(discounted.sum(axis=1), 2)
+        result["irr_annual_pct"] = np.round(((1.0 + irr_monthly) ** 12 - 1.0) * 100, 2)
+        result["payback_months"] = payback(net)
+        result["discounted_payback_months"] = payback(discounted)
+        return result
+
+    def statement(self, service: ServiceInput) -> pd.DataFrame:
+        """Fluxo de um contrato, uma linha por mês, com caixa acumulado e descontado."""
+        flows = self.schedule(pd.DataFrame([service.model_dump()]))
+        table = pd.DataFrame({name: flows[name][0] for name, _ in CASH_FLOW_ITEMS})
+        table["amortization"] = flows["amortization"][0]
+        table["net_cash_flow"] = flows["net_cash_flow"][0]
+        table["cumulative"] = table["net_cash_flow"].cumsum()
+        rate = monthly_rate(self.discount_rate)
+        table["discounted_cumulative"] = (table["net_cash_flow"] / (1.0 + rate) ** np.arange(len(table))).cumsum()
+        table.index.name = "month"
+        return table.round(2)
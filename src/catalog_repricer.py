@@ -0,0 +1,221 @@
+# src/catalog_repricer.py
+"""
+Reprecificação de listas de fornecedores (CSV/XLSX) em streaming.
+
+Lê o arquivo em blocos, precifica cada bloco com o BatchProductPricer e grava
+o resultado linha a linha (CSV ou XLSX write-only). A memória usada depende do
+tamanho do bloco, não do tamanho do arquivo.
+
+Uso:
+    python -m src.catalog_repricer fornecedor.xlsx precos.xlsx --uf BA --tipo Nao_Contribuinte
+"""
+import argparse
+import csv
+import os
+import sys
+
+import pandas as pd
+
+from src.models import PricingScenario
+from src.pricing_engine import BatchProductPricer
+from src.instrumentation import METRICS
+
+DEFAULT_CHUNK_SIZE = 5000
+NUMERIC_COLUMNS = ("cost_price", "ipi_rate", "mva_st", "internal_icms_dest",
+                   "commission_rate", "admin_cost_rate", "target_margin")
+TEXT_COLUMNS = ("name", "ncm", "origin_uf", "uf")
+
+
+def _text(series: pd.Series) -> pd.Series:
+    """Texto sem espaços nas pontas; célula vazia ou ausente continua ausente (não vira "nan")."""
+    return series.astype("string").str.strip().replace("", pd.NA)
+
+
+def _missing_as_none(frame: pd.DataFrame) -> pd.DataFrame:
+    # Colunas de texto: pd.NA vira célula vazia na saída (e não "<NA>")
+    text = [column for column in frame.columns if isinstance(frame[column].dtype, pd.StringDtype)]
+    if not text:
+        return frame
+    frame = frame.copy()
+    for column in text:
+        frame[column] = frame[column].astype(object).where(frame[column].notna(), None)
+    return frame
+
+
+def _chunks_from_rows(header, rows, chunk_size: int):
+    header = [str(column).strip() for column in header]
+    buffer = []
+    start = 0
+    for row in rows:
+        if row is None or all(value in (None, "") for value in row):
+            continue
+        buffer.append(row)
+        if len(buffer) >= chunk_size:
+            yield pd.DataFrame(buffer, columns=header, index=range(start, start + len(buffer)))
+            start += len(buffer)
+            buffer = []
+    if buffer:
+        yield pd.DataFrame(buffer, columns=header, index=range(start, start + len(buffer)))
+
+
+def iter_csv_chunks(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE, sep: str = None, decimal: str = "."):
+    """Lê um CSV em blocos de DataFrame (separador detectado se não informado)."""
+    with open(path, newline="", encoding="utf-8-sig") as handle:
+        if sep is None:
+            sample = handle.readline()
+            sep = ";" if sample.count(";") > sample.count(",") else ","
+            handle.seek(0)
+        reader = csv.reader(handle, delimiter=sep)
+        header = next(reader, None)
+        if header is None:
+            return
+        for chunk in _chunks_from_rows(header, reader, chunk_size):
+            if decimal != ".":
+                chunk = chunk.apply(lambda col: col.str.replace(".", "", regex=False).str.replace(decimal, ".", regex=False)
+                                    if col.name in NUMERIC_COLUMNS else col)
+            yield chunk
+
+
+def iter_xlsx_chunks(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE, sheet: str = None):
+    """Lê uma planilha XLSX em blocos usando o modo read-only do openpyxl."""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet] if sheet else workbook.active
+        rows = worksheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        yield from _chunks_from_rows(header, rows, chunk_size)
+    finally:
+        workbook.close()
+
+
+class CsvResultWriter:
+    def __init__(self, path: str, sep: str = ","):
+        self.handle = open(path, "w", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.handle, delimiter=sep)
+        self.header_written = False
+
+    def write(self, frame: pd.DataFrame):
+        if not self.header_written:
+            self.writer.writerow(frame.columns)
+            self.header_written = True
+        self.writer.writerows(_missing_as_none(frame).itertuples(index=False, name=None))
+
+    def close(self):
+        self.handle.close()
+
+
+class XlsxResultWriter:
+    def __init__(self, path: str, sheet_title: str = "Precos"):
+        from openpyxl import Workbook
+
+        self.path = path
+        self.workbook = Workbook(write_only=True)
+        self.worksheet = self.workbook.create_sheet(sheet_title)
+        self.header_written = False
+
+    def write(self, frame: pd.DataFrame):
+        if not self.header_written:
+            self.worksheet.append(list(frame.columns))
+            self.header_written = True
+        for row in _missing_as_none(frame).itertuples(index=False, name=None):
+            self.worksheet.append([value.item() if hasattr(value, "item") else value for value in row])
+
+    def close(self):
+        self.workbook.save(self.path)
+        self.workbook.close()
+
+
+def prepare_chunk(chunk: pd.DataFrame, dest_uf: str, customer_type: str) -> pd.DataFrame:
+    # Planilhas costumam trazer NCM/códigos como número; UFs com espaços ou minúsculas
+    for column in TEXT_COLUMNS + ("type",):
+        if column in chunk.columns:
+            chunk[column] = _text(chunk[column])
+    for column in ("origin_uf", "uf"):
+        if column in chunk.columns:
+            chunk[column] = chunk[column].str.upper()
+    for column in NUMERIC_COLUMNS:
+        if column in chunk.columns:
+            chunk[column] = pd.to_numeric(chunk[column], errors="coerce")
+    # IPI/MVA vazios vêm da tabela por NCM (e ficam visíveis no arquivo de saída)
+    chunk["ipi_rate"], chunk["mva_st"] = BatchProductPricer.resolve_ncm_rates(chunk)
+    # Célula vazia de origem/destino/tipo usa o padrão, como a coluna ausente
+    for column, default in (("origin_uf", BatchProductPricer.PRODUCT_DEFAULTS["origin_uf"]),
+                            ("uf", dest_uf), ("type", customer_type)):
+        chunk[column] = chunk[column].fillna(default) if column in chunk.columns else default
+    return chunk
+
+
+def reprice_catalog(input_path: str, output_path: str, scenario: PricingScenario,
+                    dest_uf: str = "SP", customer_type: str = "Contribuinte",
+                    chunk_size: int = DEFAULT_CHUNK_SIZE, sheet: str = None,
+                    sep: str = None, decimal: str = ".") -> int:
+    """
+    Precifica o catálogo bloco a bloco e grava o resultado. Retorna o nº de linhas.
+    Colunas `uf` e `type` do arquivo prevalecem sobre dest_uf/customer_type.
+    """
+    if input_path.lower().endswith((".xlsx", ".xlsm")):
+        chunks = iter_xlsx_chunks(input_path, chunk_size, sheet)
+    else:
+        chunks = iter_csv_chunks(input_path, chunk_size, sep, decimal)
+
+    if output_path.lower().endswith(".xlsx"):
+        writer = XlsxResultWriter(output_path)
+    else:
+        writer = CsvResultWriter(output_path, sep or ",")
+
+    pricer = BatchProductPricer(scenario)
+    total_rows = 0
+    try:
+        for chunk in chunks:
+            chunk = prepare_chunk(chunk, dest_uf, customer_type)
+            priced = pricer.calculate_selling_prices(chunk)
+            extra = [column for column in priced.columns if column not in chunk.columns]
+            with METRICS.span("repricer.write"):
+                writer.write(pd.concat([chunk, priced[extra]], axis=1))
+            total_rows += len(chunk)
+    finally:
+        writer.close()
+    return total_rows
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Reprecifica listas de fornecedores (CSV/XLSX) em streaming.")
+    parser.add_argument("entrada", help="Arquivo de entrada (.csv ou .xlsx)")
+    parser.add_argument("saida", help="Arquivo de saída (.csv ou .xlsx)")
+    parser.add_argument("--uf", default="SP", help="UF destino quando o arquivo não tem a coluna 'uf'")
+    parser.add_argument("--tipo", default="Contribuinte", choices=["Contribuinte", "Nao_Contribuinte"],
+                        help="Tipo de cliente quando o arquivo não tem a coluna 'type'")
+    parser.add_argument("--margem", type=float, default=PricingScenario().target_margin, help="Margem alvo (fração)")
+    parser.add_argument("--comissao", type=float, default=PricingScenario().commission_rate, help="Comissão (fração)")
+    parser.add_argument("--adm", type=float, default=PricingScenario().admin_cost_rate, help="Custo administrativo (fração)")
+    parser.add_argument("--bloco", type=int, default=DEFAULT_CHUNK_SIZE, help="Linhas por bloco")
+    parser.add_argument("--aba", default=None, help="Aba da planilha de entrada (padrão: ativa)")
+    parser.add_argument("--sep", default=None, help="Separador do CSV (padrão: detectar)")
+    parser.add_argument("--decimal", default=".", help="Separador decimal do CSV de entrada")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    if not os.path.exists(args.entrada):
+        print(f"Arquivo não encontrado: {args.entrada}", file=sys.stderr)
+        return 1
+
+    scenario = PricingScenario(commission_rate=args.comissao, admin_cost_rate=args.adm, target_margin=args.margem)
+    try:
+        rows = reprice_catalog(args.entrada, args.saida, scenario, args.uf, args.tipo,
+                               args.bloco, args.aba, args.sep, args.decimal)
+    except ValueError as e:
+        print(f"Erro de precificação: {e}", file=sys.stderr)
+        return 1
+
+    print(f"{rows} linhas precificadas -> {args.saida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
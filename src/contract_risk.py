@@ -0,0 +1,193 @@
+# src/contract_risk.py
+"""
+Simulação de Monte Carlo do risco de margem dos contratos de serviço.
+
+O ServicePricer forma a mensalidade com estimativas pontuais de visitas, horas
+e peças. Aqui a mensalidade fica fixa (a cotada) e o custo realizado ao longo
+da vigência é sorteado:
+
+    visitas no período   Poisson com sobredispersão (gama-Poisson); média = visitas/ano x meses / 12
+                         (serviço pontual: 1 visita por mês, sem sorteio)
+    horas por atendimento gama por máquina/visita; média = horas informadas, CV = hours_cv
+    peças                gama por máquina/mês; média = estimativa mensal, CV = parts_cv
+    km e amortização     determinísticos (km do roteiro x visitas sorteadas)
+
+Somas de gamas com a mesma escala são gama, então o total de cada contrato
+sai de um único sorteio, qualquer que seja o nº de visitas ou meses. As médias
+simuladas batem com a estimativa pontual; a dispersão é que gera o risco.
+
+As variabilidades padrão vêm de RiskAssumptions e podem ser sobrepostas por
+contrato com colunas parts_cv, hours_cv e visits_dispersion.
+
+A carteira é dividida em blocos de contratos com sementes derivadas da semente
+informada (SeedSequence), então o resultado é o mesmo com ou sem processos.
+
+Uso:
+    sim = ContractRiskSimulator(PricingScenario(), simulations=20_000, seed=42)
+    risco = sim.run(carteira)            # margem p5/p50/p95 e probabilidade de prejuízo
+    um = sim.simulate_contract(servico)
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from src.models import ServiceInput, PricingScenario, RiskAssumptions
+from src.service_engine import BatchServicePricer, ServicePricer
+from src.instrumentation import METRICS
+
+DEFAULT_PERCENTILES = (5, 50, 95)
+
+def _column(frame: pd.DataFrame, name: str, default) -> np.ndarray:
+    if name in frame.columns:
+        return frame[name].to_numpy(dtype=float)
+    return np.full(len(frame), default, dtype=float)
+
+
+def _gamma_total(rng, count, mean, cv):
+    """Soma de `count` sorteios gama de média `mean` e CV `cv` (cv 0 = determinístico)."""
+    if not (cv > 0).any():
+        return count * mean
+    cv2 = np.where(cv > 0, cv * cv, 1.0)
+    total = rng.gamma(count / cv2, mean * cv2)
+    return np.where(cv > 0, total, count * mean)
+
+
+def _simulate_block(drivers: dict, simulations: int, entropy: int, block: int, percentiles) -> dict:
+    """Sorteia `simulations` vigências para um bloco de contratos (linhas = contratos)."""
+    rng = np.random.default_rng(np.random.SeedSequence(entropy, spawn_key=(block,)))
+    column = {name: np.asarray(values)[:, None] for name, values in drivers.items()}
+    shape = (len(drivers["monthly_price"]), simulations)
+
+    # 1. Visitas no período (gama-Poisson; dispersão 0 = Poisson)
+    months = column["months"]
+    expected_visits = np.broadcast_to(column["visits_year"] * months / 12.0, shape)
+    dispersion = column["visits_dispersion"]
+    if (dispersion > 0).any():
+        safe = np.where(dispersion > 0, dispersion, 1.0)
+        rate = np.where(dispersion > 0, rng.gamma(1.0 / safe, expected_visits * safe, shape), expected_visits)
+    else:
+        rate = expected_visits
+    visits = np.where(column["is_pontual"], months, rng.poisson(rate))
+
+    # 2. Mão de obra: horas de cada máquina em cada visita
+    hours = _gamma_total(rng, visits * column["quantity"], column["hours"], column["hours_cv"])
+    labor_cost = hours * ServicePricer.COST_HOUR_TECH
+
+    # 3. Logística: km por visita realizada
+    logistics_cost = visits * column["km_per_visit"] * ServicePricer.COST_KM
+
+    # 4. Peças: cada máquina em cada mês
+    parts_cost = _gamma_total(rng, np.broadcast_to(months * column["quantity"], shape),
+                              column["parts"], column["parts_cv"])
+
+    # 5. Margem líquida realizada na vigência (mensalidade fixa)
+    total_cost = labor_cost + logistics_cost + parts_cost + column["asset_amortization"] * months
+    revenue = column["monthly_price"] * months
+    with np.errstate(divide="ignore", invalid="ignore"):
+        margin = 1.0 - column["tax_rate"] - column["commission_rate"] - total_cost / revenue
+
+    return {
+        "margin_mean": margin.mean(axis=1),
+        "percentiles": np.percentile(margin, percentiles, axis=1),
+        "loss_probability": (margin < 0).mean(axis=1),
+        "cost_mean": total_cost.mean(axis=1) / months[:, 0],
+    }
+
+
+class ContractRiskSimulator:
+    """
+    Distribuição da margem líquida de cada contrato da carteira, com a
+    mensalidade formada pelo BatchServicePricer.
+    """
+
+    # Contratos por bloco: unidade de semente e de divisão entre processos
+    BLOCK_SIZE = 64
+    # Abaixo deste nº de sorteios (contratos x simulações), processos não compensam
+    PARALLEL_THRESHOLD = 50_000_000
+
+    def __init__(self, scenario: PricingScenario = None, assumptions: RiskAssumptions = None,
+                 simulations: int = 10_000, seed: int = None, percentiles=DEFAULT_PERCENTILES):
+        if simulations < 1:
+            raise ValueError("simulations deve ser >= 1")
+        self.pricer = BatchServicePricer(scenario)
+        self.assumptions = assumptions or RiskAssumptions()
+        self.simulations = int(simulations)
+        # Sem semente, sorteia uma e guarda (o resultado continua reproduzível)
+        self.seed = np.random.SeedSequence(seed).entropy
+        self.percentiles = tuple(percentiles)
+
+    def _drivers(self, frame: pd.DataFrame, validate: bool) -> tuple:
+        priced = self.pricer.calculate_contract_prices(frame, validate=validate)
+        if validate:
+            RiskAssumptions.validate_columns(frame, required=())
+        type_code = self.pricer.encode_service_types(frame["service_type"].to_numpy())
+        scenario = self.pricer.scenario
+
+        drivers = {
+            "monthly_price": priced["monthly_price"].to_numpy(dtype=float),
+            "tax_rate": priced["tax_rate_used"].to_numpy(dtype=float),
+            "commission_rate": _column(frame, "commission_rate", scenario.commission_rate),
+            "asset_amortization": priced["Amortização Ativos"].to_numpy(dtype=float),
+            "is_pontual": self.pricer.TYPE_IS_PONTUAL[type_code],
+            "hours": frame["technical_hours_per_visit"].to_numpy(dtype=float),
+        }
+        for name, field in (("quantity", "ups_quantity"), ("visits_year", "visits_per_year"),
+                            ("parts", "parts_cost_estimation_monthly")):
+            drivers[name] = _column(frame, field, self.pricer.SERVICE_DEFAULTS[field])
+        # Km por visita: roteiro calculado ou distância x locais (como no BatchServicePricer)
+        route_km = _column(frame, "route_km_round_trip", np.nan)
+        locations = _column(frame, "num_locations", self.pricer.SERVICE_DEFAULTS["num_locations"])
+        distance = frame["distance_km_round_trip"].to_numpy(dtype=float)
+        drivers["km_per_visit"] = self.pricer.km_per_visit(distance, locations, route_km)
+        # Vigência zero é simulada como um mês
+        months = _column(frame, "contract_duration_months", self.pricer.SERVICE_DEFAULTS["contract_duration_months"])
+        drivers["months"] = np.maximum(months, 1.0)
+        for name in RiskAssumptions.model_fields:
+            drivers[name] = _column(frame, name, getattr(self.assumptions, name))
+        return priced, drivers
+
+    def run(self, portfolio, max_workers: int = None, validate: bool = True) -> pd.DataFrame:
+        """
+        Uma linha por contrato: mensalidade cotada, margem esperada, percentis da
+        margem (margin_pNN, em %) e probabilidade de prejuízo (fração).
+        max_workers=1 força um único processo.
+        """
+        frame = portfolio if isinstance(portfolio, pd.DataFrame) else pd.DataFrame(portfolio)
+        priced, drivers = self._drivers(frame, validate)
+        total = len(frame)
+        bounds = [(start, min(start + self.BLOCK_SIZE, total)) for start in range(0, total, self.BLOCK_SIZE)]
+        workers = max_workers or os.cpu_count() or 1
+        arguments = [
+            ({name: values[start:stop] for name, values in drivers.items()},
+             self.simulations, self.seed, block, self.percentiles)
+            for block, (start, stop) in enumerate(bounds)
+        ]
+
+        with METRICS.span("contract_risk.simulate"):
+            if total * self.simulations < self.PARALLEL_THRESHOLD or workers == 1 or len(bounds) == 1:
+                parts = [_simulate_block(*args) for args in arguments]
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    parts = list(pool.map(_simulate_block, *zip(*arguments), chunksize=max(1, len(bounds) // (workers * 4))))
+        METRICS.increment("contract_risk.draws", total * self.simulations)
+
+        result = pd.DataFrame(index=frame.index)
+        result["service_type"] = frame["service_type"].to_numpy()
+        result["monthly_price"] = priced["monthly_price"].to_numpy()
+        result["target_margin_pct"] = np.round(
+            _column(frame, "target_margin", self.pricer.scenario.target_margin) * 100, 2)
+        if parts:
+            result["expected_cost_monthly"] = np.round(np.concatenate([part["cost_mean"] for part in parts]), 2)
+            result["margin_mean_pct"] = np.round(np.concatenate([part["margin_mean"] for part in parts]) * 100, 2)
+            percentiles = np.concatenate([part["percentiles"] for part in parts], axis=1)
+            for position, percentile in enumerate(self.percentiles):
+                result[f"margin_p{percentile:02g}_pct"] = np.round(percentiles[position] * 100, 2)
+            result["loss_probability"] = np.concatenate([part["loss_probability"] for part in parts])
+        return result
+
+    def simulate_contract(self, service: ServiceInput) -> dict:
+        """Risco de um único contrato (mesmo formato de uma linha de run)."""
+        row = self.run(pd.DataFrame([service.model_dump()]), max_workers=1)
+        return row.iloc[0].to_dict()
@@ -0,0 +1,101 @@
+# src/fixed_point.py
+"""
+Aritmética de ponto fixo para o modo em centavos dos motores.
+
+Valores monetários em centavos (int) e alíquotas em pontos-base
+(1 bp = 0,01%, int). Cada multiplicação por alíquota é uma divisão inteira
+com arredondamento explícito, então os totais fecham exatamente e o mesmo
+cálculo dá sempre o mesmo resultado (sem o round(..., 2) sobre float).
+
+Políticas de arredondamento (parâmetro `rounding`):
+    "half_even"  metade para o par (ABNT NBR 5891) - padrão
+    "half_up"    metade para longe do zero
+    "down"       trunca em direção ao zero
+
+As funções aceitam int Python (caminho escalar) ou arrays int64 (lote).
+"""
+import numpy as np
+
+RATE_SCALE = 10_000  # pontos-base por 1,00
+ROUNDING_MODES = ("half_even", "half_up", "down")
+DEFAULT_ROUNDING = "half_even"
+
+
+def check_rounding(rounding: str) -> str:
+    if rounding not in ROUNDING_MODES:
+        raise ValueError(f"rounding deve ser um de {ROUNDING_MODES}")
+    return rounding
+
+
+def to_cents(value):
+    """Reais -> centavos (int ou array int64), arredondando a metade para o par."""
+    if isinstance(value, (int, float)):
+        return int(round(value * 100))
+    return np.rint(np.asarray(value, dtype=float) * 100).astype(np.int64)
+
+
+def to_bp(rate):
+    """Fração -> pontos-base (0.0975 -> 975). Alíquotas mais finas que 0,01% são arredondadas."""
+    if isinstance(rate, (int, float)):
+        return round(rate * RATE_SCALE)
+    return np.rint(np.asarray(rate, dtype=float) * RATE_SCALE).astype(np.int64)
+
+
+def from_cents(cents):
+    """Centavos -> reais (float com no máximo 2 casas)."""
+    if isinstance(cents, (int, np.integer)):
+        return int(cents) / 100
+    return np.asarray(cents, dtype=np.int64) / 100
+
+
+# Divisões escalares (int Python) por política. divmod usa piso, então
+# q + r/d vale também para numeradores negativos.
+
+def _div_half_even(numerator: int, denominator: int) -> int:
+    quotient, remainder = divmod(numerator, denominator)
+    remainder += remainder
+    if remainder > denominator or (remainder == denominator and quotient & 1):
+        return quotient + 1
+    return quotient
+
+
+def _div_half_up(numerator: int, denominator: int) -> int:
+    quotient, remainder = divmod(numerator, denominator)
+    remainder += remainder
+    if remainder > denominator or (remainder == denominator and quotient >= 0):
+        return quotient + 1
+    return quotient
+
+
+def _div_down(numerator: int, denominator: int) -> int:
+    quotient, remainder = divmod(numerator, denominator)
+    if remainder and quotient < 0:
+        return quotient + 1
+    return quotient
+
+
+SCALAR_DIVIDERS = {"half_even": _div_half_even, "half_up": _div_half_up, "down": _div_down}
+
+
+def scalar_divider(rounding: str = DEFAULT_ROUNDING):
+    """Função (numerador, denominador) -> int da política; usada nos caminhos por cotação."""
+    return SCALAR_DIVIDERS[check_rounding(rounding)]
+
+
+def div_round(numerator, denominator, rounding: str = DEFAULT_ROUNDING):
+    """Divisão inteira numerator / denominator (denominador > 0) com a política informada."""
+    if isinstance(numerator, (int, np.integer)) and isinstance(denominator, (int, np.integer)):
+        return SCALAR_DIVIDERS[rounding](int(numerator), int(denominator))
+
+    quotient, remainder = np.divmod(np.asarray(numerator, dtype=np.int64), denominator)
+    if rounding == "down":
+        return quotient + ((remainder > 0) & (quotient < 0))
+    twice = remainder + remainder
+    if rounding == "half_up":
+        return quotient + ((twice > denominator) | ((twice == denominator) & (quotient >= 0)))
+    return quotient + ((twice > denominator) | ((twice == denominator) & ((quotient & 1) == 1)))
+
+
+def apply_rate(cents, rate_bp, rounding: str = DEFAULT_ROUNDING):
+    """Valor em centavos x alíquota em bp, arredondado para centavos."""
+    return div_round(cents * rate_bp, RATE_SCALE, rounding)
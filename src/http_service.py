@@ -0,0 +1,286 @@
+# src/http_service.py
+"""
+Serviço HTTP local (asyncio, só biblioteca padrão) para ERP/CRM.
+
+Usa os mesmos ProductPricer, ServicePricer e precificadores em lote do app, então
+os valores batem com a interface. Conexões HTTP/1.1 são mantidas abertas
+(keep-alive) e o nº de requisições processadas ao mesmo tempo é limitado.
+
+Rotas:
+    GET  /health
+    POST /v1/product          {"product": {...}, "customer": {...}, "scenario": {...}}
+    POST /v1/service          {"service": {...}, "scenario": {...}}   (serviço pontual)
+    POST /v1/contract         {"service": {...}, "scenario": {...}}
+    POST /v1/batch/products   {"items": [{...produto + uf/type...}], "scenario": {...}}
+    POST /v1/batch/contracts  {"items": [{...ServiceInput...}], "scenario": {...}}
+
+Uso:
+    python -m src.http_service --host 127.0.0.1 --port 8765
+"""
+import argparse
+import asyncio
+import json
+import logging
+from http import HTTPStatus
+
+import pandas as pd
+from pydantic import ValidationError
+
+from config.tax_rates import TaxConstants
+from src.models import ProductInput, CustomerContext, PricingScenario, ServiceInput
+from src.pricing_engine import ProductPricer, BatchProductPricer
+from src.service_engine import ServicePricer, BatchServicePricer
+
+MAX_BODY_BYTES = 64 * 1024 * 1024
+MAX_BATCH_ITEMS = 100_000
+
+logger = logging.getLogger(__name__)
+
+
+class HTTPError(Exception):
+    def __init__(self, status: HTTPStatus, message: str, details=None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.details = details
+
+
+def _frame_to_records(frame: pd.DataFrame) -> list:
+    # NaN (linhas acima da trava de 95%) vira null no JSON
+    return frame.astype(object).where(frame.notna(), None).to_dict(orient="records")
+
+
+def _object(payload: dict, key: str) -> dict:
+    # Campo ausente ou null = objeto vazio (o modelo aponta os obrigatórios); outro tipo é 422
+    value = payload.get(key)
+    if value is None:
+        return {}
+    if not isinstance(value, dict):
+        raise HTTPError(HTTPStatus.UNPROCESSABLE_ENTITY, f"'{key}' deve ser um objeto JSON")
+    return value
+
+
+def _scenario(payload: dict) -> PricingScenario:
+    return PricingScenario(**_object(payload, "scenario"))
+
+
+def _items(payload: dict) -> pd.DataFrame:
+    items = payload.get("items")
+    if not isinstance(items, list) or not items:
+        raise HTTPError(HTTPStatus.UNPROCESSABLE_ENTITY, "'items' deve ser uma lista não vazia")
+    if len(items) > MAX_BATCH_ITEMS:
+        raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Máximo de {MAX_BATCH_ITEMS} itens por requisição")
+    if not all(isinstance(item, dict) for item in items):
+        raise HTTPError(HTTPStatus.UNPROCESSABLE_ENTITY, "Cada item de 'items' deve ser um objeto JSON")
+    return pd.DataFrame(items)
+
+
+# --- Handlers (síncronos; os de lote rodam fora do event loop) ---
+
+def price_product(payload: dict) -> dict:
+    product = ProductInput(**_object(payload, "product"))
+    customer = CustomerContext(**_object(payload, "customer"))
+    return ProductPricer(product, customer, _scenario(payload)).calculate_selling_price()
+
+
+def price_service(payload: dict) -> dict:
+    # Mesmos valores fixos do "Precificador de Serviços (Pontual)" do app
+    fields = dict(_object(payload, "service"))
+    fields.update(service_type="Serviço Pontual (Avulso)", contract_duration_months=1, visits_per_year=1)
+    fields.setdefault("ups_type", fields.get("ups_power", ""))
+    return ServicePricer(ServiceInput(**fields), _scenario(payload)).calculate_contract_price()
+
+
+def price_contract(payload: dict) -> dict:
+    service = ServiceInput(**_object(payload, "service"))
+    return ServicePricer(service, _scenario(payload)).calculate_contract_price()
+
+
+def price_product_batch(payload: dict) -> dict:
+    priced = BatchProductPricer(_scenario(payload)).calculate_selling_prices(_items(payload), errors="coerce")
+    return {"count": len(priced), "results": _frame_to_records(priced)}
+
+
+def price_contract_batch(payload: dict) -> dict:
+    contracts = BatchServicePricer(_scenario(payload)).calculate_contract_prices(_items(payload))
+    return {
+        "count": len(contracts),
+        "totals": BatchServicePricer.portfolio_totals(contracts),
+        "results": _frame_to_records(contracts),
+    }
+
+
+def health(payload: dict) -> dict:
+    return {"status": "ok", "tax_table": TaxConstants.TABLE_VERSION}
+
+
+# rota -> (método, handler, roda em thread)
+ROUTES = {
+    "/health": ("GET", health, False),
+    "/v1/product": ("POST", price_product, False),
+    "/v1/service": ("POST", price_service, False),
+    "/v1/contract": ("POST", price_contract, False),
+    "/v1/batch/products": ("POST", price_product_batch, True),
+    "/v1/batch/contracts": ("POST", price_contract_batch, True),
+}
+
+
+class PricingHTTPServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765,
+                 max_concurrency: int = 32, keepalive_timeout: float = 15.0,
+                 max_body_bytes: int = MAX_BODY_BYTES):
+        self.host = host
+        self.port = port
+        self.max_concurrency = max_concurrency
+        self.keepalive_timeout = keepalive_timeout
+        self.max_body_bytes = max_body_bytes
+        self._semaphore = None
+        self._server = None
+
+    async def start(self):
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        # port=0 escolhe uma porta livre (útil em testes)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _read_request(self, reader: asyncio.StreamReader):
+        request_line = await asyncio.wait_for(reader.readline(), self.keepalive_timeout)
+        if not request_line:
+            return None
+        try:
+            method, target, version = request_line.decode("latin-1").split()
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Linha de requisição inválida")
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            raise HTTPError(HTTPStatus.NOT_IMPLEMENTED, "Transfer-Encoding chunked não suportado")
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Content-Length inválido")
+        if length < 0:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Content-Length inválido")
+        if length > self.max_body_bytes:
+            raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Corpo da requisição muito grande")
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), target.split("?", 1)[0], version.upper(), headers, body
+
+    async def _dispatch(self, method: str, path: str, body: bytes):
+        route = ROUTES.get(path)
+        if route is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"Rota não encontrada: {path}")
+        expected_method, handler, threaded = route
+        if method != expected_method:
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, f"Use {expected_method} em {path}")
+
+        payload = {}
+        if body:
+            try:
+                payload = json.loads(body)
+            except json.JSONDecodeError as e:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, f"JSON inválido: {e}")
+            if not isinstance(payload, dict):
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "O corpo deve ser um objeto JSON")
+
+        async with self._semaphore:
+            try:
+                if threaded:
+                    return await asyncio.to_thread(handler, payload)
+                return handler(payload)
+            except ValidationError as e:
+                raise HTTPError(HTTPStatus.UNPROCESSABLE_ENTITY, "Dados inválidos",
+                                json.loads(e.json(include_url=False)))
+            except ValueError as e:
+                raise HTTPError(HTTPStatus.UNPROCESSABLE_ENTITY, str(e))
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                # Erro na leitura: não dá para confiar no restante do stream, fecha a conexão
+                keep_alive = False
+                request = None
+                try:
+                    request = await self._read_request(reader)
+                    if request is None:
+                        break
+                    method, path, version, headers, body = request
+                    connection = headers.get("connection", "").lower()
+                    keep_alive = connection == "keep-alive" if version == "HTTP/1.0" else connection != "close"
+                    status, result = HTTPStatus.OK, await self._dispatch(method, path, body)
+                except HTTPError as e:
+                    status, result = e.status, {"error": e.message}
+                    if e.details is not None:
+                        result["details"] = e.details
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    raise
+                except Exception:
+                    # Falha inesperada de uma requisição não derruba a conexão
+                    logger.exception("Erro ao processar %s", request[:2] if request else "requisição")
+                    status, result = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Erro interno do servidor"}
+
+                payload = json.dumps(result, ensure_ascii=False, default=str).encode("utf-8")
+                head = (
+                    f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                    "Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(payload)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+                )
+                if keep_alive:
+                    head += f"Keep-Alive: timeout={int(self.keepalive_timeout)}\r\n"
+                writer.write(head.encode("latin-1") + b"\r\n" + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serviço HTTP local de precificação.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--max-concurrency", type=int, default=32, help="Requisições processadas ao mesmo tempo")
+    parser.add_argument("--keepalive", type=float, default=15.0, help="Tempo ocioso (s) antes de fechar a conexão")
+    args = parser.parse_args(argv)
+
+    server = PricingHTTPServer(args.host, args.port, args.max_concurrency, args.keepalive)
+
+    async def run():
+        await server.start()
+        print(f"Serviço de precificação em http://{server.host}:{server.port}")
+        await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+# src/instrumentation.py
+"""
+Instrumentação opcional dos caminhos quentes (histogramas de latência por etapa).
+
+Uso:
+    from src.instrumentation import METRICS
+    METRICS.enabled = True          # ou variável de ambiente PRICING_METRICS=1
+    ... precificações ...
+    print(METRICS.to_prometheus())  # ou METRICS.to_json()
+
+Nos caminhos quentes, METRICS.timer(prefixo) marca o fim de cada etapa com
+lap(nome), sem reindentar o código. Desligado (padrão), timer() e span() devolvem
+sempre o mesmo objeto vazio: o custo é uma chamada de método por etapa.
+"""
+import bisect
+import json
+import os
+import threading
+import time
+
+# Limites dos buckets em segundos (1 µs a 10 s)
+DEFAULT_BUCKETS = (
+    1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4,
+    1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "count", "sum", "max")
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # último = +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Estimativa pelo limite superior do bucket (como histogram_quantile)."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, self.counts):
+            cumulative += bucket_count
+            if cumulative >= target:
+                return bound
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum_seconds": self.sum,
+            "mean_seconds": self.sum / self.count if self.count else 0.0,
+            "max_seconds": self.max,
+            "p50_seconds": self.quantile(0.50),
+            "p95_seconds": self.quantile(0.95),
+            "p99_seconds": self.quantile(0.99),
+            "buckets": {str(bound): count for bound, count in zip(self.buckets + ("+Inf",), self.counts)},
+        }
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("registry", "name", "started")
+
+    def __init__(self, registry, name: str):
+        self.registry = registry
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.observe(self.name, time.perf_counter() - self.started)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def lap(self, stage: str):
+        pass
+
+
+# Cronômetro que não registra nada (timer() desligado; também para etapas que não devem ser medidas)
+NULL_TIMER = _NullTimer()
+
+
+class _StageTimer:
+    __slots__ = ("registry", "prefix", "last")
+
+    def __init__(self, registry, prefix: str):
+        self.registry = registry
+        self.prefix = prefix
+        self.last = time.perf_counter()
+
+    def lap(self, stage: str):
+        """Registra o tempo desde o lap anterior (ou da criação) como a etapa `stage`."""
+        now = time.perf_counter()
+        self.registry.observe(f"{self.prefix}.{stage}", now - self.last)
+        self.last = now
+
+
+class MetricsRegistry:
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.histograms = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def span(self, name: str):
+        """Mede a duração do bloco `with` e registra no histograma `name`."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name)
+
+    def timer(self, prefix: str):
+        """Cronômetro de etapas sequenciais: timer.lap("etapa") ao fim de cada uma."""
+        if not self.enabled:
+            return NULL_TIMER
+        return _StageTimer(self, prefix)
+
+    def observe(self, name: str, seconds: float):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    def increment(self, name: str, value: int = 1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "histograms": {name: h.to_dict() for name, h in sorted(self.histograms.items())},
+                "counters": dict(sorted(self.counters.items())),
+            }
+
+    def to_json(self, indent: int = 2) -> str:
+        return json.dumps(self.to_dict(), indent=indent)
+
+    def to_prometheus(self, prefix: str = "nbtech_pricing") -> str:
+        """Formato texto do Prometheus (etapa como label)."""
+        lines = [
+            f"# HELP {prefix}_stage_seconds Latência por etapa de precificação.",
+            f"# TYPE {prefix}_stage_seconds histogram",
+        ]
+        with self._lock:
+            for name, histogram in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + ("+Inf",), histogram.counts):
+                    cumulative += count
+                    lines.append(f'{prefix}_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} {histogram.sum}')
+                lines.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {histogram.count}')
+
+            lines.append(f"# HELP {prefix}_events_total Contadores de eventos de precificação.")
+            lines.append(f"# TYPE {prefix}_events_total counter")
+            for name, value in sorted(self.counters.items()):
+                lines.append(f'{prefix}_events_total{{event="{name}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+# Registro global usado pelos motores
+METRICS = MetricsRegistry(enabled=os.environ.get("PRICING_METRICS", "") not in ("", "0"))
@@ -0,0 +1,176 @@
+# src/invoice.py
+"""
+Cotação de pedido com vários itens para um mesmo cliente.
+
+Nobreaks, baterias e placas (IPI/MVA diferentes) no mesmo pedido: o contexto
+fiscal do cliente (UF, tipo, alíquota interna do destino) é resolvido uma vez
+e todos os itens são precificados numa única passada do BatchProductPricer,
+com as mesmas regras do ProductPricer item a item.
+
+Valores por linha = unitário x quantidade, arredondados na linha; os totais da
+nota são a soma das linhas (fecham exatamente com o que é impresso). No modo
+ponto fixo (fixed_point=True) os valores de linha são centavos inteiros x
+quantidade e os totais somam centavos (também devolvidos em "centavos").
+
+Uso:
+    pedido = InvoiceQuote(CustomerContext(uf="BA", type="Contribuinte"), PricingScenario())
+    pedido.add_item(nobreak, quantity=10)
+    pedido.add_item(bateria, quantity=40)
+    resultado = pedido.calculate()   # {"lines": DataFrame, "totals": {...}}
+"""
+import numpy as np
+import pandas as pd
+
+from src.models import ProductInput, CustomerContext, PricingScenario
+from src.pricing_engine import BatchProductPricer
+from src.quote_store import QUOTE_HISTORY
+from src.fixed_point import DEFAULT_ROUNDING, check_rounding
+
+# Valores unitários do BatchProductPricer que viram valores de linha (x quantidade)
+AMOUNT_COLUMNS = ("pis_cofins", "ipi", "icms_own", "difal", "icms_st", "commission", "admin_expenses", "net_profit")
+ITEM_COLUMNS = ("name", "ncm", "cost_price", "ipi_rate", "mva_st", "origin_uf")
+
+
+class InvoiceQuote:
+    """Itens de um pedido para um CustomerContext, calculados em lote."""
+
+    def __init__(self, customer: CustomerContext, scenario: PricingScenario = None, tax_table=None,
+                 fixed_point: bool = False, rounding: str = DEFAULT_ROUNDING):
+        self.customer = customer
+        self.pricer = BatchProductPricer(scenario, tax_table)
+        self.fixed_point = fixed_point
+        self.rounding = check_rounding(rounding)
+        # Contexto fiscal do cliente: o mesmo para todas as linhas
+        self.tax_context = {
+            "uf": customer.uf,
+            "type": customer.type,
+            "internal_icms_dest": customer.internal_icms_dest,
+            "table_version": self.pricer.tax_table.version,
+        }
+        self._items = {column: [] for column in ITEM_COLUMNS + ("quantity",)}
+        self._result = None
+
+    def __len__(self) -> int:
+        return len(self._items["quantity"])
+
+    def add_item(self, product: ProductInput, quantity: int = 1) -> int:
+        """Inclui um item (produto já validado pelo ProductInput). Retorna o nº da linha."""
+        if quantity < 1 or int(quantity) != quantity:
+            raise ValueError("quantity deve ser um inteiro >= 1")
+        for column in ITEM_COLUMNS:
+            self._items[column].append(getattr(product, column))
+        self._items["quantity"].append(int(quantity))
+        self._result = None
+        return len(self)
+
+    def add_items(self, items) -> int:
+        """
+        Inclui vários itens: DataFrame/dicionário com as colunas de ProductInput e
+        `quantity` (padrão 1), validado por coluna, ou iterável de (ProductInput, quantidade).
+        """
+        if isinstance(items, (pd.DataFrame, dict)):
+            frame = pd.DataFrame(items)
+            ProductInput.validate_columns(frame, required=("name", "ncm", "cost_price"))
+            quantity = frame["quantity"] if "quantity" in frame.columns else pd.Series(1, index=frame.index)
+            quantity = pd.to_numeric(quantity, errors="coerce").to_numpy(dtype=float)
+            if not (np.isfinite(quantity).all() and (quantity >= 1).all() and (quantity == np.round(quantity)).all()):
+                raise ValueError("quantity deve ser um inteiro >= 1")
+            ipi_rate, mva_st = BatchProductPricer.resolve_ncm_rates(frame)
+            columns = {
+                "name": frame["name"].tolist(), "ncm": frame["ncm"].tolist(),
+                "cost_price": frame["cost_price"].astype(float).tolist(),
+                "ipi_rate": ipi_rate.tolist(), "mva_st": mva_st.tolist(),
+                "origin_uf": (frame["origin_uf"].fillna(BatchProductPricer.PRODUCT_DEFAULTS["origin_uf"]).tolist()
+                              if "origin_uf" in frame.columns
+                              else [BatchProductPricer.PRODUCT_DEFAULTS["origin_uf"]] * len(frame)),
+                "quantity": quantity.astype(np.int64).tolist(),
+            }
+            for column, values in columns.items():
+                self._items[column].extend(values)
+            self._result = None
+        else:
+            for product, quantity in items:
+                self.add_item(product, quantity)
+        return len(self)
+
+    def _catalog(self) -> pd.DataFrame:
+        columns = {column: self._items[column] for column in ITEM_COLUMNS}
+        # Contexto do cliente replicado (escalares: sem resolução por linha)
+        for column in ("uf", "type", "internal_icms_dest"):
+            columns[column] = [self.tax_context[column]] * len(self)
+        return pd.DataFrame(columns)
+
+    def _priced_cents(self, catalog: pd.DataFrame, quantity: np.ndarray, errors: str) -> tuple:
+        """
+        Modo ponto fixo: (unitários em reais para exibição/histórico, valores de linha
+        em centavos int64 = unitário em centavos x quantidade, máscara de bloqueados).
+        """
+        priced = self.pricer.calculate_selling_prices_cents(catalog, errors=errors, validate=False,
+                                                            rounding=self.rounding)
+        blocked = priced["blocked"].to_numpy()
+        cents = {"products_total": priced["selling_price_cents"].to_numpy() * quantity}
+        for column in AMOUNT_COLUMNS:
+            cents[column] = priced[f"{column}_cents"].to_numpy() * quantity
+        cents["invoice_total"] = cents["products_total"] + cents["ipi"] + cents["icms_st"]
+
+        unit = {"selling_price_suggested": priced["selling_price_cents"].to_numpy() / 100}
+        for column in ("cost_price",) + AMOUNT_COLUMNS:
+            unit[column] = priced[f"{column}_cents"].to_numpy() / 100
+        unit["net_margin_pct"] = priced["net_margin_bp"].to_numpy() / 100
+        unit = pd.DataFrame({column: np.where(blocked, np.nan, values) for column, values in unit.items()})
+        return unit, cents, blocked
+
+    def calculate(self, errors: str = "raise") -> dict:
+        """
+        {"lines": uma linha por item (unitário e valores da linha), "totals": totais da nota}.
+        errors="coerce" mantém itens acima da trava de 95% com NaN (fora dos totais).
+        """
+        if self._result is not None and errors == "raise":
+            return self._result
+        if not len(self):
+            raise ValueError("Pedido sem itens")
+
+        catalog = self._catalog()
+        quantity = np.asarray(self._items["quantity"], dtype=np.int64)
+
+        # 1. Passada única pelo precificador; valores de linha = unitário x quantidade
+        #    (ponto fixo: em centavos inteiros, convertidos para reais só na exibição)
+        if self.fixed_point:
+            unit, cents, blocked = self._priced_cents(catalog, quantity, errors)
+            amounts = {column: np.where(blocked, np.nan, values / 100) for column, values in cents.items()}
+        else:
+            unit = self.pricer.calculate_selling_prices(catalog, errors=errors, validate=False)
+            amounts = {"products_total": np.round(unit["selling_price_suggested"].to_numpy(dtype=float) * quantity, 2)}
+            for column in AMOUNT_COLUMNS:
+                amounts[column] = np.round(unit[column].to_numpy(dtype=float) * quantity, 2)
+            # 2. Total da nota por linha: produtos + IPI + ICMS-ST (DIFAL do não contribuinte está no preço)
+            amounts["invoice_total"] = np.round(amounts["products_total"] + amounts["ipi"] + amounts["icms_st"], 2)
+        unit_price = unit["selling_price_suggested"].to_numpy(dtype=float)
+        lines = pd.DataFrame({
+            "line": np.arange(1, len(self) + 1),
+            "name": self._items["name"], "ncm": self._items["ncm"], "origin_uf": self._items["origin_uf"],
+            "quantity": quantity, "unit_price": unit_price, **amounts,
+        })
+
+        # 3. Totais = soma das linhas já arredondadas (ponto fixo: soma exata em centavos)
+        valid = ~np.isnan(unit_price)
+        totals = {"items": int(valid.sum()), "quantity": int(quantity[valid].sum())}
+        for column, values in amounts.items():
+            if self.fixed_point:
+                totals[column] = int(cents[column][valid].sum()) / 100
+            else:
+                totals[column] = round(float(values[valid].sum()), 2)
+        totals["net_margin_pct"] = (round(totals["net_profit"] / totals["products_total"] * 100, 2)
+                                    if totals["products_total"] else 0.0)
+        totals["blocked_items"] = int((~valid).sum())
+
+        if QUOTE_HISTORY.enabled:
+            # Histórico por unidade, como o ProductPricer gravaria item a item
+            QUOTE_HISTORY.products.append_batch(catalog, unit, self.pricer.scenario, self.pricer.tax_table.version)
+        result = {"customer": dict(self.tax_context), "lines": lines, "totals": totals}
+        if self.fixed_point:
+            # Totais exatos em centavos, como o "centavos" do ProductPricer em ponto fixo
+            result["centavos"] = {column: int(values[valid].sum()) for column, values in cents.items()}
+        if errors == "raise":
+            self._result = result
+        return result
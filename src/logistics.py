@@ -0,0 +1,202 @@
+# src/logistics.py
+"""
+Roteiro de visitas dos contratos com vários locais.
+
+Distâncias vêm da tabela local de coordenadas (config/site_coordinates.py):
+haversine x fator rodoviário, sem consulta externa. A matriz entre todos os
+locais da tabela é calculada uma vez e reaproveitada até a tabela mudar.
+
+O roteiro de cada contrato sai da base, passa por todas as unidades e volta:
+vizinho mais próximo seguido de 2-opt (troca de arestas até não melhorar).
+Os km do roteiro vão para ServiceInput.route_km_round_trip, que substitui
+distance_km_round_trip x num_locations no custo logístico do ServicePricer
+(e do BatchServicePricer, modo centavos e simulação de risco).
+
+Uso:
+    planner = RoutePlanner()
+    planner.plan(["RJ", "MG", "ES"])              # {"route": ["SP", ..., "SP"], "km_round_trip": ...}
+    servico = planner.apply(servico, ["RJ", "MG", "ES"])
+    carteira = planner.plan_portfolio(carteira)   # coluna sites ("RJ;MG;ES") e base_site opcional
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from config.site_coordinates import DEFAULT_BASE, get_site_coordinates
+from src.instrumentation import METRICS
+from src.models import ServiceInput
+from src.quote_cache import QuoteCache
+
+EARTH_RADIUS_KM = 6371.0088
+# Estrada / linha reta (média para deslocamentos regionais)
+ROAD_FACTOR = 1.3
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Distância em linha reta (km) entre coordenadas em graus; aceita arrays (broadcast)."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(value, dtype=float)) for value in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class DistanceMatrix:
+    """Distâncias rodoviárias estimadas (km) entre os locais da tabela de coordenadas."""
+
+    # Acima disso a matriz completa (n x n float64) não é guardada; só as submatrizes pedidas
+    MAX_CACHED_SITES = 4000
+
+    def __init__(self, coordinates=None, road_factor: float = ROAD_FACTOR):
+        # coordinates=None acompanha a tabela global (set_site_coordinates)
+        self._coordinates = coordinates
+        self.road_factor = road_factor
+        self._matrix = None
+        self._matrix_key = None
+        self._lock = threading.Lock()
+
+    @property
+    def coordinates(self):
+        if self._coordinates is None:
+            return get_site_coordinates()
+        return self._coordinates
+
+    def _pairwise(self, positions: np.ndarray) -> np.ndarray:
+        table = self.coordinates
+        lat, lon = table.lat[positions], table.lon[positions]
+        return haversine_km(lat[:, None], lon[:, None], lat[None, :], lon[None, :]) * self.road_factor
+
+    def full(self) -> np.ndarray:
+        """Matriz entre todos os locais da tabela (calculada uma vez por versão da tabela)."""
+        table = self.coordinates
+        key = (id(table), table.version)
+        with self._lock:
+            if self._matrix_key != key:
+                with METRICS.span("logistics.matrix"):
+                    self._matrix = self._pairwise(np.arange(len(table)))
+                self._matrix_key = key
+            return self._matrix
+
+    def between(self, sites) -> np.ndarray:
+        """Submatriz na ordem de `sites`."""
+        positions = self.coordinates.positions(sites)
+        if len(self.coordinates) <= self.MAX_CACHED_SITES:
+            return self.full()[np.ix_(positions, positions)]
+        return self._pairwise(positions)
+
+
+def nearest_neighbour_tour(distances: np.ndarray) -> np.ndarray:
+    """Roteiro fechado 0 -> ... -> 0 escolhendo sempre o local mais próximo ainda não visitado."""
+    size = len(distances)
+    tour = np.empty(size + 1, dtype=np.int64)
+    tour[0] = tour[size] = 0
+    visited = np.zeros(size, dtype=bool)
+    visited[0] = True
+    current = 0
+    for step in range(1, size):
+        row = np.where(visited, np.inf, distances[current])
+        current = int(np.argmin(row))
+        visited[current] = True
+        tour[step] = current
+    return tour
+
+
+def two_opt(tour: np.ndarray, distances: np.ndarray, max_rounds: int = 100) -> np.ndarray:
+    """
+    Melhora um roteiro fechado invertendo trechos enquanto houver ganho.
+    Para cada aresta de saída, os ganhos de todas as trocas são calculados de uma vez.
+    """
+    tour = tour.copy()
+    last = len(tour) - 1
+    for _ in range(max_rounds):
+        improved = False
+        for i in range(1, last - 1):
+            a, b = tour[i - 1], tour[i]
+            c, d = tour[i + 1:last], tour[i + 2:]
+            gain = distances[a, c] + distances[b, d] - distances[a, b] - distances[c, d]
+            best = int(np.argmin(gain))
+            if gain[best] < -1e-9:
+                j = i + 1 + best
+                tour[i:j + 1] = tour[i:j + 1][::-1]
+                improved = True
+        if not improved:
+            break
+    return tour
+
+
+def tour_length(tour: np.ndarray, distances: np.ndarray) -> float:
+    return float(distances[tour[:-1], tour[1:]].sum())
+
+
+def _split_sites(value) -> list:
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return []
+    if isinstance(value, str):
+        value = value.replace(",", ";").split(";")
+    return [str(site).strip() for site in value if str(site).strip()]
+
+
+class RoutePlanner:
+    """Roteiros base -> unidades -> base, com cache por conjunto de locais."""
+
+    def __init__(self, coordinates=None, road_factor: float = ROAD_FACTOR, base: str = DEFAULT_BASE,
+                 cache_size: int = 4096):
+        self.matrix = DistanceMatrix(coordinates, road_factor)
+        self.base = base
+        self.cache = QuoteCache(cache_size)
+
+    def _route(self, base: str, stops: list) -> dict:
+        sites = [base] + stops
+        distances = self.matrix.between(sites)
+        tour = nearest_neighbour_tour(distances)
+        if len(stops) > 2:
+            tour = two_opt(tour, distances)
+        legs = distances[tour[:-1], tour[1:]]
+        return {
+            "base": base,
+            "route": [sites[position] for position in tour],
+            "km_legs": np.round(legs, 1).tolist(),
+            "km_round_trip": round(float(legs.sum()), 1),
+            "stops": len(stops),
+        }
+
+    def plan(self, sites, base: str = None) -> dict:
+        """Roteiro fechado pela base passando por todos os `sites` (ordem informada não importa)."""
+        base = base or self.base
+        # Locais repetidos ou iguais à base não geram parada; ordem canônica para o cache
+        stops = sorted(set(_split_sites(sites)) - {base})
+        table = self.matrix.coordinates
+        key = f"{id(table)}:{table.version}:{self.matrix.road_factor}:{base}:{';'.join(stops)}"
+        return self.cache.get_or_compute(key, lambda: self._route(base, stops))
+
+    def apply(self, service: ServiceInput, sites, base: str = None) -> ServiceInput:
+        """Cópia do serviço com os km do roteiro e o nº de locais atendidos."""
+        plan = self.plan(sites, base)
+        return service.model_copy(update={
+            "route_km_round_trip": plan["km_round_trip"],
+            "num_locations": max(plan["stops"], 1),
+        })
+
+    def plan_portfolio(self, portfolio, sites_column: str = "sites", base_column: str = "base_site") -> pd.DataFrame:
+        """
+        Preenche route_km_round_trip e num_locations das linhas com `sites_column`
+        (lista ou texto "RJ;MG;ES"); as demais seguem com distance_km_round_trip.
+        """
+        frame = portfolio.copy() if isinstance(portfolio, pd.DataFrame) else pd.DataFrame(portfolio)
+        if "route_km_round_trip" not in frame.columns:
+            frame["route_km_round_trip"] = np.nan
+        if sites_column not in frame.columns:
+            return frame
+
+        route_km = frame["route_km_round_trip"].to_numpy(dtype=float).copy()
+        locations = (frame["num_locations"].to_numpy(dtype=np.int64).copy() if "num_locations" in frame.columns
+                     else np.ones(len(frame), dtype=np.int64))
+        bases = frame[base_column].to_numpy(dtype=object) if base_column in frame.columns else [None] * len(frame)
+        for row, (sites, base) in enumerate(zip(frame[sites_column].to_numpy(dtype=object), bases)):
+            if not _split_sites(sites):
+                continue
+            plan = self.plan(sites, base if isinstance(base, str) and base else None)
+            route_km[row] = plan["km_round_trip"]
+            locations[row] = max(plan["stops"], 1)
+        frame["route_km_round_trip"] = route_km
+        frame["num_locations"] = locations
+        return frame
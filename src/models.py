@@ -1,15 +1,100 @@
-from pydantic import BaseModel, Field
-from typing import Literal, Optional
+from pydantic import BaseModel, Field, TypeAdapter, model_validator
+from typing import Literal, Optional, Union, get_args, get_origin
+import numpy as np
+import pandas as pd
 
-class ProductInput(BaseModel):
+from config.ncm_rates import get_ncm_rates
+
+
+def _validate_column(model_name: str, name: str, field, series: pd.Series):
+    """Valida uma coluna inteira contra o tipo/restrições de um campo do modelo."""
+    label = f"{model_name}.{name}"
+    annotation = field.annotation
+
+    # Optional[float]/Optional[int]: ausente (NaN/None) é aceito
+    optional = False
+    if get_origin(annotation) is Union and type(None) in get_args(annotation):
+        inner = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if len(inner) == 1 and inner[0] in (float, int):
+            annotation, optional = inner[0], True
+
+    if annotation in (float, int):
+        values = pd.to_numeric(series, errors="coerce").to_numpy(dtype=float)
+        if optional:
+            values = values[~series.isna().to_numpy()]
+        if not np.isfinite(values).all():
+            raise ValueError(f"{label}: valores ausentes ou não numéricos")
+        if annotation is int and not (values == np.round(values)).all():
+            raise ValueError(f"{label}: esperado número inteiro")
+        for constraint in field.metadata:
+            for attr, check in (("gt", np.greater), ("ge", np.greater_equal), ("lt", np.less), ("le", np.less_equal)):
+                bound = getattr(constraint, attr, None)
+                if bound is not None and not check(values, bound).all():
+                    raise ValueError(f"{label}: valores devem ser {attr} {bound}")
+    elif annotation is str:
+        if pd.api.types.infer_dtype(series, skipna=False) != "string":
+            raise ValueError(f"{label}: esperado texto")
+    elif get_origin(annotation) is Literal:
+        invalid = ~series.isin(get_args(annotation))
+        if invalid.any():
+            raise ValueError(f"{label}: valor inválido {series[invalid].iloc[0]!r}")
+    else:
+        # Tipos menos comuns: valida só os valores distintos
+        adapter = TypeAdapter(annotation)
+        for value in pd.unique(series):
+            adapter.validate_python(value)
+
+
+class InputModel(BaseModel):
+    """
+    Base dos modelos de entrada. A validação pydantic linha a linha continua
+    sendo o padrão (UI). Para cargas em massa (exportação do ERP):
+      - validate_columns(frame): valida cada coluna uma vez, não cada linha;
+        é o que os precificadores em lote usam (validate=False pula de vez)
+      - trusted(**values): monta um registro já validado sem revalidar
+    """
+
+    @classmethod
+    def trusted(cls, **values):
+        return cls.model_construct(**values)
+
+    @classmethod
+    def validate_columns(cls, frame: pd.DataFrame, required=None):
+        """Valida as colunas presentes; `required` sobrepõe os campos obrigatórios do modelo."""
+        if required is None:
+            required = [name for name, field in cls.model_fields.items() if field.is_required()]
+        for name in required:
+            if name not in frame.columns:
+                raise ValueError(f"{cls.__name__}: coluna obrigatória ausente: {name}")
+        for name, field in cls.model_fields.items():
+            if name in frame.columns:
+                _validate_column(cls.__name__, name, field, frame[name])
+
+
+class ProductInput(InputModel):
     name: str
     ncm: str
     cost_price: float = Field(..., gt=0)
-    ipi_rate: float = 0.0
-    mva_st: float = 0.0
+    # Sem valor informado, IPI e MVA-ST vêm da tabela por NCM (config/ncm_rates.py)
+    ipi_rate: Optional[float] = None
+    mva_st: Optional[float] = None
     origin_uf: str = "SP"
 
-class ServiceInput(BaseModel):
+    @model_validator(mode="after")
+    def _resolve_ncm_rates(self):
+        if self.ipi_rate is None or self.mva_st is None:
+            rates = get_ncm_rates().rates_for(self.ncm)
+            if self.ipi_rate is None:
+                self.ipi_rate = rates["ipi_rate"]
+            if self.mva_st is None:
+                self.mva_st = rates["mva_st"]
+        return self
+
+    @classmethod
+    def trusted(cls, **values):
+        return cls.model_construct(**values)._resolve_ncm_rates()
+
+class ServiceInput(InputModel):
     # Tipos de Serviço/Contrato
     service_type: Literal[
         "Serviço Pontual (Avulso)", 
@@ -27,6 +112,9 @@ class ServiceInput(BaseModel):
     technical_hours_per_visit: float
     distance_km_round_trip: float # Ida e Volta
     num_locations: int = 1 # Quantos locais físicos diferentes
+    # Km do roteiro completo por visita (base -> todos os locais -> base; ver src/logistics.py).
+    # Quando informado, substitui distance_km_round_trip x num_locations no custo logístico
+    route_km_round_trip: Optional[float] = Field(None, ge=0)
     
     # Mudança aqui: Visitas por ANO
     visits_per_year: int = 12 
@@ -36,12 +124,18 @@ class ServiceInput(BaseModel):
     contract_duration_months: int = 1 
     parts_cost_estimation_monthly: float = 0.0 
 
-class CustomerContext(BaseModel):
+class CustomerContext(InputModel):
     uf: str
     type: Literal["Contribuinte", "Nao_Contribuinte"]
     internal_icms_dest: float = 0.18
 
-class PricingScenario(BaseModel):
+class PricingScenario(InputModel):
     commission_rate: float = 0.03
     admin_cost_rate: float = 0.1165
-    target_margin: float = 0.25
\ No newline at end of file
+    target_margin: float = 0.25
+
+class RiskAssumptions(InputModel):
+    # Variabilidade dos direcionadores de custo na simulação de risco (src/contract_risk.py)
+    parts_cv: float = Field(0.6, ge=0)           # coef. de variação do custo de peças por máquina/mês
+    hours_cv: float = Field(0.35, ge=0)          # coef. de variação das horas por atendimento
+    visits_dispersion: float = Field(0.3, ge=0)  # sobredispersão das visitas (0 = Poisson)
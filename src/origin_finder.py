@@ -0,0 +1,109 @@
+# src/origin_finder.py
+"""
+Melhor estoque de origem por destino (UF origem x UF destino x tipo de cliente).
+
+Para um produto e um conjunto de UFs onde há estoque, precifica todas as
+combinações numa única passada do BatchProductPricer (mesmas regras do
+ProductPricer/TaxEngine: interestadual 7%/12%, DIFAL do não contribuinte e ST)
+e ordena as origens de cada destino pelo custo final para o cliente.
+
+Uso:
+    finder = OriginFinder(produto, PricingScenario())
+    melhores = finder.best_origins(["SP", "PR", "BA"])
+"""
+import numpy as np
+import pandas as pd
+
+from src.models import ProductInput, PricingScenario
+from src.pricing_engine import BatchProductPricer
+from config.tax_rates import TaxConstants
+
+CUSTOMER_TYPES = ("Contribuinte", "Nao_Contribuinte")
+
+# Critérios de ordenação aceitos em rank_by
+RANK_COLUMNS = {
+    # Total da nota para o cliente: preço + IPI + ICMS-ST (DIFAL do não contribuinte já está no preço)
+    "customer_total": "customer_total",
+    "selling_price": "selling_price_suggested",
+    # Maior lucro líquido primeiro
+    "net_profit": "net_profit",
+}
+
+
+class OriginFinder:
+    """Compara as UFs de origem candidatas para cada destino e tipo de cliente."""
+
+    def __init__(self, product: ProductInput, scenario: PricingScenario = None, tax_table=None):
+        self.product = product
+        self.pricer = BatchProductPricer(scenario, tax_table)
+
+    def evaluate(self, origins, dest_ufs=None, customer_types=CUSTOMER_TYPES,
+                 rank_by: str = "customer_total") -> pd.DataFrame:
+        """
+        Uma linha por destino x tipo de cliente x origem (combinações bloqueadas
+        com NaN), com `rank` = posição da origem no critério rank_by (1 = melhor).
+        """
+        if rank_by not in RANK_COLUMNS:
+            raise ValueError(f"rank_by deve ser um de {tuple(RANK_COLUMNS)}")
+        origins = np.asarray(list(dict.fromkeys(origins)), dtype=object)
+        dests = np.asarray(TaxConstants.ESTADOS if dest_ufs is None else dest_ufs, dtype=object)
+        types = np.asarray(customer_types, dtype=object)
+        if not len(origins):
+            raise ValueError("Informe ao menos uma UF de origem")
+        if not len(dests):
+            raise ValueError("Informe ao menos uma UF de destino")
+
+        # 1. Grade destino x tipo x origem: as origens de cada destino ficam contíguas
+        dest_pos, type_pos, origin_pos = np.unravel_index(
+            np.arange(len(dests) * len(types) * len(origins)), (len(dests), len(types), len(origins))
+        )
+        rows = len(dest_pos)
+        grid = pd.DataFrame({
+            "name": np.full(rows, self.product.name, dtype=object),
+            "ncm": np.full(rows, self.product.ncm, dtype=object),
+            "cost_price": np.full(rows, self.product.cost_price),
+            "ipi_rate": np.full(rows, self.product.ipi_rate),
+            "mva_st": np.full(rows, self.product.mva_st),
+            "origin_uf": origins[origin_pos],
+            "uf": dests[dest_pos],
+            "type": types[type_pos],
+        })
+
+        # 2. Precificação vetorizada (produto já validado pelo ProductInput)
+        priced = self.pricer.calculate_selling_prices(grid, errors="coerce", validate=False)
+        priced["customer_total"] = (
+            priced["selling_price_suggested"] + priced["ipi"] + priced["icms_st"]
+        ).round(2)
+
+        # 3. Ranking por bloco (matriz grupos x origens; bloqueadas por último)
+        values = priced[RANK_COLUMNS[rank_by]].to_numpy().reshape(-1, len(origins))
+        keys = -values if rank_by == "net_profit" else values
+        order = np.argsort(np.where(np.isnan(keys), np.inf, keys), axis=1, kind="stable")
+        ranks = np.empty_like(order)
+        np.put_along_axis(ranks, order, np.arange(1, len(origins) + 1)[None, :], axis=1)
+        priced["rank"] = ranks.reshape(-1)
+        return priced
+
+    def best_origins(self, origins, dest_ufs=None, customer_types=CUSTOMER_TYPES,
+                     rank_by: str = "customer_total") -> pd.DataFrame:
+        """
+        Melhor origem por destino e tipo de cliente, com a segunda opção e a
+        vantagem sobre ela (`advantage`, em R$ no critério de rank_by).
+        """
+        priced = self.evaluate(origins, dest_ufs, customer_types, rank_by)
+        column = RANK_COLUMNS[rank_by]
+
+        best = priced[priced["rank"] == 1].reset_index(drop=True)
+        result = best[["uf", "type", "origin_uf", "selling_price_suggested", "ipi", "icms_own", "difal",
+                       "icms_st", "customer_total", "net_profit", "net_margin_pct"]].copy()
+        if priced["rank"].max() > 1:
+            runner_up = priced[priced["rank"] == 2].reset_index(drop=True)
+            advantage = runner_up[column] - best[column]
+            if rank_by == "net_profit":
+                advantage = -advantage
+            result["runner_up_origin"] = runner_up["origin_uf"]
+            result["advantage"] = advantage.round(2) + 0.0  # evita -0.0
+        else:
+            result["runner_up_origin"] = None
+            result["advantage"] = np.nan
+        return result
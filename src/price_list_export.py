@@ -0,0 +1,215 @@
+# src/price_list_export.py
+"""
+Exportação de tabelas de preço completas (catálogo x UF x tipo de cliente) em XLSX.
+
+As linhas são geradas sob demanda, um bloco de produtos por vez, direto do
+BatchProductPricer, e gravadas pelo modo write-only do openpyxl (uma aba por
+UF de destino). Nem o DataFrame completo nem o modelo da planilha ficam em
+memória: o openpyxl descarrega cada linha num arquivo temporário.
+
+Colunas de cada aba: dados do produto e, para cada tipo de cliente, preço
+sugerido, IPI, ICMS-ST e total da nota. Combinações bloqueadas (trava de
+95%) ficam com as células em branco.
+
+Uso:
+    rows = export_price_list(catalogo, "tabela_precos.xlsx", PricingScenario(), dest_ufs=["SP", "BA"])
+
+    python -m src.price_list_export catalogo.csv tabela_precos.xlsx --ufs SP BA RJ
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from src.catalog_repricer import DEFAULT_CHUNK_SIZE, iter_csv_chunks, iter_xlsx_chunks, prepare_chunk
+from src.instrumentation import METRICS
+from src.models import ProductInput, PricingScenario
+from src.pricing_engine import BatchProductPricer
+from config.tax_rates import TaxConstants
+
+CUSTOMER_TYPES = ("Contribuinte", "Nao_Contribuinte")
+CUSTOMER_LABELS = {"Contribuinte": "Contribuinte", "Nao_Contribuinte": "Não Contribuinte"}
+
+# (coluna do catálogo, título na planilha)
+PRODUCT_COLUMNS = (
+    ("name", "Produto"),
+    ("ncm", "NCM"),
+    ("origin_uf", "Origem"),
+    ("cost_price", "Custo (R$)"),
+    ("ipi_rate", "IPI (%)"),
+    ("mva_st", "MVA ST (%)"),
+)
+# (coluna do resultado, título) repetidas para cada tipo de cliente
+PRICE_COLUMNS = (
+    ("selling_price_suggested", "Preço"),
+    ("ipi", "IPI"),
+    ("icms_st", "ICMS-ST"),
+    ("customer_total", "Total Nota"),
+)
+
+
+def _cells(values) -> list:
+    """Coluna numérica -> lista de float Python com 2 casas (None onde NaN)."""
+    values = np.round(np.asarray(values, dtype=float), 2)
+    if not np.isnan(values).any():
+        return values.tolist()
+    return np.where(np.isnan(values), None, values.astype(object)).tolist()
+
+
+def _texts(values: pd.Series) -> list:
+    """Coluna de texto -> lista de str (None onde ausente)."""
+    return values.astype(object).where(values.notna(), None).tolist()
+
+
+class PriceListExporter:
+    """Gera e grava a tabela de preços de um catálogo para várias UFs de destino."""
+
+    def __init__(self, scenario: PricingScenario = None, tax_table=None, dest_ufs=None,
+                 customer_types=CUSTOMER_TYPES, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.pricer = BatchProductPricer(scenario, tax_table)
+        self.dest_ufs = list(TaxConstants.ESTADOS if dest_ufs is None else dest_ufs)
+        self.customer_types = tuple(customer_types)
+        if not self.dest_ufs:
+            raise ValueError("Informe ao menos uma UF de destino")
+        if not self.customer_types:
+            raise ValueError("Informe ao menos um tipo de cliente")
+        self.chunk_size = chunk_size
+
+    def header(self) -> list:
+        titles = [title for _, title in PRODUCT_COLUMNS]
+        for customer_type in self.customer_types:
+            label = CUSTOMER_LABELS.get(customer_type, customer_type)
+            titles.extend(f"{title} {label}" for _, title in PRICE_COLUMNS)
+        return titles
+
+    def prepare(self, catalog) -> pd.DataFrame:
+        """
+        Normaliza e valida o catálogo uma vez (tipos, IPI/MVA pela NCM); os blocos
+        são precificados sem nova validação. uf/type/ICMS de destino vêm da exportação.
+        """
+        frame = catalog if isinstance(catalog, pd.DataFrame) else pd.DataFrame(catalog)
+        frame = frame.drop(columns=["uf", "type", "internal_icms_dest"], errors="ignore").reset_index(drop=True)
+        frame = prepare_chunk(frame, self.dest_ufs[0], self.customer_types[0])
+        for column, _ in PRODUCT_COLUMNS:
+            if column not in frame.columns:
+                frame[column] = BatchProductPricer.PRODUCT_DEFAULTS.get(column, np.nan)
+        ProductInput.validate_columns(frame, required=("cost_price",))
+        PricingScenario.validate_columns(frame, required=())
+        return frame.drop(columns=["uf", "type"])
+
+    def iter_rows(self, catalog: pd.DataFrame, dest_uf: str):
+        """
+        Linhas (listas de valores) da aba de uma UF, bloco a bloco.
+        `catalog` deve vir de prepare().
+        """
+        types = np.asarray(self.customer_types, dtype=object)
+        for start in range(0, len(catalog), self.chunk_size):
+            chunk = catalog.iloc[start:start + self.chunk_size]
+            size = len(chunk)
+
+            # 1. Bloco repetido para cada tipo de cliente (tipo é o eixo externo)
+            with METRICS.span("export.price"):
+                frame = chunk.iloc[np.tile(np.arange(size), len(types))].reset_index(drop=True)
+                frame["uf"] = dest_uf
+                frame["type"] = np.repeat(types, size)
+                priced = self.pricer.calculate_selling_prices(frame, errors="coerce", validate=False)
+                priced["customer_total"] = priced["selling_price_suggested"] + priced["ipi"] + priced["icms_st"]
+
+            # 2. Colunas da planilha como listas Python (uma conversão por coluna, não por célula)
+            columns = [
+                _texts(chunk["name"]),
+                _texts(chunk["ncm"]),
+                _texts(chunk["origin_uf"]),
+                _cells(chunk["cost_price"]),
+                _cells(chunk["ipi_rate"].to_numpy(dtype=float) * 100),
+                _cells(chunk["mva_st"].to_numpy(dtype=float) * 100),
+            ]
+            for position in range(len(types)):
+                block = slice(position * size, (position + 1) * size)
+                columns.extend(_cells(priced[column].to_numpy()[block]) for column, _ in PRICE_COLUMNS)
+            yield from zip(*columns)
+
+    def write(self, catalog, target) -> int:
+        """Grava a planilha em `target` (caminho ou arquivo binário). Retorna o nº de linhas de preço."""
+        from openpyxl import Workbook
+
+        catalog = self.prepare(catalog)
+        header = self.header()
+        workbook = Workbook(write_only=True)
+        total_rows = 0
+        try:
+            for dest_uf in self.dest_ufs:
+                worksheet = workbook.create_sheet(dest_uf)
+                worksheet.freeze_panes = "B2"
+                worksheet.column_dimensions["A"].width = 40
+                worksheet.append(header)
+                for row in self.iter_rows(catalog, dest_uf):
+                    worksheet.append(row)
+                total_rows += len(catalog)
+            with METRICS.span("export.save"):
+                workbook.save(target)
+        finally:
+            workbook.close()
+        return total_rows
+
+
+def export_price_list(catalog, target, scenario: PricingScenario = None, dest_ufs=None,
+                      customer_types=CUSTOMER_TYPES, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                      tax_table=None) -> int:
+    """Atalho para PriceListExporter(...).write(catalog, target)."""
+    exporter = PriceListExporter(scenario, tax_table, dest_ufs, customer_types, chunk_size)
+    return exporter.write(catalog, target)
+
+
+def read_catalog(path: str, sheet: str = None, sep: str = None, decimal: str = ".") -> pd.DataFrame:
+    """Lê o catálogo (CSV ou XLSX) inteiro; a tabela de preços multiplica as linhas, não o catálogo."""
+    if str(path).lower().endswith((".xlsx", ".xlsm")):
+        chunks = list(iter_xlsx_chunks(path, sheet=sheet))
+    else:
+        chunks = list(iter_csv_chunks(path, sep=sep, decimal=decimal))
+    return pd.concat(chunks) if chunks else pd.DataFrame(columns=[column for column, _ in PRODUCT_COLUMNS])
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Exporta a tabela de preços do catálogo (uma aba por UF).")
+    parser.add_argument("entrada", help="Catálogo (.csv ou .xlsx)")
+    parser.add_argument("saida", help="Planilha de saída (.xlsx)")
+    parser.add_argument("--ufs", nargs="+", default=None, help="UFs de destino (padrão: todas)")
+    parser.add_argument("--tipos", nargs="+", default=list(CUSTOMER_TYPES), choices=list(CUSTOMER_TYPES),
+                        help="Tipos de cliente (padrão: ambos)")
+    parser.add_argument("--margem", type=float, default=PricingScenario().target_margin, help="Margem alvo (fração)")
+    parser.add_argument("--comissao", type=float, default=PricingScenario().commission_rate, help="Comissão (fração)")
+    parser.add_argument("--adm", type=float, default=PricingScenario().admin_cost_rate, help="Custo administrativo (fração)")
+    parser.add_argument("--bloco", type=int, default=DEFAULT_CHUNK_SIZE, help="Produtos por bloco")
+    parser.add_argument("--aba", default=None, help="Aba da planilha de entrada (padrão: ativa)")
+    parser.add_argument("--sep", default=None, help="Separador do CSV (padrão: detectar)")
+    parser.add_argument("--decimal", default=".", help="Separador decimal do CSV de entrada")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    if not os.path.exists(args.entrada):
+        print(f"Arquivo não encontrado: {args.entrada}", file=sys.stderr)
+        return 1
+    unknown = sorted(set(args.ufs or ()) - set(TaxConstants.ESTADOS))
+    if unknown:
+        print(f"UF inválida: {', '.join(unknown)}", file=sys.stderr)
+        return 1
+
+    scenario = PricingScenario(commission_rate=args.comissao, admin_cost_rate=args.adm, target_margin=args.margem)
+    try:
+        catalog = read_catalog(args.entrada, args.aba, args.sep, args.decimal)
+        rows = export_price_list(catalog, args.saida, scenario, args.ufs, args.tipos, args.bloco)
+    except ValueError as e:
+        print(f"Erro de precificação: {e}", file=sys.stderr)
+        return 1
+
+    print(f"{rows} linhas de preço -> {args.saida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,17 +1,48 @@
 # src/pricing_engine.py
+import numpy as np
+import pandas as pd
+
 from src.models import ProductInput, CustomerContext, PricingScenario
 from src.tax_engine import TaxEngine
+from src.quote_cache import QUOTE_CACHE
+from src.quote_store import QUOTE_HISTORY
+from src.rounding import round_array
+from src.fixed_point import (DEFAULT_ROUNDING, RATE_SCALE, SCALAR_DIVIDERS, apply_rate, check_rounding,
+                             div_round, to_bp, to_cents)
+from src.instrumentation import METRICS
 from config.tax_rates import TaxConstants
+from config.ncm_rates import get_ncm_rates
 
 class ProductPricer:
-    def __init__(self, product: ProductInput, context: CustomerContext, scenario: PricingScenario):
+    def __init__(self, product: ProductInput, context: CustomerContext, scenario: PricingScenario,
+                 tax_table=None, fixed_point: bool = False, rounding: str = DEFAULT_ROUNDING):
         self.product = product
         self.context = context
         self.scenario = scenario
+        # Versão da tabela fiscal (padrão: vigente); permite refazer cotações antigas
+        self.tax_table = tax_table or TaxConstants.CURRENT_TABLE
+        # Modo ponto fixo: cálculo em centavos/pontos-base com arredondamento `rounding`
+        self.fixed_point = fixed_point
+        self.rounding = check_rounding(rounding)
         self.tax_engine = TaxEngine()
 
-    def calculate_selling_price(self) -> dict:
-        pis_cofins_pct = TaxConstants.PIS_RATE + TaxConstants.COFINS_RATE
+    def calculate_selling_price(self, record: bool = True) -> dict:
+        """record=False não grava no histórico (prévias recalculadas a cada ajuste na tela)."""
+        models = (self.product, self.context, self.scenario)
+        if self.fixed_point:
+            result = QUOTE_CACHE.quote(f"product_cents_{self.rounding}", models,
+                                       self._calculate_selling_price_cents, self.tax_table.version)
+        else:
+            result = QUOTE_CACHE.quote("product", models, self._calculate_selling_price, self.tax_table.version)
+        if record and QUOTE_HISTORY.enabled:
+            QUOTE_HISTORY.products.append_quote(self.product, self.context, self.scenario, result,
+                                                self.tax_table.version)
+        return result
+
+    def _calculate_selling_price(self) -> dict:
+        timer = METRICS.timer("product")
+        table = self.tax_table
+        pis_cofins_pct = table.pis_cofins_rate
         
         # 1. Definição das Cargas Tributárias
         icms_load = 0.0
@@ -19,10 +50,10 @@ class ProductPricer:
         
         if self.product.origin_uf == self.context.uf:
             # Venda Interna: Usa alíquota cheia do estado
-            icms_load = TaxConstants.ICMS_INTERNO_ESTADOS.get(self.context.uf, TaxConstants.ICMS_PADRAO)
+            icms_load = table.rates.internal_lookup.get(self.context.uf, table.icms_padrao)
         else:
             # Venda Interestadual
-            interstate_rate = TaxConstants.get_interstate_rate(self.product.origin_uf, self.context.uf)
+            interstate_rate = table.rates.interstate_rate(self.product.origin_uf, self.context.uf)
             icms_load = interstate_rate
             
             # SE for Não Contribuinte: NB Tech paga o DIFAL.
@@ -31,6 +62,7 @@ class ProductPricer:
                 internal_dest = self.context.internal_icms_dest
                 # DIFAL = Interna Destino - Interestadual
                 difal_load = max(0, internal_dest - interstate_rate)
+        timer.lap("deductions")
 
         # 2. Markup (Formação de Preço)
         # Preço = Custo / (1 - Deduções)
@@ -49,9 +81,11 @@ class ProductPricer:
             raise ValueError(f"Impossível precificar: Impostos e Margens somam {total_deductions*100:.1f}%")
 
         calculated_price = self.product.cost_price / (1.0 - total_deductions)
+        timer.lap("markup")
         
         # 3. Validação Final (R$)
-        taxes = self.tax_engine.calculate_taxes(self.product, self.context, calculated_price)
+        taxes = self.tax_engine.calculate_taxes(self.product, self.context, calculated_price, table)
+        timer.lap("taxes")
         
         gross_revenue = calculated_price
         
@@ -67,7 +101,7 @@ class ProductPricer:
             - self.product.cost_price
         )
 
-        return {
+        result = {
             "selling_price_suggested": round(calculated_price, 2),
             "cost_price": self.product.cost_price,
             "taxes": taxes,
@@ -77,4 +111,354 @@ class ProductPricer:
                 "net_profit": round(net_profit, 2),
                 "net_margin_pct": round((net_profit / gross_revenue) * 100, 2)
             }
-        }
\ No newline at end of file
+        }
+        timer.lap("profit")
+        return result
+
+    def _calculate_selling_price_cents(self) -> dict:
+        """
+        Mesmas regras em ponto fixo. Impostos, comissão e adm são arredondados
+        individualmente; o lucro é o resíduo, então a decomposição fecha no centavo.
+        Valores em reais no formato usual e os inteiros exatos em result["centavos"].
+        """
+        timer = METRICS.timer("product_cents")
+        table = self.tax_table
+        divide = SCALAR_DIVIDERS[self.rounding]
+
+        # 1. Definição das Cargas Tributárias (pontos-base)
+        difal_load = 0
+        if self.product.origin_uf == self.context.uf:
+            icms_load = table.rates.internal_bp_lookup.get(self.context.uf, table.icms_padrao_bp)
+        else:
+            interstate_bp = table.rates.interstate_bp(self.product.origin_uf, self.context.uf)
+            icms_load = interstate_bp
+            if self.context.type == "Nao_Contribuinte":
+                difal_load = max(0, round(self.context.internal_icms_dest * RATE_SCALE) - interstate_bp)
+        commission_bp = round(self.scenario.commission_rate * RATE_SCALE)
+        admin_bp = round(self.scenario.admin_cost_rate * RATE_SCALE)
+        timer.lap("deductions")
+
+        # 2. Markup: Preço = Custo / (1 - Deduções), arredondado para centavos
+        total_deductions = (icms_load + difal_load + table.pis_cofins_bp
+                            + commission_bp + admin_bp + round(self.scenario.target_margin * RATE_SCALE))
+        if total_deductions >= 9500:
+            raise ValueError(f"Impossível precificar: Impostos e Margens somam {total_deductions / 100:.1f}%")
+
+        cost = round(self.product.cost_price * 100)
+        price = divide(cost * RATE_SCALE, RATE_SCALE - total_deductions)
+        timer.lap("markup")
+
+        # 3. Impostos em centavos
+        taxes = self.tax_engine.calculate_taxes_cents(self.product, self.context, price, table, self.rounding)
+        timer.lap("taxes")
+
+        commission = divide(price * commission_bp, RATE_SCALE)
+        admin_expenses = divide(price * admin_bp, RATE_SCALE)
+        net_profit = (price - taxes['icms_own'] - taxes['pis_cofins'] - taxes['difal'] - taxes['icms_st']
+                      - commission - admin_expenses - cost)
+        # Custo abaixo de meio centavo dá preço zero: mesmo piso de 1 centavo do caminho em lote
+        margin_bp = divide(net_profit * RATE_SCALE, max(price, 1))
+
+        result = {
+            "selling_price_suggested": price / 100,
+            "cost_price": self.product.cost_price,
+            "taxes": {name: value / 100 for name, value in taxes.items()},
+            "financials": {
+                "commission": commission / 100,
+                "admin_expenses": admin_expenses / 100,
+                "net_profit": net_profit / 100,
+                "net_margin_pct": margin_bp / 100
+            },
+            "centavos": {
+                "selling_price": price,
+                "cost_price": cost,
+                **taxes,
+                "commission": commission,
+                "admin_expenses": admin_expenses,
+                "net_profit": net_profit,
+            },
+        }
+        timer.lap("profit")
+        return result
+
+    # --- Precificação Inversa (solução fechada, aceita escalar ou array) ---
+
+    def _price_deduction_rate(self) -> float:
+        """Fração do preço consumida por impostos (exceto IPI), comissão e adm."""
+        rates = self.tax_engine.effective_tax_rates(self.product, self.context, self.tax_table)
+        return (
+            rates['icms_own'] +
+            rates['pis_cofins'] +
+            rates['difal'] +
+            rates['icms_st'] +
+            self.scenario.commission_rate +
+            self.scenario.admin_cost_rate
+        )
+
+    def calculate_margin_for_price(self, selling_price):
+        """Margem líquida real (fração) obtida vendendo ao preço informado."""
+        prices = np.asarray(selling_price, dtype=float)
+        margin = 1.0 - self._price_deduction_rate() - self.product.cost_price / prices
+        return margin.item() if margin.ndim == 0 else margin
+
+    def calculate_max_cost_for_price(self, selling_price, target_margin: float = None):
+        """Maior custo de aquisição que ainda entrega a margem alvo ao preço informado."""
+        if target_margin is None:
+            target_margin = self.scenario.target_margin
+        prices = np.asarray(selling_price, dtype=float)
+        max_cost = prices * (1.0 - self._price_deduction_rate() - np.asarray(target_margin, dtype=float))
+        return max_cost.item() if max_cost.ndim == 0 else max_cost
+
+    def calculate_price_for_margin(self, target_margin=None):
+        """Preço que entrega exatamente a margem líquida real (incluindo ST e ICMS efetivo)."""
+        if target_margin is None:
+            target_margin = self.scenario.target_margin
+        margins = np.asarray(target_margin, dtype=float)
+        remaining = 1.0 - self._price_deduction_rate() - margins
+        if np.any(remaining <= 0.05):
+            raise ValueError("Impossível precificar: Impostos e Margens somam 95% ou mais")
+        price = self.product.cost_price / remaining
+        return price.item() if price.ndim == 0 else price
+
+
+class BatchProductPricer:
+    """
+    Precificação vetorizada de catálogos inteiros (uma linha por SKU x destino).
+    Reproduz as regras do ProductPricer em NumPy, sem criar modelos por linha.
+
+    Colunas aceitas (DataFrame ou dicionário de arrays):
+      - Produto: name, ncm, cost_price, ipi_rate, mva_st, origin_uf
+        (ipi_rate/mva_st vazios ou ausentes: tabela por NCM)
+      - Cliente: uf, type, internal_icms_dest
+      - Cenário (opcionais, sobrepõem o PricingScenario): commission_rate, admin_cost_rate, target_margin
+    Sem `internal_icms_dest`, usa a alíquota interna do estado de destino.
+
+    errors="raise" (padrão) interrompe na primeira linha acima da trava de 95%;
+    errors="coerce" devolve NaN nessas linhas e segue com o restante.
+    validate=False pula a validação por coluna (entrada confiável, ex.: ERP).
+    """
+
+    PRODUCT_DEFAULTS = {"ipi_rate": 0.0, "mva_st": 0.0, "origin_uf": "SP"}
+    SCENARIO_FIELDS = ("commission_rate", "admin_cost_rate", "target_margin")
+    KEY_COLUMNS = ("name", "ncm", "origin_uf", "uf", "type")
+
+    def __init__(self, scenario: PricingScenario = None, tax_table=None):
+        self.scenario = scenario or PricingScenario()
+        self.tax_table = tax_table or TaxConstants.CURRENT_TABLE
+
+    def _column(self, frame: pd.DataFrame, name: str, default) -> np.ndarray:
+        if name in frame.columns:
+            return frame[name].to_numpy()
+        return np.full(len(frame), default)
+
+    @classmethod
+    def resolve_ncm_rates(cls, frame: pd.DataFrame) -> tuple:
+        """
+        (ipi_rate, mva_st) por linha: valores informados prevalecem; vazios ou
+        coluna ausente vêm da tabela por NCM e, sem prefixo, do PRODUCT_DEFAULTS.
+        """
+        table = get_ncm_rates()
+        resolved = []
+        for field in ("ipi_rate", "mva_st"):
+            if field in frame.columns:
+                values = pd.to_numeric(frame[field], errors="coerce").to_numpy(dtype=float, copy=True)
+            else:
+                values = np.full(len(frame), np.nan)
+            missing = np.isnan(values)
+            if missing.any() and "ncm" in frame.columns:
+                values[missing] = table.lookup_many(frame["ncm"].to_numpy()[missing], field)
+                missing = np.isnan(values)
+            values[missing] = cls.PRODUCT_DEFAULTS[field]
+            resolved.append(values)
+        return tuple(resolved)
+
+    def _read_catalog(self, catalog, errors: str, validate: bool, timer) -> tuple:
+        """Valida o catálogo e extrai as colunas de entrada como arrays."""
+        if errors not in ("raise", "coerce"):
+            raise ValueError("errors deve ser 'raise' ou 'coerce'")
+        frame = catalog if isinstance(catalog, pd.DataFrame) else pd.DataFrame(catalog)
+        for required in ("cost_price", "uf", "type"):
+            if required not in frame.columns:
+                raise ValueError(f"Coluna obrigatória ausente: {required}")
+
+        # Validação por coluna (uma vez por lote); validate=False para dados já validados
+        if validate:
+            ProductInput.validate_columns(frame, required=("cost_price",))
+            CustomerContext.validate_columns(frame)
+            PricingScenario.validate_columns(frame, required=())
+        timer.lap("validation")
+
+        ipi_rate, mva_st = self.resolve_ncm_rates(frame)
+        dest_uf = frame["uf"].to_numpy(dtype=object)
+        if "internal_icms_dest" in frame.columns:
+            internal_dest = frame["internal_icms_dest"].to_numpy(dtype=float)
+        else:
+            internal_dest = self.tax_table.rates.internal_rates(dest_uf)
+
+        inputs = {
+            "cost_price": frame["cost_price"].to_numpy(dtype=float),
+            "ipi_rate": ipi_rate,
+            "mva_st": mva_st,
+            "origin_uf": self._column(frame, "origin_uf", self.PRODUCT_DEFAULTS["origin_uf"]).astype(object),
+            "dest_uf": dest_uf,
+            "customer_type": frame["type"].to_numpy(dtype=object),
+            "internal_dest": internal_dest,
+        }
+        for field in self.SCENARIO_FIELDS:
+            inputs[field] = self._column(frame, field, getattr(self.scenario, field)).astype(float)
+        return frame, inputs
+
+    def calculate_selling_prices(self, catalog, errors: str = "raise", validate: bool = True) -> pd.DataFrame:
+        timer = METRICS.timer("batch_product")
+        frame, inputs = self._read_catalog(catalog, errors, validate, timer)
+        METRICS.increment("batch_product.rows", len(frame))
+
+        cost_price = inputs["cost_price"]
+        ipi_rate, mva_st = inputs["ipi_rate"], inputs["mva_st"]
+        origin_uf, dest_uf = inputs["origin_uf"], inputs["dest_uf"]
+        customer_type = inputs["customer_type"]
+        internal_dest = inputs["internal_dest"]
+        commission_rate, admin_cost_rate, target_margin = (inputs[field] for field in self.SCENARIO_FIELDS)
+
+        pis_cofins_pct = self.tax_table.pis_cofins_rate
+        is_internal = origin_uf == dest_uf
+
+        # 1. Definição das Cargas Tributárias
+        internal_load = self.tax_table.rates.internal_rates(dest_uf)
+        interstate_rate = self.tax_table.rates.interstate_rates(origin_uf, dest_uf)
+        icms_load = np.where(is_internal, internal_load, interstate_rate)
+        difal_load = np.where(
+            ~is_internal & (customer_type == "Nao_Contribuinte"),
+            np.maximum(0, internal_dest - interstate_rate),
+            0.0,
+        )
+        timer.lap("deductions")
+
+        # 2. Markup (Formação de Preço)
+        total_deductions = (
+            icms_load +
+            difal_load +
+            pis_cofins_pct +
+            commission_rate +
+            admin_cost_rate +
+            target_margin
+        )
+
+        # Trava de Segurança
+        blocked = total_deductions >= 0.95
+        if errors == "raise" and blocked.any():
+            row = int(np.argmax(blocked))
+            raise ValueError(
+                f"Impossível precificar (linha {frame.index[row]}): "
+                f"Impostos e Margens somam {total_deductions[row]*100:.1f}%"
+            )
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            calculated_price = np.where(blocked, np.nan, cost_price / (1.0 - total_deductions))
+        timer.lap("markup")
+
+        # 3. Validação Final (R$)
+        taxes = TaxEngine.calculate_taxes_batch(
+            calculated_price, ipi_rate, mva_st, origin_uf, dest_uf, customer_type, internal_dest, self.tax_table
+        )
+        timer.lap("taxes")
+
+        gross_revenue = calculated_price
+        net_profit = (
+            gross_revenue
+            - taxes['icms_own']
+            - taxes['pis_cofins']
+            - taxes['difal']
+            - taxes['icms_st']
+            - (gross_revenue * commission_rate)
+            - (gross_revenue * admin_cost_rate)
+            - cost_price
+        )
+
+        # Colunas montadas num único DataFrame (inserir coluna a coluna custa mais que o cálculo em lotes pequenos)
+        values = {"selling_price_suggested": round_array(calculated_price, 2)}
+        values.update(taxes)
+        values["commission"] = round_array(gross_revenue * commission_rate, 2)
+        values["admin_expenses"] = round_array(gross_revenue * admin_cost_rate, 2)
+        values["net_profit"] = round_array(net_profit, 2)
+        values["net_margin_pct"] = round_array((net_profit / gross_revenue) * 100, 2)
+        if blocked.any():
+            values = {name: np.where(blocked, np.nan, column) for name, column in values.items()}
+
+        columns = {column: frame[column].to_numpy() for column in self.KEY_COLUMNS if column in frame.columns}
+        columns["selling_price_suggested"] = values.pop("selling_price_suggested")
+        columns["cost_price"] = cost_price
+        columns.update(values)
+        result = pd.DataFrame(columns, index=frame.index)
+        timer.lap("profit")
+        return result
+
+    def calculate_selling_prices_cents(self, catalog, errors: str = "raise", validate: bool = True,
+                                       rounding: str = DEFAULT_ROUNDING) -> pd.DataFrame:
+        """
+        Modo ponto fixo de calculate_selling_prices (int64, mesmas regras do
+        ProductPricer com fixed_point=True). Colunas monetárias em centavos
+        (sufixo _cents); linhas bloqueadas (errors="coerce") ficam com blocked=True e zeros.
+        """
+        check_rounding(rounding)
+        timer = METRICS.timer("batch_product_cents")
+        frame, inputs = self._read_catalog(catalog, errors, validate, timer)
+        METRICS.increment("batch_product_cents.rows", len(frame))
+
+        origin_uf, dest_uf = inputs["origin_uf"], inputs["dest_uf"]
+        customer_type = inputs["customer_type"]
+        ipi_bp, mva_bp, internal_dest_bp = (to_bp(inputs[field]) for field in ("ipi_rate", "mva_st", "internal_dest"))
+        commission_bp, admin_bp, margin_bp = (to_bp(inputs[field]) for field in self.SCENARIO_FIELDS)
+        is_internal = origin_uf == dest_uf
+
+        # 1. Definição das Cargas Tributárias (pontos-base)
+        internal_load = to_bp(self.tax_table.rates.internal_rates(dest_uf))
+        interstate_bp = to_bp(self.tax_table.rates.interstate_rates(origin_uf, dest_uf))
+        icms_load = np.where(is_internal, internal_load, interstate_bp)
+        difal_load = np.where(
+            ~is_internal & (customer_type == "Nao_Contribuinte"),
+            np.maximum(0, internal_dest_bp - interstate_bp),
+            0,
+        )
+        timer.lap("deductions")
+
+        # 2. Markup (Formação de Preço)
+        total_deductions = (icms_load + difal_load + self.tax_table.pis_cofins_bp
+                            + commission_bp + admin_bp + margin_bp)
+        blocked = total_deductions >= 9500
+        if errors == "raise" and blocked.any():
+            row = int(np.argmax(blocked))
+            raise ValueError(
+                f"Impossível precificar (linha {frame.index[row]}): "
+                f"Impostos e Margens somam {total_deductions[row] / 100:.1f}%"
+            )
+
+        cost = to_cents(inputs["cost_price"])
+        price = div_round(cost * RATE_SCALE, np.where(blocked, RATE_SCALE, RATE_SCALE - total_deductions), rounding)
+        price = np.where(blocked, 0, price)
+        timer.lap("markup")
+
+        # 3. Impostos em centavos
+        taxes = TaxEngine.calculate_taxes_batch_cents(
+            price, ipi_bp, mva_bp, origin_uf, dest_uf, customer_type, internal_dest_bp, self.tax_table, rounding
+        )
+        timer.lap("taxes")
+
+        commission = apply_rate(price, commission_bp, rounding)
+        admin_expenses = apply_rate(price, admin_bp, rounding)
+        net_profit = (price - taxes['icms_own'] - taxes['pis_cofins'] - taxes['difal'] - taxes['icms_st']
+                      - commission - admin_expenses - np.where(blocked, 0, cost))
+
+        columns = {column: frame[column].to_numpy() for column in self.KEY_COLUMNS if column in frame.columns}
+        columns["selling_price_cents"] = price
+        columns["cost_price_cents"] = cost
+        for tax_name, values in taxes.items():
+            columns[f"{tax_name}_cents"] = values
+        columns["commission_cents"] = commission
+        columns["admin_expenses_cents"] = admin_expenses
+        columns["net_profit_cents"] = net_profit
+        columns["net_margin_bp"] = div_round(net_profit * RATE_SCALE, np.maximum(price, 1), rounding)
+        columns["blocked"] = blocked
+        result = pd.DataFrame(columns, index=frame.index)
+        timer.lap("profit")
+        return result
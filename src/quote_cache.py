@@ -0,0 +1,85 @@
+# src/quote_cache.py
+"""
+Cache de cotações com descarte LRU.
+
+A chave é o hash canônico dos modelos de entrada (ProductInput, CustomerContext,
+PricingScenario, ServiceInput) mais a versão da tabela fiscal. Como o cache vive
+no módulo, é compartilhado entre reruns e sessões do Streamlit no mesmo processo.
+"""
+import copy
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from config.tax_rates import TaxConstants
+
+
+class QuoteCache:
+    def __init__(self, max_size: int = 4096):
+        self.max_size = max_size
+        self.enabled = True
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(kind: str, *models, tax_table_version: str = None) -> str:
+        payload = {
+            "kind": kind,
+            "tax_table": tax_table_version or TaxConstants.TABLE_VERSION,
+            "inputs": [[type(model).__name__, model.model_dump()] for model in models],
+        }
+        canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def quote(self, kind: str, models: tuple, compute, tax_table_version: str = None):
+        """Atalho usado pelos precificadores: só monta a chave com o cache ligado."""
+        if not self.enabled:
+            return compute()
+        return self.get_or_compute(self.make_key(kind, *models, tax_table_version=tax_table_version), compute)
+
+    def get_or_compute(self, key: str, compute):
+        """Devolve a cotação em cache (cópia) ou calcula e armazena."""
+        if not self.enabled:
+            return compute()
+
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(cached)
+            self.misses += 1
+
+        # Cálculo fora do lock: erros (ex.: trava de 95%) não são armazenados
+        result = compute()
+
+        with self._lock:
+            self._entries[key] = copy.deepcopy(result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+# Instância compartilhada pelos precificadores
+QUOTE_CACHE = QuoteCache()
@@ -0,0 +1,450 @@
+# src/quote_store.py
+"""
+Histórico colunar de cotações em arquivos memory-mapped (append-only).
+
+Cada coluna do esquema (dtype estruturado de largura fixa) é um arquivo .bin
+mapeado com np.memmap; UF, NCM, tipo de cliente e demais textos repetitivos são
+gravados como códigos inteiros de um dicionário. Filtros (UF, NCM, período,
+faixa de margem) são máscaras NumPy sobre as colunas mapeadas, e to_pandas()
+monta o DataFrame sem copiar as colunas numéricas.
+
+As linhas novas só ficam visíveis para outros processos após flush(), que grava
+a contagem e os dicionários em meta.json.
+
+Uso:
+    store = ProductQuoteStore("historico/produtos")
+    store.append_quote(product, context, scenario, resultado)
+    store.flush()
+    df = store.to_pandas(store.scan(uf="BA", margin=(0.15, 0.25)))
+
+Para registrar toda cotação de ProductPricer/ServicePricer: QUOTE_HISTORY.open(pasta)
+ou variável de ambiente PRICING_QUOTE_STORE=pasta. O app recalcula ao vivo e grava
+cada cotação exibida uma vez por sessão (mesmas entradas não geram nova linha).
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+
+import numpy as np
+import pandas as pd
+
+
+def _timestamp(quoted_at=None):
+    # Milissegundos desde a época (mais barato que np.datetime64("now") por cotação)
+    if quoted_at is None:
+        return int(time.time() * 1000)
+    return np.datetime64(quoted_at, "ms")
+
+
+class Dictionary:
+    """Codificação texto -> inteiro (códigos estáveis, só cresce)."""
+
+    def __init__(self, values=()):
+        self.values = list(values)
+        self.codes = {value: code for code, value in enumerate(self.values)}
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def code(self, value) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            value = str(value)
+            code = self.codes.get(value)
+            if code is None:
+                code = self.codes[value] = len(self.values)
+                self.values.append(value)
+        return code
+
+    def encode(self, values) -> np.ndarray:
+        inverse, uniques = pd.factorize(np.asarray(values, dtype=object), use_na_sentinel=False)
+        mapping = np.array([self.code(value) for value in uniques.tolist()], dtype=np.uint32)
+        return mapping[inverse]
+
+    def lookup(self, values) -> list:
+        """Códigos dos valores já conhecidos (desconhecidos são ignorados)."""
+        if isinstance(values, str):
+            values = [values]
+        return [self.codes[str(v)] for v in values if str(v) in self.codes]
+
+
+class ColumnarQuoteStore(ABC):
+    """
+    Base dos históricos: SCHEMA define colunas e larguras; DICTIONARY_COLUMNS
+    são gravadas como códigos uint32; realized_margin() alimenta o filtro `margin`.
+    Colunas novas no SCHEMA são criadas ao abrir um histórico antigo (NaN nas
+    linhas existentes, se float; zero nas demais).
+    """
+
+    SCHEMA = np.dtype([])
+    DICTIONARY_COLUMNS = ()
+    GROWTH_ROWS = 65_536
+    BUFFER_ROWS = 4096
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._meta_path = os.path.join(directory, "meta.json")
+
+        meta = {}
+        added = []
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path, encoding="utf-8") as handle:
+                meta = json.load(handle)
+            stored = {name: descr for name, descr in meta.get("schema", [])}
+            current = dict(self._schema_descr())
+            # Só é aceito acréscimo de colunas; tipo alterado ou coluna removida é outro esquema
+            if any(current.get(name) != descr for name, descr in stored.items()):
+                raise ValueError(f"Esquema em {directory} difere de {type(self).__name__}")
+            added = [name for name in current if name not in stored]
+
+        self.count = meta.get("count", 0)
+        self.capacity = max(meta.get("capacity", 0), self.count)
+        self.dictionaries = {
+            name: Dictionary(meta.get("dictionaries", {}).get(name, ())) for name in self.DICTIONARY_COLUMNS
+        }
+        self._columns = {}
+        self._pending = []  # linhas de append_record ainda não copiadas para os arquivos
+        self._map(self.capacity)
+        for name in added:
+            column = self._columns[name]
+            column[:self.count] = np.nan if column.dtype.kind == "f" else 0
+
+    @classmethod
+    def _schema_descr(cls) -> list:
+        return [[name, cls.SCHEMA.fields[name][0].str] for name in cls.SCHEMA.names]
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.bin")
+
+    def _map(self, capacity: int):
+        """(Re)mapeia cada coluna com `capacity` linhas, aumentando os arquivos se preciso."""
+        self._columns = {}
+        self.capacity = capacity
+        for name in self.SCHEMA.names:
+            dtype = self.SCHEMA.fields[name][0]
+            path = self._path(name)
+            size = capacity * dtype.itemsize
+            with open(path, "ab") as handle:
+                if handle.tell() < size:
+                    handle.truncate(size)
+            if capacity:
+                self._columns[name] = np.memmap(path, dtype=dtype, mode="r+", shape=(capacity,))
+            else:
+                self._columns[name] = np.empty(0, dtype=dtype)
+
+    def _reserve(self, rows: int):
+        needed = self.count + rows
+        if needed > self.capacity:
+            capacity = max(needed, self.capacity * 2, self.GROWTH_ROWS)
+            for column in self._columns.values():
+                if isinstance(column, np.memmap):
+                    column.flush()
+            self._map(capacity)
+
+    def __len__(self) -> int:
+        return self.count + len(self._pending)
+
+    # --- Escrita ---
+
+    def _drain(self):
+        """Copia as linhas pendentes para as colunas mapeadas (chamar com o lock)."""
+        if not self._pending:
+            return
+        block = np.array(self._pending, dtype=self.SCHEMA)
+        self._pending = []
+        self._reserve(len(block))
+        start, stop = self.count, self.count + len(block)
+        for name in self.SCHEMA.names:
+            self._columns[name][start:stop] = block[name]
+        self.count = stop
+
+    def append_rows(self, columns: dict) -> np.ndarray:
+        """
+        Acrescenta linhas a partir de {coluna: array}. Colunas de dicionário
+        recebem os textos; colunas ausentes ficam com zero. Retorna os ids das linhas.
+        """
+        rows = len(next(iter(columns.values())))
+        with self._lock:
+            self._drain()
+            self._reserve(rows)
+            start, stop = self.count, self.count + rows
+            for name, values in columns.items():
+                if name in self.dictionaries:
+                    values = self.dictionaries[name].encode(values)
+                self._columns[name][start:stop] = values
+            self.count = stop
+        return np.arange(start, stop)
+
+    def append_record(self, record: dict) -> int:
+        """Acrescenta uma linha a partir de {coluna: valor} (ausentes ficam com zero)."""
+        dictionaries = self.dictionaries
+        return self.append_row(tuple(
+            dictionaries[name].code(record[name]) if name in dictionaries else record.get(name, 0)
+            for name in self.SCHEMA.names
+        ))
+
+    def append_row(self, row: tuple) -> int:
+        """
+        Acrescenta uma linha já na ordem do SCHEMA (textos já codificados). As
+        linhas ficam num buffer e são copiadas em bloco para os arquivos a cada
+        BUFFER_ROWS, leitura ou flush().
+        """
+        with self._lock:
+            self._pending.append(row)
+            row_id = self.count + len(self._pending) - 1
+            if len(self._pending) >= self.BUFFER_ROWS:
+                self._drain()
+        return row_id
+
+    def flush(self):
+        """Grava as colunas e publica a contagem/dicionários em meta.json."""
+        with self._lock:
+            self._drain()
+            for column in self._columns.values():
+                if isinstance(column, np.memmap):
+                    column.flush()
+            meta = {
+                "schema": self._schema_descr(),
+                "count": self.count,
+                "capacity": self.capacity,
+                "dictionaries": {name: d.values for name, d in self.dictionaries.items()},
+            }
+            temp_path = self._meta_path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as handle:
+                json.dump(meta, handle)
+            os.replace(temp_path, self._meta_path)
+
+    # --- Leitura ---
+
+    def column(self, name: str) -> np.ndarray:
+        """Visão (sem cópia) da coluna com as linhas gravadas."""
+        if self._pending:
+            with self._lock:
+                self._drain()
+        return self._columns[name][:self.count]
+
+    def scan(self, start=None, end=None, margin=None, **filters) -> np.ndarray:
+        """
+        Ids das linhas que atendem a todos os filtros:
+          start/end: período de quoted_at (início inclusivo, fim exclusivo)
+          margin: faixa (mín, máx) da margem líquida realizada, em fração (mín inclusivo, máx exclusivo)
+          coluna=valor ou coluna=[valores] para colunas de dicionário
+          coluna=(mín, máx) para colunas numéricas
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if start is not None:
+            mask &= self.column("quoted_at") >= np.datetime64(start, "ms")
+        if end is not None:
+            mask &= self.column("quoted_at") < np.datetime64(end, "ms")
+        if margin is not None:
+            low, high = margin
+            with np.errstate(divide="ignore", invalid="ignore"):
+                realized = self.realized_margin()
+            if low is not None:
+                mask &= realized >= low
+            if high is not None:
+                mask &= realized < high
+
+        for name, condition in filters.items():
+            if name not in self._columns:
+                raise KeyError(f"Coluna desconhecida: {name}")
+            values = self.column(name)
+            if name in self.dictionaries:
+                mask &= np.isin(values, self.dictionaries[name].lookup(condition))
+            else:
+                low, high = condition
+                if low is not None:
+                    mask &= values >= low
+                if high is not None:
+                    mask &= values < high
+        return np.flatnonzero(mask)
+
+    @abstractmethod
+    def realized_margin(self) -> np.ndarray:
+        """Margem líquida realizada (fração) de cada linha."""
+
+    def read(self, rows=None) -> np.ndarray:
+        """Linhas como array estruturado (códigos de dicionário não decodificados)."""
+        rows = slice(None) if rows is None else rows
+        out = np.empty(len(np.arange(len(self))[rows]), dtype=self.SCHEMA)
+        for name in self.SCHEMA.names:
+            out[name] = self.column(name)[rows]
+        return out
+
+    def to_pandas(self, rows=None, columns=None, decode: bool = True) -> pd.DataFrame:
+        """
+        DataFrame das linhas (todas, se rows=None). Sem `rows`, as colunas
+        numéricas apontam direto para os arquivos mapeados (somente leitura).
+        decode=True converte colunas de dicionário em Categorical.
+        """
+        data = {}
+        for name in columns or self.SCHEMA.names:
+            values = self.column(name)
+            if rows is None:
+                values = values.view()
+                values.flags.writeable = False
+            else:
+                values = values[rows]
+            if decode and name in self.dictionaries:
+                values = pd.Categorical.from_codes(values.astype(np.int32),
+                                                   categories=self.dictionaries[name].values, validate=False)
+            data[name] = values
+        return pd.DataFrame(data, copy=False)
+
+
+class ProductQuoteStore(ColumnarQuoteStore):
+    """Histórico das cotações de produto (ProductPricer / BatchProductPricer)."""
+
+    SCHEMA = np.dtype([
+        ("quoted_at", "datetime64[ms]"),
+        ("tax_table", "u4"),
+        ("name", "u4"), ("ncm", "u4"),
+        ("origin_uf", "u4"), ("uf", "u4"), ("customer_type", "u4"),
+        ("cost_price", "f8"), ("ipi_rate", "f8"), ("mva_st", "f8"), ("internal_icms_dest", "f8"),
+        ("commission_rate", "f8"), ("admin_cost_rate", "f8"), ("target_margin", "f8"),
+        ("selling_price", "f8"),
+        ("pis_cofins", "f8"), ("ipi", "f8"), ("icms_own", "f8"), ("difal", "f8"), ("icms_st", "f8"),
+        ("commission", "f8"), ("admin_expenses", "f8"), ("net_profit", "f8"), ("net_margin_pct", "f8"),
+    ])
+    DICTIONARY_COLUMNS = ("tax_table", "name", "ncm", "origin_uf", "uf", "customer_type")
+
+    def realized_margin(self) -> np.ndarray:
+        return self.column("net_margin_pct") / 100
+
+    def append_quote(self, product, context, scenario, result: dict, tax_table: str, quoted_at=None) -> int:
+        # Tupla na ordem do SCHEMA: é o caminho de toda cotação com o histórico ligado
+        taxes = result["taxes"]
+        financials = result["financials"]
+        codes = self.dictionaries
+        return self.append_row((
+            _timestamp(quoted_at), codes["tax_table"].code(tax_table),
+            codes["name"].code(product.name), codes["ncm"].code(product.ncm),
+            codes["origin_uf"].code(product.origin_uf), codes["uf"].code(context.uf),
+            codes["customer_type"].code(context.type),
+            product.cost_price, product.ipi_rate, product.mva_st, context.internal_icms_dest,
+            scenario.commission_rate, scenario.admin_cost_rate, scenario.target_margin,
+            result["selling_price_suggested"],
+            taxes["pis_cofins"], taxes["ipi"], taxes["icms_own"], taxes["difal"], taxes["icms_st"],
+            financials["commission"], financials["admin_expenses"],
+            financials["net_profit"], financials["net_margin_pct"],
+        ))
+
+    def append_batch(self, catalog: pd.DataFrame, priced: pd.DataFrame, scenario, tax_table: str,
+                     quoted_at=None) -> np.ndarray:
+        """
+        Grava a saída do BatchProductPricer (linhas bloqueadas ficam com NaN) com as
+        alíquotas que o precificador usou: IPI/MVA resolvidos pela NCM e ICMS interno
+        da tabela quando o catálogo não os informa.
+        """
+        # Import tardio: pricing_engine importa este módulo
+        from src.pricing_engine import BatchProductPricer
+        from config.tax_rates import TAX_TABLES
+
+        rows = len(priced)
+        ipi_rate, mva_st = BatchProductPricer.resolve_ncm_rates(catalog)
+
+        def column(name, default):
+            if name in catalog.columns:
+                return catalog[name].to_numpy()
+            return np.full(rows, default)
+
+        columns = {
+            "quoted_at": np.full(rows, np.datetime64(quoted_at or "now", "ms")),
+            "tax_table": np.full(rows, tax_table),
+            "name": column("name", ""), "ncm": column("ncm", ""),
+            "origin_uf": column("origin_uf", "SP"), "uf": catalog["uf"].to_numpy(),
+            "customer_type": catalog["type"].to_numpy(),
+            "cost_price": priced["cost_price"].to_numpy(),
+            "ipi_rate": ipi_rate, "mva_st": mva_st,
+            "selling_price": priced["selling_price_suggested"].to_numpy(),
+        }
+        if "internal_icms_dest" in catalog.columns:
+            columns["internal_icms_dest"] = catalog["internal_icms_dest"].to_numpy()
+        else:
+            try:
+                columns["internal_icms_dest"] = TAX_TABLES.get(tax_table).rates.internal_rates(columns["uf"])
+            except KeyError:
+                # Tabela avulsa (não registrada em TAX_TABLES): alíquota desconhecida aqui
+                columns["internal_icms_dest"] = np.full(rows, np.nan)
+        for name in ("commission_rate", "admin_cost_rate", "target_margin"):
+            columns[name] = column(name, getattr(scenario, name))
+        for name in ("pis_cofins", "ipi", "icms_own", "difal", "icms_st",
+                     "commission", "admin_expenses", "net_profit", "net_margin_pct"):
+            columns[name] = priced[name].to_numpy()
+        return self.append_rows(columns)
+
+
+class ServiceQuoteStore(ColumnarQuoteStore):
+    """Histórico das cotações de serviço (ServicePricer)."""
+
+    SCHEMA = np.dtype([
+        ("quoted_at", "datetime64[ms]"),
+        ("service_type", "u4"), ("ups_power", "u4"), ("ups_type", "u4"),
+        ("ups_quantity", "i4"), ("visits_per_year", "i4"), ("num_locations", "i4"),
+        ("contract_duration_months", "i4"),
+        ("technical_hours_per_visit", "f8"), ("distance_km_round_trip", "f8"), ("route_km_round_trip", "f8"),
+        ("equipment_capex_unit", "f8"), ("parts_cost_estimation_monthly", "f8"),
+        ("commission_rate", "f8"), ("target_margin", "f8"), ("tax_rate", "f8"),
+        ("monthly_price", "f8"), ("total_contract_value", "f8"),
+        ("labor_cost", "f8"), ("logistics_cost", "f8"), ("parts_risk", "f8"), ("asset_amortization", "f8"),
+        ("taxes", "f8"), ("commissions", "f8"), ("net_profit", "f8"),
+    ])
+    DICTIONARY_COLUMNS = ("service_type", "ups_power", "ups_type")
+
+    def realized_margin(self) -> np.ndarray:
+        return self.column("net_profit") / self.column("monthly_price")
+
+    def append_quote(self, service, scenario, result: dict, quoted_at=None) -> int:
+        # Breakdown na ordem do ServicePricer (a chave de impostos traz a alíquota no nome)
+        codes = self.dictionaries
+        return self.append_row((
+            _timestamp(quoted_at), codes["service_type"].code(service.service_type),
+            codes["ups_power"].code(service.ups_power), codes["ups_type"].code(service.ups_type),
+            service.ups_quantity, service.visits_per_year, service.num_locations,
+            service.contract_duration_months,
+            service.technical_hours_per_visit, service.distance_km_round_trip,
+            np.nan if service.route_km_round_trip is None else service.route_km_round_trip,
+            service.equipment_capex_unit, service.parts_cost_estimation_monthly,
+            scenario.commission_rate, scenario.target_margin, result["inputs"]["tax_rate_used"],
+            result["monthly_price"], result["total_contract_value"],
+            *result["breakdown"].values(),
+        ))
+
+
+class QuoteHistory:
+    """Registro opcional de toda cotação feita pelos precificadores (desligado por padrão)."""
+
+    def __init__(self, directory: str = None):
+        self.products = None
+        self.services = None
+        if directory:
+            self.open(directory)
+
+    @property
+    def enabled(self) -> bool:
+        return self.products is not None
+
+    def open(self, directory: str):
+        self.products = ProductQuoteStore(os.path.join(directory, "products"))
+        self.services = ServiceQuoteStore(os.path.join(directory, "services"))
+        return self
+
+    def flush(self):
+        if self.enabled:
+            self.products.flush()
+            self.services.flush()
+
+    def close(self):
+        self.flush()
+        self.products = None
+        self.services = None
+
+
+# Histórico global usado pelos precificadores
+QUOTE_HISTORY = QuoteHistory(os.environ.get("PRICING_QUOTE_STORE") or None)
+atexit.register(QUOTE_HISTORY.flush)
@@ -0,0 +1,191 @@
+# src/repricing.py
+"""
+Livro de cotações com reprecificação incremental por versão da tabela fiscal.
+
+Cada cotação guarda a versão da tabela usada e entra num índice de dependências
+(chave de alíquota -> cotações). Quando uma nova versão muda a alíquota interna
+de uma UF, só as cotações que dependem dela são refeitas; o retorno lista os
+preços que mudaram.
+
+Chaves de dependência (mesmas de TaxTableVersion.changed_rate_keys):
+    ("internal", UF)  venda interna na UF, ou DIFAL/ST calculados com a
+                      alíquota interna da tabela (sem internal_icms_dest informado)
+    ("padrao",)       ICMS próprio da venda interna e UF fora da tabela
+    ("federal",)      PIS/COFINS (todas as cotações)
+
+Uso:
+    book = QuoteBook(PricingScenario())
+    ids = book.add(catalogo)
+    nova = TAX_TABLES.register(TaxConstants.CURRENT_TABLE.revise("2026.07", date(2026, 7, 1), {"BA": 0.21}))
+    mudancas = book.reprice(nova)      # só as cotações com destino BA
+    antigas = book.reproduce(ids, "2026.01")
+"""
+import numpy as np
+import pandas as pd
+
+from config.tax_rates import TAX_TABLES, TaxTableVersion
+from src.instrumentation import METRICS
+from src.models import ProductInput, CustomerContext, PricingScenario
+from src.pricing_engine import BatchProductPricer
+
+
+class QuoteBook:
+    """Cotações de catálogo guardadas com a versão da tabela fiscal usada."""
+
+    INPUT_COLUMNS = ("name", "ncm", "cost_price", "ipi_rate", "mva_st", "origin_uf",
+                     "uf", "type", "internal_icms_dest") + BatchProductPricer.SCENARIO_FIELDS
+
+    def __init__(self, scenario: PricingScenario = None, history=TAX_TABLES):
+        self.scenario = scenario or PricingScenario()
+        self.history = history
+        self.inputs = pd.DataFrame(columns=list(self.INPUT_COLUMNS))
+        self.results = pd.DataFrame()
+        self.table_versions = pd.Series(dtype=object)
+        self._tables = {}
+        self._dependencies = {}  # chave de alíquota -> lista de arrays de quote_id
+
+    def __len__(self) -> int:
+        return len(self.inputs)
+
+    def _table(self, version) -> TaxTableVersion:
+        if isinstance(version, TaxTableVersion):
+            self._tables.setdefault(version.version, version)
+            return version
+        if version in self._tables:
+            return self._tables[version]
+        return self._table(self.history.get(version))
+
+    def _price(self, inputs: pd.DataFrame, table: TaxTableVersion) -> pd.DataFrame:
+        # Alíquota interna não informada é resolvida pela tabela desta versão
+        frame = inputs.copy()
+        derived = frame["internal_icms_dest"].isna().to_numpy()
+        if derived.any():
+            frame.loc[derived, "internal_icms_dest"] = table.rates.internal_rates(frame["uf"].to_numpy()[derived])
+        scenario_columns = [column for column in BatchProductPricer.SCENARIO_FIELDS if frame[column].isna().all()]
+        frame = frame.drop(columns=scenario_columns)
+        for column in BatchProductPricer.SCENARIO_FIELDS:
+            if column in frame.columns:
+                frame[column] = frame[column].fillna(getattr(self.scenario, column))
+        pricer = BatchProductPricer(self.scenario, table)
+        return pricer.calculate_selling_prices(frame, errors="coerce", validate=False)
+
+    def _index(self, quote_ids: np.ndarray, inputs: pd.DataFrame, table: TaxTableVersion):
+        origin_uf = inputs["origin_uf"].to_numpy(dtype=object)
+        dest_uf = inputs["uf"].to_numpy(dtype=object)
+        customer_type = inputs["type"].to_numpy(dtype=object)
+        mva_st = inputs["mva_st"].to_numpy(dtype=float)
+        derived = inputs["internal_icms_dest"].isna().to_numpy()
+        is_internal = origin_uf == dest_uf
+        known_dest = table.rates.encode(dest_uf) >= 0
+
+        # 1. Quais cotações usam a alíquota interna do destino
+        uses_difal = ~is_internal & (customer_type == "Nao_Contribuinte")
+        uses_st = (mva_st > 0) & (customer_type == "Contribuinte")
+        uses_internal = is_internal | (derived & (uses_difal | uses_st))
+
+        # 2. ICMS padrão: venda interna e UF fora da tabela
+        uses_padrao = is_internal | (uses_internal & ~known_dest)
+
+        def link(key, ids):
+            if len(ids):
+                self._dependencies.setdefault(key, []).append(ids)
+
+        link(("federal",), quote_ids)
+        link(("padrao",), quote_ids[uses_padrao])
+        dependent = pd.Series(quote_ids[uses_internal])
+        for uf, ids in dependent.groupby(dest_uf[uses_internal]):
+            link(("internal", uf), ids.to_numpy())
+
+    def add(self, catalog, tax_table: TaxTableVersion = None, validate: bool = True) -> np.ndarray:
+        """Precifica e guarda o catálogo (tabela vigente hoje, se omitida). Retorna os quote_ids."""
+        frame = catalog if isinstance(catalog, pd.DataFrame) else pd.DataFrame(catalog)
+        table = self._table(tax_table or self.history.at())
+
+        # 1. Normaliza as entradas (padrões explícitos para o índice e a reprecificação)
+        inputs = pd.DataFrame(index=frame.index)
+        for column in self.INPUT_COLUMNS:
+            if column in frame.columns:
+                inputs[column] = frame[column].to_numpy()
+            else:
+                inputs[column] = BatchProductPricer.PRODUCT_DEFAULTS.get(column, np.nan)
+        inputs["ipi_rate"], inputs["mva_st"] = BatchProductPricer.resolve_ncm_rates(frame)
+        quote_ids = np.arange(len(self.inputs), len(self.inputs) + len(frame))
+        inputs.index = quote_ids
+
+        # 2. Validação uma vez na entrada; reprecificações usam dados já validados
+        if validate:
+            ProductInput.validate_columns(frame, required=("cost_price",))
+            CustomerContext.validate_columns(frame)
+            PricingScenario.validate_columns(frame, required=())
+        priced = self._price(inputs, table)
+
+        # 3. Guarda entradas, resultados, versão e dependências
+        self.inputs = pd.concat([self.inputs, inputs]) if len(self.inputs) else inputs
+        self.results = pd.concat([self.results, priced]) if len(self.results) else priced
+        self.table_versions = pd.concat([self.table_versions, pd.Series(table.version, index=quote_ids)])
+        self._index(quote_ids, inputs, table)
+        return quote_ids
+
+    def dependents(self, keys) -> np.ndarray:
+        """quote_ids que dependem de alguma das chaves de alíquota."""
+        arrays = [ids for key in keys for ids in self._dependencies.get(key, [])]
+        if not arrays:
+            return np.array([], dtype=int)
+        return np.unique(np.concatenate(arrays))
+
+    def affected(self, new_table: TaxTableVersion) -> np.ndarray:
+        """quote_ids cujo preço pode mudar ao passar para `new_table`."""
+        affected = []
+        for version, ids in self.table_versions.groupby(self.table_versions, sort=False):
+            keys = self._table(version).changed_rate_keys(new_table)
+            affected.append(np.intersect1d(self.dependents(keys), ids.index.to_numpy()))
+        if not affected:
+            return np.array([], dtype=int)
+        return np.unique(np.concatenate(affected))
+
+    def reprice(self, new_table: TaxTableVersion) -> pd.DataFrame:
+        """
+        Atualiza o livro para `new_table` refazendo só as cotações afetadas.
+        Retorna os preços que mudaram (quote_id, UFs, preço anterior e novo).
+        """
+        new_table = self._table(new_table)
+        affected = self.affected(new_table)
+        METRICS.increment("quote_book.repriced", len(affected))
+
+        moved = pd.DataFrame(columns=["quote_id", "origin_uf", "uf", "type", "old_table", "new_table",
+                                      "old_price", "new_price", "delta", "delta_pct"])
+        if len(affected):
+            priced = self._price(self.inputs.loc[affected], new_table)
+            old_price = self.results.loc[affected, "selling_price_suggested"].to_numpy()
+            new_price = priced["selling_price_suggested"].to_numpy()
+            changed = ~((old_price == new_price) | (np.isnan(old_price) & np.isnan(new_price)))
+
+            ids = affected[changed]
+            moved = pd.DataFrame({
+                "quote_id": ids,
+                "origin_uf": self.inputs.loc[ids, "origin_uf"].to_numpy(),
+                "uf": self.inputs.loc[ids, "uf"].to_numpy(),
+                "type": self.inputs.loc[ids, "type"].to_numpy(),
+                "old_table": self.table_versions.loc[ids].to_numpy(),
+                "new_table": new_table.version,
+                "old_price": old_price[changed],
+                "new_price": new_price[changed],
+            })
+            moved["delta"] = (moved["new_price"] - moved["old_price"]).round(2)
+            moved["delta_pct"] = (moved["delta"] / moved["old_price"] * 100).round(2)
+            self.results.loc[affected, priced.columns] = priced.to_numpy()
+
+        # Cotações não afetadas dão o mesmo resultado na nova versão
+        self.table_versions[:] = new_table.version
+        return moved
+
+    def reproduce(self, quote_ids=None, version=None) -> pd.DataFrame:
+        """Refaz as cotações com qualquer versão da tabela (padrão: a versão guardada de cada uma)."""
+        ids = self.inputs.index.to_numpy() if quote_ids is None else np.asarray(quote_ids)
+        if version is not None:
+            return self._price(self.inputs.loc[ids], self._table(version))
+        parts = [
+            self._price(self.inputs.loc[group.index], self._table(group_version))
+            for group_version, group in self.table_versions.loc[ids].groupby(self.table_versions.loc[ids], sort=False)
+        ]
+        return pd.concat(parts).loc[ids]
@@ -0,0 +1,19 @@
+# src/rounding.py
+import numpy as np
+
+
+def round_array(values, ndigits: int = 2) -> np.ndarray:
+    """
+    Arredondamento vetorizado idêntico ao round() do Python.
+    np.round multiplica por 10**n antes de arredondar e pode errar o centavo em
+    valores próximos de ...,5; esses casos (raros) são refeitos com round().
+    """
+    values = np.asarray(values, dtype=float)
+    rounded = np.round(values, ndigits)
+
+    scaled = values * 10.0 ** ndigits
+    near_tie = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) < 1e-6
+    if near_tie.any():
+        positions = np.flatnonzero(near_tie)
+        rounded.flat[positions] = [round(value, ndigits) for value in values.flat[positions].tolist()]
+    return rounded
@@ -0,0 +1,103 @@
+# src/scenario_sweep.py
+"""
+Varredura de cenários (margem x comissão x custo adm x UF x tipo de cliente).
+
+Expande a grade de parâmetros de um produto e precifica todas as combinações
+com o BatchProductPricer. Grades pequenas rodam no próprio processo; grades
+grandes são divididas em blocos entre processos (ProcessPoolExecutor). Cada
+processo recebe apenas os eixos da grade e o intervalo de posições, e monta
+sua fatia localmente.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from src.models import ProductInput, PricingScenario
+from src.pricing_engine import BatchProductPricer
+from config.tax_rates import TaxConstants
+
+CUSTOMER_TYPES = ("Contribuinte", "Nao_Contribuinte")
+
+# Ordem dos eixos da grade (define a ordem das linhas no resultado)
+GRID_AXES = ("target_margin", "commission_rate", "admin_cost_rate", "uf", "type")
+
+
+def _expand_slice(product: dict, axes: dict, start: int, stop: int) -> pd.DataFrame:
+    shape = tuple(len(axes[name]) for name in GRID_AXES)
+    positions = np.unravel_index(np.arange(start, stop), shape)
+    frame = pd.DataFrame(
+        {name: np.asarray(axes[name])[pos] for name, pos in zip(GRID_AXES, positions)},
+        index=pd.RangeIndex(start, stop),
+    )
+    for field, value in product.items():
+        frame[field] = value
+    return frame
+
+
+def _price_slice(product: dict, axes: dict, start: int, stop: int) -> pd.DataFrame:
+    frame = _expand_slice(product, axes, start, stop)
+    priced = BatchProductPricer().calculate_selling_prices(frame, errors="coerce")
+    scenario_columns = [name for name in GRID_AXES if name not in priced.columns]
+    return pd.concat([frame[scenario_columns], priced], axis=1)
+
+
+class ScenarioSweep:
+    """
+    Tabela "quanto custa" de um produto para toda a grade de parâmetros.
+    Combinações acima da trava de 95% voltam com NaN nos valores.
+    """
+
+    # Abaixo deste nº de combinações, o custo de subir processos não compensa
+    PARALLEL_THRESHOLD = 200_000
+    MIN_CHUNK_SIZE = 20_000
+
+    def __init__(self, product: ProductInput,
+                 margins=(PricingScenario().target_margin,),
+                 commissions=(PricingScenario().commission_rate,),
+                 admin_rates=(PricingScenario().admin_cost_rate,),
+                 dest_ufs=None, customer_types=CUSTOMER_TYPES):
+        self.product = product
+        self.axes = {
+            "target_margin": np.asarray(margins, dtype=float),
+            "commission_rate": np.asarray(commissions, dtype=float),
+            "admin_cost_rate": np.asarray(admin_rates, dtype=float),
+            "uf": np.asarray(TaxConstants.ESTADOS if dest_ufs is None else dest_ufs, dtype=object),
+            "type": np.asarray(customer_types, dtype=object),
+        }
+
+    @property
+    def size(self) -> int:
+        return int(np.prod([len(values) for values in self.axes.values()]))
+
+    def _product_columns(self) -> dict:
+        return {
+            "name": self.product.name,
+            "ncm": self.product.ncm,
+            "cost_price": self.product.cost_price,
+            "ipi_rate": self.product.ipi_rate,
+            "mva_st": self.product.mva_st,
+            "origin_uf": self.product.origin_uf,
+        }
+
+    def expand(self) -> pd.DataFrame:
+        """Grade completa, sem precificar (uma linha por combinação)."""
+        return _expand_slice(self._product_columns(), self.axes, 0, self.size)
+
+    def run(self, max_workers: int = None, chunk_size: int = None) -> pd.DataFrame:
+        total = self.size
+        product = self._product_columns()
+        workers = max_workers or os.cpu_count() or 1
+
+        if total < self.PARALLEL_THRESHOLD or workers == 1:
+            return _price_slice(product, self.axes, 0, total)
+
+        # ~4 blocos por processo para equilibrar a carga
+        chunk_size = chunk_size or max(self.MIN_CHUNK_SIZE, -(-total // (workers * 4)))
+        bounds = [(start, min(start + chunk_size, total)) for start in range(0, total, chunk_size)]
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_price_slice, product, self.axes, start, stop) for start, stop in bounds]
+            parts = [future.result() for future in futures]
+        return pd.concat(parts)
@@ -1,5 +1,15 @@
 # src/service_engine.py
+from typing import get_args
+
+import numpy as np
+import pandas as pd
+
 from src.models import ServiceInput, PricingScenario
+from src.quote_cache import QUOTE_CACHE
+from src.quote_store import QUOTE_HISTORY
+from src.rounding import round_array
+from src.fixed_point import DEFAULT_ROUNDING, RATE_SCALE, SCALAR_DIVIDERS, check_rounding
+from src.instrumentation import METRICS, NULL_TIMER
 
 class ServicePricer:
     # Custos Operacionais Base
@@ -10,14 +20,40 @@ class ServicePricer:
     TAX_RATE_MAINTENANCE = 0.1718  # 17.18%
     TAX_RATE_RENTAL = 0.1157       # 11.57%
 
-    def __init__(self, service: ServiceInput, scenario: PricingScenario):
+    # Mesmos valores para o modo ponto fixo (centavos / pontos-base)
+    COST_HOUR_TECH_CENTS = 14150
+    COST_KM_CENTS = 150
+    TAX_BP_MAINTENANCE = 1718
+    TAX_BP_RENTAL = 1157
+
+    def __init__(self, service: ServiceInput, scenario: PricingScenario,
+                 fixed_point: bool = False, rounding: str = DEFAULT_ROUNDING):
         self.service = service
         self.scenario = scenario
+        # Modo ponto fixo: cálculo em centavos/pontos-base com arredondamento `rounding`
+        self.fixed_point = fixed_point
+        self.rounding = check_rounding(rounding)
 
-    def calculate_contract_price(self) -> dict:
+    def calculate_contract_price(self, record: bool = True) -> dict:
         """
         Calcula o preço mensal considerando escala e visitas anuais.
+        Resultados repetidos saem do QUOTE_CACHE; record=False não grava no histórico.
         """
+        models = (self.service, self.scenario)
+        if self.fixed_point:
+            result = QUOTE_CACHE.quote(f"service_cents_{self.rounding}", models, self._calculate_contract_price_cents)
+        else:
+            result = QUOTE_CACHE.quote("service", models, self._calculate_contract_price)
+        if record and QUOTE_HISTORY.enabled:
+            QUOTE_HISTORY.services.append_quote(self.service, self.scenario, result)
+        return result
+
+    def _monthly_costs(self, timer=None) -> dict:
+        """
+        Carga tributária e custos mensais (passos 1 a 6 da formação de preço).
+        Sem `timer` não registra etapas: consultas inversas não entram nos histogramas da cotação.
+        """
+        timer = timer or NULL_TIMER
         # 1. Definição da Carga Tributária
         if "Locação" in self.service.service_type:
             tax_rate = self.TAX_RATE_RENTAL
@@ -36,16 +72,23 @@ class ServicePricer:
         # Horas * Qtd Máquinas * Média de Visitas Mensais
         total_tech_hours_month = self.service.technical_hours_per_visit * self.service.ups_quantity * monthly_visits_avg
         labor_cost = total_tech_hours_month * self.COST_HOUR_TECH
+        timer.lap("labor")
         
         # 4. Custo Logístico (OpEx Logistics)
-        # Distância * Qtd Locais * Média de Visitas Mensais
-        total_km_month = self.service.distance_km_round_trip * self.service.num_locations * monthly_visits_avg
+        # Distância * Qtd Locais * Média de Visitas Mensais (ou o roteiro, que já passa por todos os locais)
+        if self.service.route_km_round_trip is not None:
+            km_per_visit = self.service.route_km_round_trip
+        else:
+            km_per_visit = self.service.distance_km_round_trip * self.service.num_locations
+        total_km_month = km_per_visit * monthly_visits_avg
         logistics_cost = total_km_month * self.COST_KM
+        timer.lap("logistics")
         
         # 5. Custo de Peças (Risco)
         parts_risk = self.service.parts_cost_estimation_monthly * self.service.ups_quantity
 
         opex_total = labor_cost + logistics_cost + parts_risk
+        timer.lap("parts")
         
         # 6. Amortização do Ativo (CapEx)
         total_capex = self.service.equipment_capex_unit * self.service.ups_quantity
@@ -57,9 +100,25 @@ class ServicePricer:
         
         elif "UPS Estoque" in self.service.service_type:
             asset_amortization = total_capex * 0.025
+        timer.lap("amortization")
 
         total_cost_base = opex_total + asset_amortization
-        
+
+        return {
+            "tax_rate": tax_rate,
+            "labor_cost": labor_cost,
+            "logistics_cost": logistics_cost,
+            "parts_risk": parts_risk,
+            "asset_amortization": asset_amortization,
+            "total_cost_base": total_cost_base,
+        }
+
+    def _calculate_contract_price(self) -> dict:
+        timer = METRICS.timer("service")
+        costs = self._monthly_costs(timer)
+        tax_rate = costs["tax_rate"]
+        total_cost_base = costs["total_cost_base"]
+
         # 7. Formação de Preço (Markup)
         total_deductions = tax_rate + self.scenario.commission_rate + self.scenario.target_margin
         
@@ -67,6 +126,7 @@ class ServicePricer:
             total_deductions = 0.90
             
         final_price_monthly = total_cost_base / (1 - total_deductions)
+        timer.lap("markup")
         
         return {
             "monthly_price": round(final_price_monthly, 2),
@@ -77,12 +137,264 @@ class ServicePricer:
                 "tax_rate_used": tax_rate
             },
             "breakdown": {
-                "Mão de Obra (Média/Mês)": round(labor_cost, 2),
-                "Logística (Média/Mês)": round(logistics_cost, 2),
-                "Risco Peças": round(parts_risk, 2),
-                "Amortização Ativos": round(asset_amortization, 2),
+                "Mão de Obra (Média/Mês)": round(costs["labor_cost"], 2),
+                "Logística (Média/Mês)": round(costs["logistics_cost"], 2),
+                "Risco Peças": round(costs["parts_risk"], 2),
+                "Amortização Ativos": round(costs["asset_amortization"], 2),
                 f"Impostos ({tax_rate*100:.2f}%)": round(final_price_monthly * tax_rate, 2),
                 "Comissões": round(final_price_monthly * self.scenario.commission_rate, 2),
                 "Lucro Líquido": round(final_price_monthly * self.scenario.target_margin, 2)
             }
-        }
\ No newline at end of file
+        }
+
+    def _calculate_contract_price_cents(self) -> dict:
+        """
+        Mesmas regras em ponto fixo: horas e km com 2 casas, custos em centavos,
+        alíquotas em pontos-base. O lucro é o resíduo, então o breakdown soma
+        exatamente a mensalidade; inteiros exatos em result["centavos"].
+        """
+        timer = METRICS.timer("service_cents")
+        service = self.service
+        divide = SCALAR_DIVIDERS[self.rounding]
+
+        # 1. Carga Tributária
+        tax_bp = self.TAX_BP_RENTAL if "Locação" in service.service_type else self.TAX_BP_MAINTENANCE
+
+        # 2. Visitas no ano (custos mensais = anual / 12)
+        visits_year = 12 if "Serviço Pontual" in service.service_type else service.visits_per_year
+
+        # 3. Mão de Obra: centésimos de hora x custo/hora em centavos
+        hours = round(service.technical_hours_per_visit * 100)
+        labor_cost = divide(hours * service.ups_quantity * visits_year * self.COST_HOUR_TECH_CENTS, 100 * 12)
+        timer.lap("labor")
+
+        # 4. Logística: centésimos de km x custo/km em centavos (roteiro, se informado, já cobre os locais)
+        if service.route_km_round_trip is not None:
+            km_per_visit = round(service.route_km_round_trip * 100)
+        else:
+            km_per_visit = round(service.distance_km_round_trip * 100) * service.num_locations
+        logistics_cost = divide(km_per_visit * visits_year * self.COST_KM_CENTS, 100 * 12)
+        timer.lap("logistics")
+
+        # 5. Peças (Risco)
+        parts_risk = round(service.parts_cost_estimation_monthly * 100) * service.ups_quantity
+        timer.lap("parts")
+
+        # 6. Amortização do Ativo
+        total_capex = round(service.equipment_capex_unit * 100) * service.ups_quantity
+        asset_amortization = 0
+        if "Compra UPS Nova" in service.service_type:
+            if service.contract_duration_months > 0:
+                asset_amortization = divide(total_capex, service.contract_duration_months)
+        elif "UPS Estoque" in service.service_type:
+            asset_amortization = divide(total_capex * 250, RATE_SCALE)  # 2,5% a.m.
+        timer.lap("amortization")
+
+        total_cost_base = labor_cost + logistics_cost + parts_risk + asset_amortization
+
+        # 7. Markup
+        commission_bp = round(self.scenario.commission_rate * RATE_SCALE)
+        total_deductions = tax_bp + commission_bp + round(self.scenario.target_margin * RATE_SCALE)
+        if total_deductions >= 9500:
+            total_deductions = 9000
+        monthly_price = divide(total_cost_base * RATE_SCALE, RATE_SCALE - total_deductions)
+        taxes = divide(monthly_price * tax_bp, RATE_SCALE)
+        commissions = divide(monthly_price * commission_bp, RATE_SCALE)
+        net_profit = monthly_price - total_cost_base - taxes - commissions
+        total_contract_value = monthly_price * service.contract_duration_months
+        timer.lap("markup")
+
+        return {
+            "monthly_price": monthly_price / 100,
+            "total_contract_value": total_contract_value / 100,
+            "inputs": {
+                "ups_qty": service.ups_quantity,
+                "visits_year": service.visits_per_year,
+                "tax_rate_used": tax_bp / RATE_SCALE
+            },
+            "breakdown": {
+                "Mão de Obra (Média/Mês)": labor_cost / 100,
+                "Logística (Média/Mês)": logistics_cost / 100,
+                "Risco Peças": parts_risk / 100,
+                "Amortização Ativos": asset_amortization / 100,
+                f"Impostos ({tax_bp / 100:.2f}%)": taxes / 100,
+                "Comissões": commissions / 100,
+                "Lucro Líquido": net_profit / 100
+            },
+            "centavos": {
+                "monthly_price": monthly_price,
+                "total_contract_value": total_contract_value,
+                "labor_cost": labor_cost,
+                "logistics_cost": logistics_cost,
+                "parts_risk": parts_risk,
+                "asset_amortization": asset_amortization,
+                "taxes": taxes,
+                "commissions": commissions,
+                "net_profit": net_profit,
+            },
+        }
+
+    # --- Precificação Inversa (solução fechada, aceita escalar ou array) ---
+
+    def calculate_margin_for_price(self, monthly_price):
+        """Margem líquida (fração) obtida cobrando a mensalidade informada."""
+        costs = self._monthly_costs()
+        prices = np.asarray(monthly_price, dtype=float)
+        margin = 1.0 - costs["tax_rate"] - self.scenario.commission_rate - costs["total_cost_base"] / prices
+        return margin.item() if margin.ndim == 0 else margin
+
+    def calculate_max_cost_for_price(self, monthly_price, target_margin: float = None):
+        """Maior custo mensal (OpEx + amortização) que ainda entrega a margem alvo."""
+        if target_margin is None:
+            target_margin = self.scenario.target_margin
+        tax_rate = self._monthly_costs()["tax_rate"]
+        prices = np.asarray(monthly_price, dtype=float)
+        max_cost = prices * (1.0 - tax_rate - self.scenario.commission_rate - np.asarray(target_margin, dtype=float))
+        return max_cost.item() if max_cost.ndim == 0 else max_cost
+
+
+class BatchServicePricer:
+    """
+    Precificação vetorizada de uma carteira de contratos (uma linha por contrato).
+    Os tipos de serviço são codificados uma única vez; o restante das regras do
+    ServicePricer roda em arrays NumPy.
+
+    Colunas aceitas: os campos de ServiceInput (service_type, technical_hours_per_visit
+    e distance_km_round_trip obrigatórios; route_km_round_trip vazio usa a distância)
+    e, opcionalmente, commission_rate e target_margin por contrato (sobrepõem o PricingScenario).
+    """
+
+    SERVICE_TYPES = get_args(ServiceInput.model_fields["service_type"].annotation)
+    SERVICE_DEFAULTS = {
+        "ups_quantity": 1,
+        "num_locations": 1,
+        "visits_per_year": 12,
+        "equipment_capex_unit": 0.0,
+        "contract_duration_months": 1,
+        "parts_cost_estimation_monthly": 0.0,
+        "route_km_round_trip": np.nan,
+    }
+    REQUIRED_COLUMNS = ("service_type", "technical_hours_per_visit", "distance_km_round_trip")
+    SCENARIO_FIELDS = ("commission_rate", "target_margin")
+    BREAKDOWN_COLUMNS = (
+        "Mão de Obra (Média/Mês)", "Logística (Média/Mês)", "Risco Peças", "Amortização Ativos",
+        "Impostos", "Comissões", "Lucro Líquido",
+    )
+
+    # Atributos por tipo de serviço (posição = código do tipo)
+    TYPE_TAX_RATE = np.array([
+        ServicePricer.TAX_RATE_RENTAL if "Locação" in t else ServicePricer.TAX_RATE_MAINTENANCE
+        for t in SERVICE_TYPES
+    ])
+    TYPE_IS_PONTUAL = np.array(["Serviço Pontual" in t for t in SERVICE_TYPES])
+    TYPE_IS_NEW_UPS = np.array(["Compra UPS Nova" in t for t in SERVICE_TYPES])
+    TYPE_IS_STOCK_UPS = np.array(["UPS Estoque" in t for t in SERVICE_TYPES])
+
+    def __init__(self, scenario: PricingScenario = None):
+        self.scenario = scenario or PricingScenario()
+
+    def _column(self, frame: pd.DataFrame, name: str, default) -> np.ndarray:
+        if name in frame.columns:
+            return frame[name].to_numpy(dtype=float)
+        return np.full(len(frame), default, dtype=float)
+
+    @staticmethod
+    def km_per_visit(distance, locations, route_km) -> np.ndarray:
+        """Km por visita: roteiro calculado (route_km) ou distância x locais onde ele é NaN."""
+        return np.where(np.isnan(route_km), distance * locations, route_km)
+
+    def encode_service_types(self, service_type) -> np.ndarray:
+        codes, uniques = pd.factorize(np.asarray(service_type, dtype=object))
+        lookup = []
+        for value in uniques:
+            if value not in self.SERVICE_TYPES:
+                raise ValueError(f"Tipo de serviço desconhecido: {value}")
+            lookup.append(self.SERVICE_TYPES.index(value))
+        return np.asarray(lookup, dtype=np.int64)[codes] if len(codes) else codes.astype(np.int64)
+
+    def calculate_contract_prices(self, portfolio, validate: bool = True) -> pd.DataFrame:
+        frame = portfolio if isinstance(portfolio, pd.DataFrame) else pd.DataFrame(portfolio)
+        for required in self.REQUIRED_COLUMNS:
+            if required not in frame.columns:
+                raise ValueError(f"Coluna obrigatória ausente: {required}")
+
+        # Validação por coluna (uma vez por lote); validate=False para dados já validados
+        if validate:
+            ServiceInput.validate_columns(frame, required=self.REQUIRED_COLUMNS)
+            PricingScenario.validate_columns(frame, required=())
+
+        type_code = self.encode_service_types(frame["service_type"].to_numpy())
+        hours = frame["technical_hours_per_visit"].to_numpy(dtype=float)
+        distance = frame["distance_km_round_trip"].to_numpy(dtype=float)
+        quantity, locations, visits_year, capex_unit, months, parts_unit, route_km = (
+            self._column(frame, name, default) for name, default in self.SERVICE_DEFAULTS.items()
+        )
+        commission_rate, target_margin = (
+            self._column(frame, field, getattr(self.scenario, field)) for field in self.SCENARIO_FIELDS
+        )
+
+        # 1. Definição da Carga Tributária
+        tax_rate = self.TYPE_TAX_RATE[type_code]
+
+        # 2. Conversão de Frequência (Anual -> Mensal Média)
+        monthly_visits_avg = np.where(self.TYPE_IS_PONTUAL[type_code], 1.0, visits_year / 12.0)
+
+        # 3. Custo de Mão de Obra (OpEx Labor)
+        total_tech_hours_month = hours * quantity * monthly_visits_avg
+        labor_cost = total_tech_hours_month * ServicePricer.COST_HOUR_TECH
+
+        # 4. Custo Logístico (OpEx Logistics)
+        km_per_visit = self.km_per_visit(distance, locations, route_km)
+        total_km_month = km_per_visit * monthly_visits_avg
+        logistics_cost = total_km_month * ServicePricer.COST_KM
+
+        # 5. Custo de Peças (Risco)
+        parts_risk = parts_unit * quantity
+
+        opex_total = labor_cost + logistics_cost + parts_risk
+
+        # 6. Amortização do Ativo (CapEx)
+        total_capex = capex_unit * quantity
+        with np.errstate(divide="ignore", invalid="ignore"):
+            new_ups_amortization = np.where(months > 0, total_capex / months, 0.0)
+        asset_amortization = np.where(
+            self.TYPE_IS_NEW_UPS[type_code], new_ups_amortization,
+            np.where(self.TYPE_IS_STOCK_UPS[type_code], total_capex * 0.025, 0.0),
+        )
+
+        total_cost_base = opex_total + asset_amortization
+
+        # 7. Formação de Preço (Markup)
+        total_deductions = tax_rate + commission_rate + target_margin
+        total_deductions = np.where(total_deductions >= 0.95, 0.90, total_deductions)
+
+        final_price_monthly = total_cost_base / (1 - total_deductions)
+
+        result = pd.DataFrame(index=frame.index)
+        result["service_type"] = frame["service_type"].to_numpy()
+        result["monthly_price"] = round_array(final_price_monthly, 2)
+        result["total_contract_value"] = round_array(final_price_monthly * months, 2)
+        result["ups_qty"] = quantity
+        result["visits_year"] = visits_year
+        result["tax_rate_used"] = tax_rate
+        breakdown = (
+            labor_cost, logistics_cost, parts_risk, asset_amortization,
+            final_price_monthly * tax_rate,
+            final_price_monthly * commission_rate,
+            final_price_monthly * target_margin,
+        )
+        for column, values in zip(self.BREAKDOWN_COLUMNS, breakdown):
+            result[column] = round_array(values, 2)
+        return result
+
+    @classmethod
+    def portfolio_totals(cls, contracts: pd.DataFrame) -> dict:
+        """Totais da carteira a partir do resultado de calculate_contract_prices."""
+        totals = {
+            "contracts": int(len(contracts)),
+            "monthly_price": round(float(contracts["monthly_price"].sum()), 2),
+            "total_contract_value": round(float(contracts["total_contract_value"].sum()), 2),
+        }
+        for column in cls.BREAKDOWN_COLUMNS:
+            totals[column] = round(float(contracts[column].sum()), 2)
+        return totals
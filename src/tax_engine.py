@@ -1,14 +1,18 @@
 # src/tax_engine.py
+import numpy as np
+
 from src.models import ProductInput, CustomerContext
 from config.tax_rates import TaxConstants
+from src.fixed_point import DEFAULT_ROUNDING, RATE_SCALE, SCALAR_DIVIDERS, apply_rate, div_round, to_bp
 
 class TaxEngine:
     @staticmethod
-    def calculate_taxes(product: ProductInput, customer: CustomerContext, base_price: float):
+    def calculate_taxes(product: ProductInput, customer: CustomerContext, base_price: float, tax_table=None):
+        table = tax_table or TaxConstants.CURRENT_TABLE
         taxes = {}
         
         # 1. PIS/COFINS
-        taxes['pis_cofins'] = base_price * (TaxConstants.PIS_RATE + TaxConstants.COFINS_RATE)
+        taxes['pis_cofins'] = base_price * table.pis_cofins_rate
         
         # 2. IPI
         ipi_value = base_price * product.ipi_rate
@@ -17,9 +21,9 @@ class TaxEngine:
 
         # 3. ICMS Próprio (Origem)
         if product.origin_uf == customer.uf:
-            icms_rate = TaxConstants.ICMS_PADRAO
+            icms_rate = table.icms_padrao
         else:
-            icms_rate = TaxConstants.get_interstate_rate(product.origin_uf, customer.uf)
+            icms_rate = table.rates.interstate_rate(product.origin_uf, customer.uf)
             
         taxes['icms_own'] = base_price * icms_rate
         
@@ -41,4 +45,160 @@ class TaxEngine:
             st_value = icms_st_total - taxes['icms_own']
             taxes['icms_st'] = max(0, st_value)
 
-        return taxes
\ No newline at end of file
+        return taxes
+
+    @staticmethod
+    def effective_tax_rates(product: ProductInput, customer: CustomerContext, tax_table=None) -> dict:
+        """
+        Impostos por R$ 1,00 de preço base (mesmas regras de calculate_taxes).
+        Todos são lineares no preço, o que permite resolver o markup de forma fechada.
+        """
+        table = tax_table or TaxConstants.CURRENT_TABLE
+        rates = {'pis_cofins': table.pis_cofins_rate, 'ipi': product.ipi_rate}
+
+        if product.origin_uf == customer.uf:
+            icms_rate = table.icms_padrao
+        else:
+            icms_rate = table.rates.interstate_rate(product.origin_uf, customer.uf)
+        rates['icms_own'] = icms_rate
+
+        rates['difal'] = 0.0
+        if customer.type == "Nao_Contribuinte" and product.origin_uf != customer.uf:
+            rates['difal'] = max(0, customer.internal_icms_dest - icms_rate)
+
+        rates['icms_st'] = 0.0
+        if product.mva_st > 0 and customer.type == "Contribuinte":
+            st_rate = (1 + product.ipi_rate) * (1 + product.mva_st) * customer.internal_icms_dest - icms_rate
+            rates['icms_st'] = max(0, st_rate)
+
+        return rates
+
+    @staticmethod
+    def calculate_taxes_batch(base_price, ipi_rate, mva_st, origin_uf, dest_uf, customer_type, internal_icms_dest,
+                              tax_table=None) -> dict:
+        """
+        Versão vetorizada de calculate_taxes (arrays NumPy, uma linha por item).
+        Mesmas regras e mesma ordem de operações da versão escalar.
+        """
+        base_price = np.asarray(base_price, dtype=float)
+        ipi_rate = np.asarray(ipi_rate, dtype=float)
+        mva_st = np.asarray(mva_st, dtype=float)
+        internal_icms_dest = np.asarray(internal_icms_dest, dtype=float)
+        origin_uf = np.asarray(origin_uf, dtype=object)
+        dest_uf = np.asarray(dest_uf, dtype=object)
+        customer_type = np.asarray(customer_type, dtype=object)
+        table = tax_table or TaxConstants.CURRENT_TABLE
+
+        is_internal = origin_uf == dest_uf
+        is_contribuinte = customer_type == "Contribuinte"
+        is_nao_contribuinte = customer_type == "Nao_Contribuinte"
+
+        taxes = {}
+
+        # 1. PIS/COFINS
+        taxes['pis_cofins'] = base_price * table.pis_cofins_rate
+
+        # 2. IPI
+        ipi_value = base_price * ipi_rate
+        taxes['ipi'] = ipi_value
+        price_with_ipi = base_price + ipi_value
+
+        # 3. ICMS Próprio (Origem)
+        icms_rate = np.where(is_internal, table.icms_padrao, table.rates.interstate_rates(origin_uf, dest_uf))
+        taxes['icms_own'] = base_price * icms_rate
+
+        # 4. DIFAL (Apenas venda interestadual para Não Contribuinte)
+        difal_rate = np.maximum(0, internal_icms_dest - icms_rate)
+        taxes['difal'] = np.where(is_nao_contribuinte & ~is_internal, base_price * difal_rate, 0.0)
+
+        # 5. ICMS-ST (Apenas Contribuinte com MVA)
+        base_st = price_with_ipi * (1 + mva_st)
+        icms_st_total = base_st * internal_icms_dest
+        st_value = icms_st_total - taxes['icms_own']
+        taxes['icms_st'] = np.where((mva_st > 0) & is_contribuinte, np.maximum(0, st_value), 0.0)
+
+        return taxes
+
+    # --- Modo ponto fixo (centavos e pontos-base, ver src/fixed_point.py) ---
+
+    @staticmethod
+    def calculate_taxes_cents(product: ProductInput, customer: CustomerContext, base_price_cents: int,
+                              tax_table=None, rounding: str = DEFAULT_ROUNDING) -> dict:
+        """
+        calculate_taxes em ponto fixo: preço em centavos, alíquotas em pontos-base
+        e cada imposto arredondado para centavos pela política `rounding`.
+        """
+        table = tax_table or TaxConstants.CURRENT_TABLE
+        divide = SCALAR_DIVIDERS[rounding]
+        internal_dest_bp = round(customer.internal_icms_dest * RATE_SCALE)
+        taxes = {}
+
+        # 1. PIS/COFINS
+        taxes['pis_cofins'] = divide(base_price_cents * table.pis_cofins_bp, RATE_SCALE)
+
+        # 2. IPI
+        ipi_value = divide(base_price_cents * round(product.ipi_rate * RATE_SCALE), RATE_SCALE)
+        taxes['ipi'] = ipi_value
+        price_with_ipi = base_price_cents + ipi_value
+
+        # 3. ICMS Próprio (Origem)
+        if product.origin_uf == customer.uf:
+            icms_bp = table.icms_padrao_bp
+        else:
+            icms_bp = table.rates.interstate_bp(product.origin_uf, customer.uf)
+        icms_own = divide(base_price_cents * icms_bp, RATE_SCALE)
+        taxes['icms_own'] = icms_own
+
+        # 4. DIFAL (Apenas venda interestadual para Não Contribuinte)
+        taxes['difal'] = 0
+        if customer.type == "Nao_Contribuinte" and product.origin_uf != customer.uf:
+            taxes['difal'] = divide(base_price_cents * max(0, internal_dest_bp - icms_bp), RATE_SCALE)
+
+        # 5. ICMS-ST (Apenas Contribuinte com MVA): base ST arredondada para centavos
+        taxes['icms_st'] = 0
+        mva_bp = round(product.mva_st * RATE_SCALE)
+        if mva_bp > 0 and customer.type == "Contribuinte":
+            base_st = divide(price_with_ipi * (RATE_SCALE + mva_bp), RATE_SCALE)
+            icms_st_total = divide(base_st * internal_dest_bp, RATE_SCALE)
+            taxes['icms_st'] = max(0, icms_st_total - icms_own)
+
+        return taxes
+
+    @staticmethod
+    def calculate_taxes_batch_cents(base_price_cents, ipi_bp, mva_bp, origin_uf, dest_uf, customer_type,
+                                    internal_dest_bp, tax_table=None, rounding: str = DEFAULT_ROUNDING) -> dict:
+        """Versão vetorizada (int64) de calculate_taxes_cents; alíquotas já em pontos-base."""
+        base_price_cents = np.asarray(base_price_cents, dtype=np.int64)
+        ipi_bp = np.asarray(ipi_bp, dtype=np.int64)
+        mva_bp = np.asarray(mva_bp, dtype=np.int64)
+        internal_dest_bp = np.asarray(internal_dest_bp, dtype=np.int64)
+        origin_uf = np.asarray(origin_uf, dtype=object)
+        dest_uf = np.asarray(dest_uf, dtype=object)
+        customer_type = np.asarray(customer_type, dtype=object)
+        table = tax_table or TaxConstants.CURRENT_TABLE
+
+        is_internal = origin_uf == dest_uf
+        taxes = {}
+
+        # 1. PIS/COFINS
+        taxes['pis_cofins'] = apply_rate(base_price_cents, table.pis_cofins_bp, rounding)
+
+        # 2. IPI
+        taxes['ipi'] = apply_rate(base_price_cents, ipi_bp, rounding)
+        price_with_ipi = base_price_cents + taxes['ipi']
+
+        # 3. ICMS Próprio (Origem)
+        icms_bp = np.where(is_internal, table.icms_padrao_bp,
+                           to_bp(table.rates.interstate_rates(origin_uf, dest_uf)))
+        taxes['icms_own'] = apply_rate(base_price_cents, icms_bp, rounding)
+
+        # 4. DIFAL (Apenas venda interestadual para Não Contribuinte)
+        difal = apply_rate(base_price_cents, np.maximum(0, internal_dest_bp - icms_bp), rounding)
+        taxes['difal'] = np.where((customer_type == "Nao_Contribuinte") & ~is_internal, difal, 0)
+
+        # 5. ICMS-ST (Apenas Contribuinte com MVA)
+        base_st = div_round(price_with_ipi * (RATE_SCALE + mva_bp), RATE_SCALE, rounding)
+        st_value = apply_rate(base_st, internal_dest_bp, rounding) - taxes['icms_own']
+        taxes['icms_st'] = np.where((mva_bp > 0) & (customer_type == "Contribuinte"), np.maximum(0, st_value), 0)
+
+        return taxes
@@ -0,0 +1,37 @@
+# tests/conftest.py
+import random
+
+import pytest
+
+from config.tax_rates import TaxConstants
+
+
+@pytest.fixture(scope="session")
+def catalog_rows() -> list:
+    """Todas as rotas origem x destino, nos dois tipos de cliente, com IPI/MVA variados."""
+    rng = random.Random(1)
+    rows = []
+    for origin in TaxConstants.ESTADOS:
+        for dest in TaxConstants.ESTADOS:
+            for customer_type in ("Contribuinte", "Nao_Contribuinte"):
+                rows.append(dict(
+                    name="Nobreak", ncm="8504.40.40",
+                    cost_price=round(rng.uniform(10, 5000), 2),
+                    ipi_rate=rng.choice([0.0, 0.0975, 0.15]),
+                    mva_st=rng.choice([0.0, 0.46, 0.58]),
+                    origin_uf=origin, uf=dest, type=customer_type,
+                    internal_icms_dest=TaxConstants.ICMS_INTERNO_ESTADOS[dest],
+                ))
+    return rows
+
+
+def scalar_inputs(row: dict) -> tuple:
+    """(ProductInput, CustomerContext) equivalentes a uma linha de catálogo."""
+    from src.models import ProductInput, CustomerContext
+
+    product = ProductInput(name=row["name"], ncm=row["ncm"], cost_price=row["cost_price"],
+                           ipi_rate=row.get("ipi_rate"), mva_st=row.get("mva_st"),
+                           origin_uf=row.get("origin_uf", "SP"))
+    context = CustomerContext(uf=row["uf"], type=row["type"],
+                              internal_icms_dest=row.get("internal_icms_dest", 0.18))
+    return product, context
@@ -0,0 +1,57 @@
+# tests/test_batch_pricing.py
+"""
+BatchProductPricer x ProductPricer: cada linha do lote deve bater exatamente
+com a cotação escalar da mesma entrada.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.models import PricingScenario
+from src.pricing_engine import ProductPricer, BatchProductPricer
+from tests.conftest import scalar_inputs
+
+SCENARIO = PricingScenario(target_margin=0.2)
+
+
+def test_batch_matches_scalar(catalog_rows):
+    priced = BatchProductPricer(SCENARIO).calculate_selling_prices(pd.DataFrame(catalog_rows))
+
+    for i, row in enumerate(catalog_rows):
+        result = ProductPricer(*scalar_inputs(row), SCENARIO).calculate_selling_price(record=False)
+        assert priced["selling_price_suggested"][i] == result["selling_price_suggested"]
+        assert priced["net_profit"][i] == result["financials"]["net_profit"]
+        assert priced["net_margin_pct"][i] == result["financials"]["net_margin_pct"]
+        assert priced["commission"][i] == result["financials"]["commission"]
+        assert priced["icms_st"][i] == result["taxes"]["icms_st"]
+        assert priced["difal"][i] == result["taxes"]["difal"]
+
+
+def test_batch_accepts_records():
+    rows = [dict(name="Nobreak", ncm="8504.40.40", cost_price=1000.0, uf="BA", type="Contribuinte")]
+    from_records = BatchProductPricer(SCENARIO).calculate_selling_prices(rows)
+    from_frame = BatchProductPricer(SCENARIO).calculate_selling_prices(pd.DataFrame(rows))
+    pd.testing.assert_frame_equal(from_records, from_frame)
+
+
+def test_impossible_rows_raise_or_coerce():
+    # Deduções >= 95%: o escalar recusa; o lote recusa ou, com errors="coerce", devolve NaN na linha
+    scenario = PricingScenario(target_margin=0.8)
+    rows = pd.DataFrame([
+        dict(name="Placa", ncm="8504.40.40", cost_price=100.0, uf="BA", type="Contribuinte", target_margin=0.8),
+        dict(name="Placa", ncm="8504.40.40", cost_price=100.0, uf="BA", type="Contribuinte", target_margin=0.2),
+    ])
+    with pytest.raises(ValueError):
+        BatchProductPricer(scenario).calculate_selling_prices(rows)
+    priced = BatchProductPricer(scenario).calculate_selling_prices(rows, errors="coerce")
+    assert np.isnan(priced["selling_price_suggested"][0])
+    assert priced["selling_price_suggested"][1] > 100.0
+
+    product, context = scalar_inputs(rows.iloc[0].to_dict())
+    with pytest.raises(ValueError):
+        ProductPricer(product, context, scenario).calculate_selling_price(record=False)
+
+
+def test_missing_required_column():
+    with pytest.raises(ValueError):
+        BatchProductPricer(SCENARIO).calculate_selling_prices(pd.DataFrame([dict(name="a", ncm="8504.40.40")]))
@@ -0,0 +1,88 @@
+# tests/test_cash_flow.py
+"""VPL, TIR por bisseção vetorizada, payback e o fluxo mês a mês dos contratos."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.cash_flow import ContractCashFlow, irr, monthly_rate, npv, payback
+from src.models import PricingScenario, ServiceInput
+from src.service_engine import ServicePricer
+
+NEW_UPS = ServiceInput(service_type="Locação (Compra UPS Nova)", ups_power="10 kVA", ups_type="Trifásico",
+                       ups_quantity=2, technical_hours_per_visit=2.0, distance_km_round_trip=60.0,
+                       visits_per_year=4, equipment_capex_unit=9000.0, contract_duration_months=36,
+                       parts_cost_estimation_monthly=20.0)
+
+
+def test_monthly_rate_and_npv():
+    assert monthly_rate(0.12) == pytest.approx(1.12 ** (1 / 12) - 1)
+    flows = np.array([[-100.0, 30.0, 40.0, 50.0], [10.0, 0.0, 0.0, 0.0]])
+    rate = 0.02
+    expected = [sum(value / (1 + rate) ** month for month, value in enumerate(row)) for row in flows]
+    np.testing.assert_allclose(npv(flows, rate), expected)
+    np.testing.assert_allclose(npv(flows, [0.0, 0.5]), [20.0, 10.0])
+
+
+def test_irr_bisection():
+    flows = np.zeros((4, 13))
+    flows[0, :2] = [-100.0, 110.0]            # 10% no primeiro mês
+    flows[1] = [-1000.0] + [100.0] * 12       # anuidade
+    flows[2, :3] = [-100.0, 0.0, 121.0]       # 10% ao mês em dois meses
+    flows[3, :3] = [100.0, 10.0, 10.0]        # sem investimento: VPL não troca de sinal
+    rates = irr(flows)
+    assert rates[0] == pytest.approx(0.10, abs=1e-9)
+    assert rates[2] == pytest.approx(0.10, abs=1e-9)
+    assert npv(flows[1], rates[1])[0] == pytest.approx(0.0, abs=1e-6)
+    assert rates[1] == pytest.approx(0.02922854, abs=1e-7)
+    assert np.isnan(rates[3])
+    # Vetorizada: o mesmo valor linha a linha
+    np.testing.assert_allclose([irr(row)[0] for row in flows[:3]], rates[:3])
+
+
+def test_payback():
+    flows = np.array([
+        [-100.0, 50.0, 50.0, 10.0],
+        [10.0, 10.0, 10.0, 10.0],
+        [-100.0, 10.0, 10.0, 10.0],
+        [-100.0, 150.0, -80.0, 40.0],
+    ])
+    np.testing.assert_array_equal(payback(flows), [2.0, 0.0, np.nan, 3.0])
+
+
+def test_schedule_spreads_visits_and_capex():
+    flows = ContractCashFlow(PricingScenario()).schedule(pd.DataFrame([NEW_UPS.model_dump()]))
+    visit_months = np.flatnonzero(flows["visit_costs"][0])
+    assert visit_months.tolist() == [3, 6, 9, 12, 15, 18, 21, 24, 27, 30, 33, 36]
+    assert flows["capex"][0, 0] == NEW_UPS.equipment_capex_unit * NEW_UPS.ups_quantity
+    assert flows["revenue"][0, 0] == 0 and (flows["revenue"][0, 1:] > 0).all()
+
+    quote = ServicePricer(NEW_UPS, PricingScenario()).calculate_contract_price(record=False)
+    # Custo médio mensal das visitas = mão de obra + logística da formação de preço
+    average_visits = flows["visit_costs"][0, 1:].mean()
+    assert average_visits == pytest.approx(quote["breakdown"]["Mão de Obra (Média/Mês)"]
+                                           + quote["breakdown"]["Logística (Média/Mês)"], abs=0.01)
+
+
+def test_evaluate_portfolio():
+    stock = NEW_UPS.model_copy(update={"service_type": "Locação (UPS Estoque)"})
+    portfolio = pd.DataFrame([NEW_UPS.model_dump(), stock.model_dump()])
+    cash_flow = ContractCashFlow(PricingScenario(), discount_rate=0.12)
+    result = cash_flow.evaluate(portfolio)
+    net = cash_flow.schedule(portfolio)["net_cash_flow"]
+
+    assert result["capex"].tolist() == [18000.0, 0.0]
+    assert result["net_cash_flow"].tolist() == np.round(net.sum(axis=1), 2).tolist()
+    assert result["npv"][0] == pytest.approx(npv(net[0], monthly_rate(0.12))[0], abs=0.01)
+    irr_monthly = (1 + result["irr_annual_pct"][0] / 100) ** (1 / 12) - 1
+    assert npv(net[0], irr_monthly)[0] == pytest.approx(0.0, abs=5.0)
+    # UPS de estoque: sem desembolso, sem TIR e payback imediato
+    assert np.isnan(result["irr_annual_pct"][1])
+    assert result["payback_months"][1] == 0.0
+    assert 1 <= result["payback_months"][0] <= result["discounted_payback_months"][0] <= 36
+
+
+def test_statement_matches_schedule():
+    table = ContractCashFlow().statement(NEW_UPS)
+    assert len(table) == NEW_UPS.contract_duration_months + 1
+    assert table["cumulative"].iloc[-1] == pytest.approx(table["net_cash_flow"].sum(), abs=0.05)
+    assert table.loc[0, "capex"] == 18000.0
@@ -0,0 +1,71 @@
+# tests/test_catalog_repricer.py
+"""Reprecificação em streaming de CSV/XLSX: blocos pequenos dão o mesmo resultado do lote único."""
+import pandas as pd
+import pytest
+
+from src.catalog_repricer import iter_csv_chunks, main, reprice_catalog
+from src.models import PricingScenario
+from src.pricing_engine import BatchProductPricer
+
+SCENARIO = PricingScenario(target_margin=0.2)
+CSV = (
+    "name;ncm;cost_price;ipi_rate;mva_st;origin_uf;uf\n"
+    "Nobreak 3 kVA;8504.40.40;1.234,57;0,15;0,58;SP;ba\n"
+    "Bateria 12V;8507.20.00;89,99;;;;\n"
+    ";;;;;;\n"
+    "Placa;8473.30.49;311,11;0;0; mg ;RJ\n"
+    "Cabo;85444200;10,50;0,05;0;SP; sp\n"
+)
+
+
+@pytest.fixture
+def supplier_csv(tmp_path):
+    path = tmp_path / "fornecedor.csv"
+    path.write_text(CSV, encoding="utf-8")
+    return path
+
+
+def test_csv_chunks_skip_blank_rows_and_convert_decimal(supplier_csv):
+    chunks = list(iter_csv_chunks(str(supplier_csv), chunk_size=2, decimal=","))
+    assert [len(chunk) for chunk in chunks] == [2, 2]
+    frame = pd.concat(chunks)
+    assert list(frame.index) == [0, 1, 2, 3]
+    assert frame["cost_price"].tolist() == ["1234.57", "89.99", "311.11", "10.50"]
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".xlsx"])
+def test_streamed_output_matches_single_batch(supplier_csv, tmp_path, suffix):
+    output = tmp_path / f"precos{suffix}"
+    rows = reprice_catalog(str(supplier_csv), str(output), SCENARIO, dest_uf="BA",
+                           customer_type="Nao_Contribuinte", chunk_size=1, decimal=",")
+    assert rows == 4
+
+    result = pd.read_csv(output, keep_default_na=False) if suffix == ".csv" else pd.read_excel(output)
+    # UF normalizada; célula vazia de destino/origem usa o padrão; IPI vazio vem da tabela por NCM
+    assert result["uf"].tolist() == ["BA", "BA", "RJ", "SP"]
+    assert result["origin_uf"].tolist() == ["SP", "SP", "MG", "SP"]
+    assert result["type"].tolist() == ["Nao_Contribuinte"] * 4
+
+    catalog = pd.DataFrame({
+        "name": ["Nobreak 3 kVA", "Bateria 12V", "Placa", "Cabo"],
+        "ncm": ["8504.40.40", "8507.20.00", "8473.30.49", "85444200"],
+        "cost_price": [1234.57, 89.99, 311.11, 10.50],
+        "ipi_rate": [0.15, None, 0.0, 0.05], "mva_st": [0.58, None, 0.0, 0.0],
+        "origin_uf": ["SP", "SP", "MG", "SP"], "uf": ["BA", "BA", "RJ", "SP"],
+        "type": ["Nao_Contribuinte"] * 4,
+    })
+    expected = BatchProductPricer(SCENARIO).calculate_selling_prices(catalog)
+    assert result["selling_price_suggested"].tolist() == expected["selling_price_suggested"].tolist()
+    assert result["net_profit"].tolist() == expected["net_profit"].tolist()
+
+
+def test_main_reports_missing_file(tmp_path, capsys):
+    assert main([str(tmp_path / "nao_existe.csv"), str(tmp_path / "saida.csv")]) == 1
+    assert "Arquivo não encontrado" in capsys.readouterr().err
+
+
+def test_main_writes_output(supplier_csv, tmp_path, capsys):
+    output = tmp_path / "saida.csv"
+    assert main([str(supplier_csv), str(output), "--uf", "BA", "--decimal", ","]) == 0
+    assert "4 linhas precificadas" in capsys.readouterr().out
+    assert len(pd.read_csv(output)) == 4
@@ -0,0 +1,83 @@
+# tests/test_contract_risk.py
+"""Simulação de risco: reprodutibilidade, caso determinístico e médias iguais à estimativa pontual."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.contract_risk import ContractRiskSimulator
+from src.models import PricingScenario, RiskAssumptions, ServiceInput
+from src.service_engine import BatchServicePricer, ServicePricer
+
+SCENARIO = PricingScenario(target_margin=0.3)
+CONTRACT = dict(service_type="Contrato Manutenção (Preventiva + Corretiva)", ups_power="10 kVA",
+                ups_type="Trifásico", ups_quantity=4, technical_hours_per_visit=2.0, distance_km_round_trip=60.0,
+                visits_per_year=6, contract_duration_months=24, parts_cost_estimation_monthly=40.0)
+
+
+def _portfolio(size: int = 40) -> pd.DataFrame:
+    rng = np.random.default_rng(5)
+    return pd.DataFrame({
+        **{name: [value] * size for name, value in CONTRACT.items()},
+        "service_type": rng.choice(BatchServicePricer.SERVICE_TYPES, size),
+        "ups_quantity": rng.integers(1, 8, size),
+        "visits_per_year": rng.integers(1, 13, size),
+        "equipment_capex_unit": rng.uniform(0, 5000, size),
+    })
+
+
+def test_same_seed_same_result():
+    portfolio = _portfolio()
+    first = ContractRiskSimulator(SCENARIO, simulations=500, seed=7).run(portfolio, max_workers=1)
+    second = ContractRiskSimulator(SCENARIO, simulations=500, seed=7).run(portfolio, max_workers=1)
+    other = ContractRiskSimulator(SCENARIO, simulations=500, seed=8).run(portfolio, max_workers=1)
+    pd.testing.assert_frame_equal(first, second)
+    assert not first["margin_mean_pct"].equals(other["margin_mean_pct"])
+
+
+def test_process_pool_matches_single_process(monkeypatch):
+    portfolio = _portfolio()
+    simulator = ContractRiskSimulator(SCENARIO, simulations=300, seed=11)
+    monkeypatch.setattr(simulator, "BLOCK_SIZE", 8)
+    serial = simulator.run(portfolio, max_workers=1)
+    monkeypatch.setattr(simulator, "PARALLEL_THRESHOLD", 0)
+    parallel = simulator.run(portfolio, max_workers=2)
+    pd.testing.assert_frame_equal(parallel, serial)
+
+
+def test_no_variability_reproduces_point_estimate():
+    assumptions = RiskAssumptions(parts_cv=0, hours_cv=0, visits_dispersion=0)
+    service = ServiceInput(**{**CONTRACT, "service_type": "Serviço Pontual (Avulso)", "contract_duration_months": 1})
+    row = ContractRiskSimulator(SCENARIO, assumptions, simulations=200, seed=1).simulate_contract(service)
+
+    quote = ServicePricer(service, SCENARIO).calculate_contract_price(record=False)
+    assert row["monthly_price"] == quote["monthly_price"]
+    assert row["margin_p05_pct"] == row["margin_p50_pct"] == row["margin_p95_pct"] == row["margin_mean_pct"]
+    assert row["margin_mean_pct"] == pytest.approx(30.0, abs=0.01)
+    assert row["loss_probability"] == 0.0
+
+
+def test_simulated_means_match_point_estimate():
+    simulator = ContractRiskSimulator(SCENARIO, simulations=40_000, seed=3)
+    row = simulator.simulate_contract(ServiceInput(**CONTRACT))
+    quote = ServicePricer(ServiceInput(**CONTRACT), SCENARIO).calculate_contract_price(record=False)
+    point_cost = sum(list(quote["breakdown"].values())[:4])
+
+    assert row["expected_cost_monthly"] == pytest.approx(point_cost, rel=0.01)
+    assert row["margin_mean_pct"] == pytest.approx(row["target_margin_pct"], abs=0.5)
+    assert row["margin_p05_pct"] < row["margin_p50_pct"] < row["margin_p95_pct"]
+    assert 0.0 <= row["loss_probability"] < 0.5
+
+
+def test_per_contract_assumptions_widen_the_spread():
+    portfolio = pd.DataFrame([{**CONTRACT, "parts_cv": 0.6, "hours_cv": 0.35, "visits_dispersion": 0.3},
+                              {**CONTRACT, "parts_cv": 2.0, "hours_cv": 1.0, "visits_dispersion": 1.0}])
+    result = ContractRiskSimulator(SCENARIO, simulations=5_000, seed=2).run(portfolio, max_workers=1)
+    spread = result["margin_p95_pct"] - result["margin_p05_pct"]
+    assert spread[1] > spread[0]
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        ContractRiskSimulator(simulations=0)
+    with pytest.raises(ValueError):
+        ContractRiskSimulator(simulations=10).run(pd.DataFrame([{**CONTRACT, "parts_cv": -1.0}]))
@@ -0,0 +1,89 @@
+# tests/test_fixed_point.py
+"""
+Modo ponto fixo: divisões inteiras por política de arredondamento e
+equivalência exata (em centavos) entre o lote e o ProductPricer.
+"""
+from decimal import Decimal, ROUND_DOWN, ROUND_HALF_EVEN, ROUND_HALF_UP
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.fixed_point import ROUNDING_MODES, check_rounding, div_round
+from src.models import PricingScenario, ServiceInput
+from src.pricing_engine import ProductPricer, BatchProductPricer
+from src.service_engine import ServicePricer
+from tests.conftest import scalar_inputs
+
+SCENARIO = PricingScenario(target_margin=0.2)
+DECIMAL_ROUNDING = {"half_even": ROUND_HALF_EVEN, "half_up": ROUND_HALF_UP, "down": ROUND_DOWN}
+
+
+@pytest.mark.parametrize("rounding", ROUNDING_MODES)
+def test_div_round_matches_decimal(rounding):
+    numerators = np.arange(-250, 251, dtype=np.int64)
+    for denominator in (2, 4, 10, 7):
+        expected = [int((Decimal(int(n)) / denominator).quantize(Decimal(1), rounding=DECIMAL_ROUNDING[rounding]))
+                    for n in numerators]
+        assert [div_round(int(n), denominator, rounding) for n in numerators] == expected
+        assert div_round(numerators, denominator, rounding).tolist() == expected
+
+
+def test_check_rounding():
+    assert check_rounding("half_up") == "half_up"
+    with pytest.raises(ValueError):
+        check_rounding("ceiling")
+
+
+@pytest.mark.parametrize("rounding", ROUNDING_MODES)
+def test_batch_cents_matches_scalar(catalog_rows, rounding):
+    priced = BatchProductPricer(SCENARIO).calculate_selling_prices_cents(pd.DataFrame(catalog_rows), rounding=rounding)
+
+    for i, row in enumerate(catalog_rows):
+        result = ProductPricer(*scalar_inputs(row), SCENARIO, fixed_point=True,
+                               rounding=rounding).calculate_selling_price(record=False)
+        centavos = result["centavos"]
+        for field in ("selling_price", "net_profit", "ipi", "icms_st", "difal"):
+            assert priced[f"{field}_cents"][i] == centavos[field], (i, field)
+        assert priced["net_margin_bp"][i] / 100 == result["financials"]["net_margin_pct"]
+
+
+def test_cents_decomposition_closes_exactly(catalog_rows):
+    for row in catalog_rows[:200]:
+        centavos = ProductPricer(*scalar_inputs(row), SCENARIO, fixed_point=True).calculate_selling_price(
+            record=False)["centavos"]
+        deductions = sum(centavos[name] for name in ("icms_own", "pis_cofins", "difal", "icms_st",
+                                                     "commission", "admin_expenses", "cost_price"))
+        assert centavos["selling_price"] - deductions == centavos["net_profit"]
+
+
+def test_blocked_rows():
+    scenario = PricingScenario(target_margin=0.8)
+    row = dict(name="Placa", ncm="8504.40.40", cost_price=100.0, uf="BA", type="Contribuinte")
+    priced = BatchProductPricer(scenario).calculate_selling_prices_cents(pd.DataFrame([row]), errors="coerce")
+    assert bool(priced["blocked"][0])
+    assert priced["selling_price_cents"][0] == 0
+    with pytest.raises(ValueError):
+        ProductPricer(*scalar_inputs(row), scenario, fixed_point=True).calculate_selling_price(record=False)
+
+
+@pytest.mark.parametrize("rounding", ROUNDING_MODES)
+def test_cost_below_half_centavo(rounding):
+    # Custo válido (> 0) que arredonda para 0 centavos: preço zero, sem divisão por zero
+    row = dict(name="Etiqueta", ncm="8504.40.40", cost_price=0.001, uf="BA", type="Contribuinte",
+               internal_icms_dest=0.205)
+    result = ProductPricer(*scalar_inputs(row), SCENARIO, fixed_point=True,
+                           rounding=rounding).calculate_selling_price(record=False)
+    priced = BatchProductPricer(SCENARIO).calculate_selling_prices_cents(pd.DataFrame([row]), rounding=rounding)
+    assert result["centavos"]["selling_price"] == priced["selling_price_cents"][0] == 0
+    assert result["financials"]["net_margin_pct"] == priced["net_margin_bp"][0] / 100 == 0.0
+
+
+def test_service_fixed_point_close_to_float():
+    service = ServiceInput(service_type="Locação (Compra UPS Nova)", ups_power="10 kVA", ups_type="Trifásico",
+                           ups_quantity=3, technical_hours_per_visit=2.25, distance_km_round_trip=87.3,
+                           visits_per_year=4, equipment_capex_unit=8999.99, contract_duration_months=36)
+    exact = ServicePricer(service, SCENARIO, fixed_point=True).calculate_contract_price(record=False)
+    approx = ServicePricer(service, SCENARIO).calculate_contract_price(record=False)
+    assert exact["monthly_price"] == pytest.approx(approx["monthly_price"], abs=0.05)
+    assert round(exact["monthly_price"] * 100) == exact["monthly_price"] * 100
@@ -0,0 +1,118 @@
+# tests/test_http_service.py
+"""
+Respostas de erro do serviço HTTP: formato inválido (422), JSON inválido (400),
+rota/método (404/405) e falha inesperada (500) sem derrubar a conexão keep-alive.
+"""
+import asyncio
+import json
+
+import pytest
+
+import src.http_service as http_service
+from src.http_service import PricingHTTPServer
+
+PRODUCT = {"name": "Nobreak", "ncm": "8504.40.40", "cost_price": 1000.0}
+CUSTOMER = {"uf": "BA", "type": "Contribuinte"}
+
+
+async def _send(reader, writer, method: str, path: str, body=b"", connection: str = "keep-alive",
+                content_length: str = None):
+    """Envia uma requisição e lê a resposta (status, cabeçalhos, corpo JSON)."""
+    if not isinstance(body, bytes):
+        body = json.dumps(body).encode("utf-8")
+    if content_length is None:
+        content_length = str(len(body))
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {content_length}\r\n"
+        f"Connection: {connection}\r\n\r\n".encode("latin-1") + body
+    )
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    payload = await reader.readexactly(int(headers["content-length"]))
+    return status, headers, json.loads(payload)
+
+
+def _exchange(*requests):
+    """Sobe o servidor numa porta livre e faz as requisições em uma única conexão."""
+    async def run():
+        server = await PricingHTTPServer(port=0).start()
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            responses = [await _send(reader, writer, *request) for request in requests]
+            writer.close()
+            return responses
+        finally:
+            await server.close()
+
+    return asyncio.run(run())
+
+
+def test_product_quote_ok():
+    [(status, _, result)] = _exchange(("POST", "/v1/product", {"product": PRODUCT, "customer": CUSTOMER}))
+    assert status == 200
+    assert result["selling_price_suggested"] > PRODUCT["cost_price"]
+
+
+@pytest.mark.parametrize("payload", [
+    {"product": PRODUCT, "customer": CUSTOMER, "scenario": "x"},
+    {"product": [1], "customer": CUSTOMER},
+    {"product": PRODUCT, "customer": "BA"},
+    {"product": {"name": "Nobreak", "ncm": "8504.40.40", "cost_price": -1}, "customer": CUSTOMER},
+])
+def test_product_shape_errors_are_422(payload):
+    [(status, _, result)] = _exchange(("POST", "/v1/product", payload))
+    assert status == 422
+    assert "error" in result
+
+
+@pytest.mark.parametrize("payload", [
+    {"items": "x"},
+    {"items": [1, 2]},
+    {"items": [{"name": "a", "ncm": "8504", "cost_price": "abc", "uf": "BA", "type": "Contribuinte"}]},
+])
+def test_batch_shape_errors_are_422(payload):
+    [(status, _, _)] = _exchange(("POST", "/v1/batch/products", payload))
+    assert status == 422
+
+
+@pytest.mark.parametrize("body", [b"{not json", b"[1, 2]", b'"texto"'])
+def test_invalid_body_is_400(body):
+    [(status, _, result)] = _exchange(("POST", "/v1/product", body))
+    assert status == 400
+    assert "error" in result
+
+
+def test_unknown_route_and_wrong_method():
+    (missing, _, _), (wrong, _, _) = _exchange(("GET", "/v1/nada"), ("GET", "/v1/product"))
+    assert missing == 404
+    assert wrong == 405
+
+
+def test_unexpected_error_is_500_and_keeps_connection(monkeypatch):
+    def broken(payload):
+        raise RuntimeError("falha inesperada")
+
+    monkeypatch.setitem(http_service.ROUTES, "/health", ("GET", broken, False))
+    (failed, headers, result), (status, _, quote) = _exchange(
+        ("GET", "/health"),
+        ("POST", "/v1/product", {"product": PRODUCT, "customer": CUSTOMER}, "close"),
+    )
+    assert failed == 500
+    assert result == {"error": "Erro interno do servidor"}
+    assert headers["connection"] == "keep-alive"
+    assert status == 200
+    assert "selling_price_suggested" in quote
+
+
+@pytest.mark.parametrize("content_length", ["-5", "abc"])
+def test_invalid_content_length_is_400(content_length):
+    [(status, headers, result)] = _exchange(("POST", "/v1/product", b"", "keep-alive", content_length))
+    assert status == 400
+    assert result == {"error": "Content-Length inválido"}
+    # Erro na leitura da requisição: o servidor não confia no restante do stream
+    assert headers["connection"] == "close"
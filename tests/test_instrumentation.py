@@ -0,0 +1,95 @@
+# tests/test_instrumentation.py
+"""Histogramas por etapa e exportação no formato texto do Prometheus."""
+import json
+
+import pandas as pd
+import pytest
+
+from src.instrumentation import METRICS, NULL_TIMER, Histogram, MetricsRegistry
+from src.models import ProductInput, CustomerContext, PricingScenario
+from src.pricing_engine import ProductPricer, BatchProductPricer
+from src.quote_cache import QUOTE_CACHE
+
+
+def test_histogram_buckets_and_quantiles():
+    histogram = Histogram(buckets=(0.001, 0.01, 0.1))
+    for seconds in (0.0005, 0.001, 0.005, 0.05, 0.5):
+        histogram.observe(seconds)
+    # Limite inclusivo: 0.001 cai no primeiro bucket
+    assert histogram.counts == [2, 1, 1, 1]
+    assert histogram.quantile(0.4) == 0.001
+    assert histogram.quantile(0.6) == 0.01
+    assert histogram.quantile(1.0) == 0.5
+    assert histogram.max == 0.5
+
+
+def test_disabled_registry_records_nothing():
+    registry = MetricsRegistry(enabled=False)
+    assert registry.timer("product") is NULL_TIMER
+    registry.timer("product").lap("markup")
+    with registry.span("export.save"):
+        pass
+    registry.increment("batch_product.rows", 10)
+    assert registry.to_dict() == {"histograms": {}, "counters": {}}
+
+
+def test_timer_laps_and_spans():
+    registry = MetricsRegistry(enabled=True)
+    timer = registry.timer("product")
+    timer.lap("deductions")
+    timer.lap("markup")
+    with registry.span("export.save"):
+        pass
+    registry.increment("batch_product.rows", 3)
+    registry.increment("batch_product.rows")
+
+    data = json.loads(registry.to_json())
+    assert sorted(data["histograms"]) == ["export.save", "product.deductions", "product.markup"]
+    assert data["histograms"]["product.markup"]["count"] == 1
+    assert data["counters"] == {"batch_product.rows": 4}
+
+    registry.reset()
+    assert registry.to_dict() == {"histograms": {}, "counters": {}}
+
+
+def test_prometheus_export():
+    registry = MetricsRegistry(enabled=True)
+    for seconds in (2e-6, 2e-6, 3e-3):
+        registry.observe("product.markup", seconds)
+    registry.increment("batch_product.rows", 7)
+    lines = registry.to_prometheus(prefix="teste").splitlines()
+
+    assert lines[:2] == ["# HELP teste_stage_seconds Latência por etapa de precificação.",
+                         "# TYPE teste_stage_seconds histogram"]
+    # Buckets cumulativos, terminando em +Inf com o total
+    assert 'teste_stage_seconds_bucket{stage="product.markup",le="1e-06"} 0' in lines
+    assert 'teste_stage_seconds_bucket{stage="product.markup",le="2.5e-06"} 2' in lines
+    assert 'teste_stage_seconds_bucket{stage="product.markup",le="0.0025"} 2' in lines
+    assert 'teste_stage_seconds_bucket{stage="product.markup",le="0.005"} 3' in lines
+    assert 'teste_stage_seconds_bucket{stage="product.markup",le="+Inf"} 3' in lines
+    assert 'teste_stage_seconds_count{stage="product.markup"} 3' in lines
+    sum_line = next(line for line in lines if line.startswith("teste_stage_seconds_sum"))
+    assert float(sum_line.split()[-1]) == pytest.approx(3.004e-3)
+    assert "# TYPE teste_events_total counter" in lines
+    assert lines[-1] == 'teste_events_total{event="batch_product.rows"} 7'
+
+
+def test_pricers_record_stages(monkeypatch):
+    monkeypatch.setattr(METRICS, "enabled", True)
+    METRICS.reset()
+    QUOTE_CACHE.clear()
+    try:
+        product = ProductInput(name="Nobreak", ncm="8504.40.40", cost_price=1000.0)
+        ProductPricer(product, CustomerContext(uf="BA", type="Contribuinte"),
+                      PricingScenario()).calculate_selling_price(record=False)
+        catalog = pd.DataFrame([dict(name="Nobreak", ncm="8504.40.40", cost_price=1000.0, uf="BA",
+                                     type="Contribuinte")] * 5)
+        BatchProductPricer().calculate_selling_prices(catalog)
+
+        stages = set(METRICS.histograms)
+        assert any(name.startswith("product.") for name in stages)
+        assert any(name.startswith("batch_product.") for name in stages)
+        assert METRICS.counters["batch_product.rows"] == 5
+    finally:
+        METRICS.reset()
+        QUOTE_CACHE.clear()
@@ -0,0 +1,82 @@
+# tests/test_inverse_pricing.py
+"""
+Ida e volta das funções de precificação inversa: preço -> margem -> preço e
+preço -> custo máximo devem reproduzir as entradas.
+"""
+from typing import get_args
+
+import numpy as np
+import pytest
+
+from config.tax_rates import TaxConstants
+from src.instrumentation import METRICS
+from src.models import ProductInput, CustomerContext, PricingScenario, ServiceInput
+from src.pricing_engine import ProductPricer
+from src.service_engine import ServicePricer
+
+SCENARIO = PricingScenario(target_margin=0.2)
+PRODUCT = ProductInput(name="Nobreak", ncm="8504.40.40", cost_price=1000.0, origin_uf="SP")
+
+
+@pytest.fixture(params=[(uf, t) for uf in ("SP", "BA", "RJ") for t in ("Contribuinte", "Nao_Contribuinte")])
+def pricer(request):
+    uf, customer_type = request.param
+    context = CustomerContext(uf=uf, type=customer_type, internal_icms_dest=TaxConstants.ICMS_INTERNO_ESTADOS[uf])
+    return ProductPricer(PRODUCT, context, SCENARIO)
+
+
+@pytest.mark.parametrize("target", [0.05, 0.2, 0.35])
+def test_price_for_margin_round_trip(pricer, target):
+    price = pricer.calculate_price_for_margin(target)
+    assert pricer.calculate_margin_for_price(price) == pytest.approx(target, abs=1e-12)
+    assert pricer.calculate_max_cost_for_price(price, target) == pytest.approx(PRODUCT.cost_price, rel=1e-12)
+
+
+def test_margin_for_quoted_price_matches_result(pricer):
+    result = pricer.calculate_selling_price(record=False)
+    margin = pricer.calculate_margin_for_price(result["selling_price_suggested"])
+    assert margin * 100 == pytest.approx(result["financials"]["net_margin_pct"], abs=0.01)
+    assert pricer.calculate_price_for_margin(margin) == pytest.approx(result["selling_price_suggested"], rel=1e-12)
+
+
+def test_inverse_accepts_arrays(pricer):
+    targets = np.array([0.1, 0.2, 0.3])
+    prices = pricer.calculate_price_for_margin(targets)
+    assert prices.shape == targets.shape
+    np.testing.assert_allclose(pricer.calculate_margin_for_price(prices), targets, atol=1e-12)
+
+
+def test_price_for_margin_rejects_impossible_margin(pricer):
+    with pytest.raises(ValueError):
+        pricer.calculate_price_for_margin(0.9)
+
+
+@pytest.mark.parametrize("service_type", get_args(ServiceInput.model_fields["service_type"].annotation))
+def test_service_inverse_round_trip(service_type):
+    service = ServiceInput(service_type=service_type, ups_power="10 kVA", ups_type="Trifásico", ups_quantity=3,
+                           technical_hours_per_visit=2.0, distance_km_round_trip=80.0, num_locations=2,
+                           visits_per_year=6, equipment_capex_unit=4000.0, contract_duration_months=24,
+                           parts_cost_estimation_monthly=35.0)
+    scenario = PricingScenario(target_margin=0.3)
+    pricer = ServicePricer(service, scenario)
+    result = pricer.calculate_contract_price(record=False)
+    price = result["monthly_price"]
+
+    # Mensalidade arredondada em centavos: a margem volta ao alvo com erro de arredondamento
+    assert pricer.calculate_margin_for_price(price) == pytest.approx(scenario.target_margin, abs=1e-4)
+    cost_base = sum(list(result["breakdown"].values())[:4])
+    assert pricer.calculate_max_cost_for_price(price) == pytest.approx(cost_base, abs=0.02)
+
+
+def test_inverse_queries_stay_out_of_quote_histograms(monkeypatch):
+    monkeypatch.setattr(METRICS, "enabled", True)
+    METRICS.reset()
+    service = ServiceInput(service_type="Locação (UPS Estoque)", ups_power="3 kVA", ups_type="Monofásico",
+                           technical_hours_per_visit=1.0, distance_km_round_trip=40.0)
+    pricer = ServicePricer(service, PricingScenario())
+    try:
+        pricer.calculate_margin_for_price(np.linspace(100.0, 500.0, 5))
+        pricer.calculate_max_cost_for_price(300.0)
+        assert METRICS.histograms == {}
+    finally:
+        METRICS.reset()
@@ -0,0 +1,90 @@
+# tests/test_invoice.py
+"""Pedido com vários itens: linhas iguais às cotações por item e totais exatos em ponto fixo."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.fixed_point import ROUNDING_MODES
+from src.invoice import InvoiceQuote
+from src.models import ProductInput, CustomerContext, PricingScenario
+from src.pricing_engine import ProductPricer
+
+SCENARIO = PricingScenario(target_margin=0.2)
+ITEMS = [
+    (ProductInput(name="Nobreak 3 kVA", ncm="8504.40.40", cost_price=1234.57, ipi_rate=0.15, mva_st=0.58), 7),
+    (ProductInput(name="Bateria 12V", ncm="8507.20.00", cost_price=89.99, ipi_rate=0.0975, mva_st=0.46), 40),
+    (ProductInput(name="Placa", ncm="8473.30.49", cost_price=311.11, ipi_rate=0.0, mva_st=0.0, origin_uf="MG"), 3),
+]
+
+
+@pytest.mark.parametrize("customer_type", ["Contribuinte", "Nao_Contribuinte"])
+@pytest.mark.parametrize("rounding", ROUNDING_MODES)
+def test_fixed_point_totals_are_exact(customer_type, rounding):
+    customer = CustomerContext(uf="BA", type=customer_type)
+    invoice = InvoiceQuote(customer, SCENARIO, fixed_point=True, rounding=rounding)
+    for product, quantity in ITEMS:
+        invoice.add_item(product, quantity)
+    result = invoice.calculate()
+
+    expected = {"products_total": 0, "ipi": 0, "icms_st": 0, "net_profit": 0}
+    for product, quantity in ITEMS:
+        centavos = ProductPricer(product, customer, SCENARIO, fixed_point=True,
+                                 rounding=rounding).calculate_selling_price(record=False)["centavos"]
+        expected["products_total"] += centavos["selling_price"] * quantity
+        for column in ("ipi", "icms_st", "net_profit"):
+            expected[column] += centavos[column] * quantity
+
+    for column, cents in expected.items():
+        assert result["centavos"][column] == cents
+        assert result["totals"][column] == cents / 100
+    assert result["centavos"]["invoice_total"] == expected["products_total"] + expected["ipi"] + expected["icms_st"]
+
+
+def test_float_lines_match_scalar_quotes():
+    customer = CustomerContext(uf="BA", type="Nao_Contribuinte")
+    invoice = InvoiceQuote(customer, SCENARIO)
+    invoice.add_items(ITEMS)
+    result = invoice.calculate()
+
+    # Mesmo pedido informado como tabela (validação por coluna)
+    table = pd.DataFrame([{**product.model_dump(), "quantity": quantity} for product, quantity in ITEMS])
+    from_table = InvoiceQuote(customer, SCENARIO)
+    from_table.add_items(table)
+    assert from_table.calculate()["totals"] == result["totals"]
+    lines = result["lines"]
+
+    for position, (product, quantity) in enumerate(ITEMS):
+        quote = ProductPricer(product, customer, SCENARIO).calculate_selling_price(record=False)
+        assert lines["unit_price"][position] == quote["selling_price_suggested"]
+        assert lines["products_total"][position] == round(quote["selling_price_suggested"] * quantity, 2)
+        assert lines["icms_st"][position] == round(quote["taxes"]["icms_st"] * quantity, 2)
+    # Totais = soma das linhas arredondadas
+    assert result["totals"]["invoice_total"] == round(float(lines["invoice_total"].sum()), 2)
+    assert result["totals"]["quantity"] == sum(quantity for _, quantity in ITEMS)
+
+
+@pytest.mark.parametrize("fixed_point", [False, True])
+def test_blocked_items_stay_out_of_totals(fixed_point):
+    customer = CustomerContext(uf="BA", type="Contribuinte")
+    scenario = PricingScenario(target_margin=0.6)
+    invoice = InvoiceQuote(customer, scenario, fixed_point=fixed_point)
+    invoice.add_item(ITEMS[0][0], 2)
+    invoice.add_item(ProductInput(name="Serviço", ncm="9999.99.99", cost_price=10.0, ipi_rate=0.0, mva_st=0.0,
+                                  origin_uf="BA"), 1)
+    with pytest.raises(ValueError):
+        invoice.calculate()
+    result = invoice.calculate(errors="coerce")
+    assert result["totals"]["blocked_items"] == 1
+    assert result["totals"]["items"] == 1
+    # Venda interna na BA passa da trava de 95%; a interestadual entra nos totais
+    assert result["totals"]["products_total"] == result["lines"]["products_total"][0]
+    assert np.isnan(result["lines"]["products_total"][1])
+
+
+def test_invalid_quantity_and_empty_invoice():
+    invoice = InvoiceQuote(CustomerContext(uf="BA", type="Contribuinte"), SCENARIO)
+    with pytest.raises(ValueError):
+        invoice.calculate()
+    for quantity in (0, 1.5):
+        with pytest.raises(ValueError):
+            invoice.add_item(ITEMS[0][0], quantity)
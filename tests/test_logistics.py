@@ -0,0 +1,103 @@
+# tests/test_logistics.py
+"""Roteirização: 2-opt, matriz de distâncias em cache e km do roteiro no ServicePricer."""
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from config.site_coordinates import SiteCoordinates
+from src.logistics import (DistanceMatrix, RoutePlanner, haversine_km, nearest_neighbour_tour, tour_length,
+                           two_opt)
+from src.models import PricingScenario, ServiceInput
+from src.service_engine import ServicePricer
+
+
+def _circle(size: int) -> np.ndarray:
+    angles = np.linspace(0, 2 * np.pi, size, endpoint=False)
+    points = np.column_stack([np.cos(angles), np.sin(angles)])
+    return np.linalg.norm(points[:, None] - points[None, :], axis=2)
+
+
+def test_haversine_known_distance():
+    # São Paulo -> Rio de Janeiro: ~361 km em linha reta
+    assert haversine_km(-23.5505, -46.6333, -22.9068, -43.1729) == pytest.approx(361, abs=2)
+    assert haversine_km(10.0, 20.0, 10.0, 20.0) == 0.0
+
+
+def test_two_opt_untangles_convex_tour():
+    # Pontos em posição convexa: o ótimo é o polígono, e 2-opt chega nele a partir de qualquer roteiro
+    distances = _circle(12)
+    optimum = tour_length(np.append(np.arange(12), 0), distances)
+    rng = np.random.default_rng(0)
+    for _ in range(10):
+        tour = np.concatenate([[0], rng.permutation(np.arange(1, 12)), [0]])
+        improved = two_opt(tour, distances)
+        assert sorted(improved[:-1]) == list(range(12))
+        assert improved[0] == improved[-1] == 0
+        assert tour_length(improved, distances) == pytest.approx(optimum)
+
+
+def test_two_opt_never_worse_than_nearest_neighbour():
+    rng = np.random.default_rng(1)
+    for _ in range(20):
+        points = rng.uniform(0, 100, (7, 2))
+        distances = np.linalg.norm(points[:, None] - points[None, :], axis=2)
+        start = nearest_neighbour_tour(distances)
+        improved = two_opt(start, distances)
+        assert tour_length(improved, distances) <= tour_length(start, distances) + 1e-9
+        best = min(tour_length(np.array((0, *order, 0)), distances)
+                   for order in itertools.permutations(range(1, 7)))
+        assert tour_length(improved, distances) >= best - 1e-9
+
+
+def test_distance_matrix_follows_table_version():
+    table = SiteCoordinates([("A", 0.0, 0.0), ("B", 0.0, 1.0)])
+    matrix = DistanceMatrix(table, road_factor=1.0)
+    first = matrix.full()
+    assert matrix.full() is first
+    table.add("C", 1.0, 0.0)
+    assert matrix.full().shape == (3, 3)
+    np.testing.assert_allclose(matrix.between(["C", "A"]), matrix.full()[np.ix_([2, 0], [2, 0])])
+
+
+def test_explicit_empty_table_is_not_replaced():
+    matrix = DistanceMatrix(SiteCoordinates())
+    assert len(matrix.coordinates) == 0
+    with pytest.raises(ValueError):
+        matrix.between(["SP"])
+
+
+def test_plan_is_canonical_and_cached():
+    planner = RoutePlanner()
+    plan = planner.plan(["RJ", "MG", "ES", "RJ", "SP"])
+    assert plan["route"][0] == plan["route"][-1] == "SP"
+    assert sorted(plan["route"][1:-1]) == ["ES", "MG", "RJ"]
+    assert plan["km_round_trip"] == pytest.approx(sum(plan["km_legs"]), abs=0.2)
+    assert planner.plan("ES;MG;RJ") == plan
+    assert planner.cache.stats()["hits"] == 1
+
+
+def test_route_km_drives_service_logistics():
+    planner = RoutePlanner()
+    service = ServiceInput(service_type="Contrato Manutenção (Preventiva + Corretiva)", ups_power="3 kVA",
+                           ups_type="Monofásico", technical_hours_per_visit=1.0, distance_km_round_trip=100.0)
+    routed = planner.apply(service, ["RJ", "MG"])
+    assert routed.num_locations == 2
+    assert routed.route_km_round_trip == planner.plan(["RJ", "MG"])["km_round_trip"]
+
+    quote = ServicePricer(routed, PricingScenario()).calculate_contract_price(record=False)
+    expected = routed.route_km_round_trip * routed.visits_per_year / 12 * ServicePricer.COST_KM
+    assert quote["breakdown"]["Logística (Média/Mês)"] == round(expected, 2)
+
+
+def test_plan_portfolio():
+    portfolio = pd.DataFrame({
+        "sites": ["RJ;MG", None, ["BA"]],
+        "base_site": [None, None, "PE"],
+        "num_locations": [1, 3, 1],
+    })
+    planned = RoutePlanner().plan_portfolio(portfolio)
+    assert planned["num_locations"].tolist() == [2, 3, 1]
+    assert np.isnan(planned["route_km_round_trip"][1])
+    assert planned["route_km_round_trip"][2] == RoutePlanner().plan(["BA"], base="PE")["km_round_trip"]
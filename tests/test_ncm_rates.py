@@ -0,0 +1,75 @@
+# tests/test_ncm_rates.py
+"""Consulta de IPI/MVA-ST por prefixo de NCM (escalar, vetorizada e nos modelos)."""
+import numpy as np
+import pandas as pd
+import pytest
+
+import config.ncm_rates as ncm_rates
+from config.ncm_rates import NcmRateTable, normalize_ncm
+from src.models import ProductInput
+from src.pricing_engine import BatchProductPricer
+
+TABLE = NcmRateTable([
+    ("85", 0.10, None),          # capítulo: só IPI
+    ("8504.40", 0.0975, 0.46),
+    ("8504.40.40", None, 0.30),  # código completo: só MVA
+    ("8507", 0.15, 0.0),
+], default_ipi=0.01, default_mva=0.02)
+
+
+@pytest.fixture
+def ncm_table(monkeypatch):
+    monkeypatch.setattr(ncm_rates, "NCM_RATES", TABLE)
+    return TABLE
+
+
+def test_normalize_and_invalid_prefix():
+    assert normalize_ncm("8504.40.40") == "85044040"
+    assert normalize_ncm(85044040) == "85044040"
+    with pytest.raises(ValueError):
+        NcmRateTable([("8", 0.1, 0.1)])
+    with pytest.raises(ValueError):
+        NcmRateTable([("850440401", 0.1, 0.1)])
+
+
+@pytest.mark.parametrize("ncm, ipi_rate, mva_st", [
+    ("8504.40.40", 0.0975, 0.30),   # IPI da posição, MVA do código completo
+    ("8504.40.10", 0.0975, 0.46),
+    ("8504.90.00", 0.10, None),     # só o capítulo define
+    ("8507.20.00", 0.15, 0.0),
+    ("9999.99.99", None, None),
+])
+def test_longest_prefix_per_field(ncm, ipi_rate, mva_st):
+    assert TABLE.lookup(ncm, "ipi_rate") == ipi_rate
+    assert TABLE.lookup(ncm, "mva_st") == mva_st
+    rates = TABLE.rates_for(ncm)
+    assert rates == {"ipi_rate": 0.01 if ipi_rate is None else ipi_rate,
+                     "mva_st": 0.02 if mva_st is None else mva_st}
+
+
+def test_lookup_many_matches_lookup():
+    ncms = ["8504.40.40", "85044010", "8504.90.00", "8507.20.00", "9999.99.99", "85", "8504.40.40"]
+    for field in NcmRateTable.RATE_FIELDS:
+        expected = [np.nan if (rate := TABLE.lookup(ncm, field)) is None else rate for ncm in ncms]
+        np.testing.assert_array_equal(TABLE.lookup_many(ncms, field), expected)
+
+
+def test_csv_round_trip(tmp_path):
+    path = tmp_path / "tipi.csv"
+    path.write_text("ncm;ipi_rate;mva_st\n85;0,10;\n8504.40;0,0975;0,46\n85044040;;0,30\n8507;0,15;0\n",
+                    encoding="utf-8")
+    loaded = NcmRateTable.from_csv(str(path))
+    pd.testing.assert_frame_equal(loaded.to_frame(), TABLE.to_frame())
+
+
+def test_models_and_batch_use_active_table(ncm_table):
+    product = ProductInput(name="Nobreak", ncm="8504.40.40", cost_price=100.0)
+    assert (product.ipi_rate, product.mva_st) == (0.0975, 0.30)
+    # Valor informado prevalece sobre a tabela
+    assert ProductInput(name="Nobreak", ncm="8504.40.40", cost_price=100.0, ipi_rate=0.0).ipi_rate == 0.0
+
+    catalog = pd.DataFrame({"ncm": ["8504.40.40", "8504.90.00", "0000"], "ipi_rate": [np.nan, 0.2, np.nan]})
+    ipi_rate, mva_st = BatchProductPricer.resolve_ncm_rates(catalog)
+    np.testing.assert_array_equal(ipi_rate, [0.0975, 0.2, BatchProductPricer.PRODUCT_DEFAULTS["ipi_rate"]])
+    np.testing.assert_array_equal(mva_st, [0.30, BatchProductPricer.PRODUCT_DEFAULTS["mva_st"],
+                                           BatchProductPricer.PRODUCT_DEFAULTS["mva_st"]])
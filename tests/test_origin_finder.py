@@ -0,0 +1,64 @@
+# tests/test_origin_finder.py
+"""Ranking das UFs de origem por destino e tipo de cliente."""
+import numpy as np
+import pytest
+
+from config.tax_rates import TaxConstants
+from src.models import ProductInput, CustomerContext, PricingScenario
+from src.origin_finder import OriginFinder
+from src.pricing_engine import ProductPricer
+
+PRODUCT = ProductInput(name="Nobreak", ncm="8504.40.40", cost_price=1000.0)
+SCENARIO = PricingScenario(target_margin=0.2)
+ORIGINS = ("SP", "BA", "PR")
+
+
+def _customer_total(origin, dest, customer_type):
+    product = PRODUCT.model_copy(update={"origin_uf": origin})
+    context = CustomerContext(uf=dest, type=customer_type, internal_icms_dest=TaxConstants.ICMS_INTERNO_ESTADOS[dest])
+    result = ProductPricer(product, context, SCENARIO).calculate_selling_price(record=False)
+    return round(result["selling_price_suggested"] + result["taxes"]["ipi"] + result["taxes"]["icms_st"], 2)
+
+
+def test_evaluate_matches_product_pricer():
+    priced = OriginFinder(PRODUCT, SCENARIO).evaluate(ORIGINS, dest_ufs=("BA", "SP", "AM"))
+    assert len(priced) == 3 * 2 * len(ORIGINS)
+    for row in priced.itertuples():
+        assert row.customer_total == _customer_total(row.origin_uf, row.uf, row.type)
+
+
+def test_best_origins_rank_by_customer_total():
+    best = OriginFinder(PRODUCT, SCENARIO).best_origins(ORIGINS, dest_ufs=["BA", "RJ"])
+    assert len(best) == 4
+    for row in best.itertuples():
+        totals = {origin: _customer_total(origin, row.uf, row.type) for origin in ORIGINS}
+        ranked = sorted(ORIGINS, key=lambda origin: (totals[origin], ORIGINS.index(origin)))
+        assert row.origin_uf == ranked[0]
+        assert row.runner_up_origin == ranked[1]
+        assert row.advantage == round(totals[ranked[1]] - totals[ranked[0]], 2)
+        assert row.advantage >= 0
+
+
+def test_rank_by_net_profit_prefers_highest():
+    priced = OriginFinder(PRODUCT, SCENARIO).evaluate(ORIGINS, dest_ufs=["BA"], rank_by="net_profit")
+    for _, group in priced.groupby("type"):
+        assert group.loc[group["rank"] == 1, "net_profit"].iloc[0] == group["net_profit"].max()
+
+
+def test_dest_ufs_selection():
+    finder = OriginFinder(PRODUCT, SCENARIO)
+    assert set(finder.best_origins(["SP"])["uf"]) == set(TaxConstants.ESTADOS)
+    assert finder.best_origins(["SP"], dest_ufs=np.array(["BA", "SP"]))["uf"].tolist() == ["BA", "BA", "SP", "SP"]
+    with pytest.raises(ValueError):
+        finder.best_origins(["SP"], dest_ufs=[])
+
+
+def test_single_origin_and_invalid_arguments():
+    finder = OriginFinder(PRODUCT, SCENARIO)
+    best = finder.best_origins(["SP", "SP"], dest_ufs=["BA"])
+    assert best["origin_uf"].tolist() == ["SP", "SP"]
+    assert best["runner_up_origin"].isna().all() and best["advantage"].isna().all()
+    with pytest.raises(ValueError):
+        finder.evaluate([], dest_ufs=["BA"])
+    with pytest.raises(ValueError):
+        finder.evaluate(["SP"], rank_by="margem")
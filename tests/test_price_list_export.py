@@ -0,0 +1,81 @@
+# tests/test_price_list_export.py
+"""Tabela de preços em XLSX: uma aba por UF, valores iguais aos do BatchProductPricer."""
+import numpy as np
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+from config.tax_rates import TaxConstants
+from src.models import PricingScenario
+from src.price_list_export import PriceListExporter, export_price_list, main
+from src.pricing_engine import BatchProductPricer
+
+SCENARIO = PricingScenario(target_margin=0.2)
+CATALOG = pd.DataFrame({
+    "name": ["Nobreak 3 kVA", "Bateria 12V", "Placa", None],
+    "ncm": ["8504.40.40", "8507.20.00", "8473.30.49", "8504.40.40"],
+    "cost_price": [1234.57, 89.99, 311.11, 50.0],
+    "origin_uf": ["SP", "SP", " mg", None],
+})
+
+
+def _sheet(path, title) -> list:
+    workbook = load_workbook(path, read_only=True)
+    try:
+        return [list(row) for row in workbook[title].iter_rows(values_only=True)]
+    finally:
+        workbook.close()
+
+
+def test_sheets_and_values_match_batch_pricer(tmp_path):
+    path = tmp_path / "tabela.xlsx"
+    rows = export_price_list(CATALOG, path, SCENARIO, dest_ufs=["BA", "SP"], chunk_size=3)
+    assert rows == 2 * len(CATALOG)
+    assert load_workbook(path, read_only=True).sheetnames == ["BA", "SP"]
+
+    header, *lines = _sheet(path, "BA")
+    assert header == PriceListExporter(SCENARIO, dest_ufs=["BA"]).header()
+    assert [line[0] for line in lines] == ["Nobreak 3 kVA", "Bateria 12V", "Placa", None]
+    assert [line[2] for line in lines] == ["SP", "SP", "MG", "SP"]
+
+    for position, customer_type in enumerate(("Contribuinte", "Nao_Contribuinte")):
+        frame = CATALOG.assign(origin_uf=["SP", "SP", "MG", "SP"], uf="BA", type=customer_type)
+        priced = BatchProductPricer(SCENARIO).calculate_selling_prices(frame)
+        total = priced["selling_price_suggested"] + priced["ipi"] + priced["icms_st"]
+        first = 6 + position * 4
+        assert [line[first] for line in lines] == priced["selling_price_suggested"].tolist()
+        assert [line[first + 3] for line in lines] == np.round(total, 2).tolist()
+
+
+def test_blocked_combinations_are_blank(tmp_path):
+    path = tmp_path / "tabela.xlsx"
+    catalog = CATALOG.assign(target_margin=[0.2, 0.9, 0.2, 0.2])
+    export_price_list(catalog, path, SCENARIO, dest_ufs=["BA"], customer_types=["Contribuinte"])
+    _, *lines = _sheet(path, "BA")
+    # Células em branco no fim da linha não voltam na leitura
+    assert all(value is None for value in lines[1][6:])
+    assert len(lines[0][6:]) == 4 and all(value is not None for value in lines[0][6:])
+
+
+def test_dest_ufs_selection():
+    assert PriceListExporter(SCENARIO).dest_ufs == list(TaxConstants.ESTADOS)
+    assert PriceListExporter(SCENARIO, dest_ufs=np.array(["BA", "SP"])).dest_ufs == ["BA", "SP"]
+    with pytest.raises(ValueError):
+        PriceListExporter(SCENARIO, dest_ufs=[])
+    with pytest.raises(ValueError):
+        PriceListExporter(SCENARIO, customer_types=())
+
+
+def test_invalid_catalog():
+    with pytest.raises(ValueError):
+        PriceListExporter(SCENARIO, dest_ufs=["BA"]).prepare(CATALOG.assign(cost_price=[1.0, -1.0, 1.0, 1.0]))
+
+
+def test_cli(tmp_path, capsys):
+    source = tmp_path / "catalogo.csv"
+    CATALOG.to_csv(source, index=False)
+    output = tmp_path / "tabela.xlsx"
+    assert main([str(source), str(output), "--ufs", "BA", "RJ", "--tipos", "Contribuinte"]) == 0
+    assert "8 linhas de preço" in capsys.readouterr().out
+    assert main([str(source), str(output), "--ufs", "XX"]) == 1
+    assert "UF inválida: XX" in capsys.readouterr().err
@@ -0,0 +1,107 @@
+# tests/test_quote_cache.py
+"""Contadores, descarte LRU e isolamento das cópias do QuoteCache; reuso pelos precificadores."""
+from datetime import date
+
+import pytest
+
+from config.tax_rates import TaxConstants
+from src.models import ProductInput, CustomerContext, PricingScenario, ServiceInput
+from src.pricing_engine import ProductPricer
+from src.quote_cache import QUOTE_CACHE, QuoteCache
+from src.service_engine import ServicePricer
+
+
+def test_hits_and_misses():
+    cache = QuoteCache(max_size=8)
+    calls = []
+    compute = lambda: calls.append(1) or {"price": 10.0}
+
+    assert cache.get_or_compute("a", compute) == {"price": 10.0}
+    assert cache.get_or_compute("a", compute) == {"price": 10.0}
+    assert cache.get_or_compute("b", compute) == {"price": 10.0}
+
+    assert len(calls) == 2
+    assert cache.stats() == {"size": 2, "max_size": 8, "hits": 1, "misses": 2, "hit_rate": 0.3333}
+
+
+def test_lru_eviction():
+    cache = QuoteCache(max_size=2)
+    cache.get_or_compute("a", lambda: 1)
+    cache.get_or_compute("b", lambda: 2)
+    cache.get_or_compute("a", lambda: 1)   # "a" passa a ser o mais recente
+    cache.get_or_compute("c", lambda: 3)   # descarta "b"
+
+    assert cache.stats()["size"] == 2
+    assert cache.get_or_compute("a", lambda: -1) == 1
+    assert cache.get_or_compute("b", lambda: -2) == -2
+
+
+def test_returns_isolated_copies():
+    cache = QuoteCache()
+    first = cache.get_or_compute("a", lambda: {"taxes": {"ipi": 1.0}})
+    first["taxes"]["ipi"] = 99.0
+    second = cache.get_or_compute("a", lambda: None)
+    second["taxes"]["ipi"] = 42.0
+    assert cache.get_or_compute("a", lambda: None) == {"taxes": {"ipi": 1.0}}
+
+
+def test_errors_are_not_cached():
+    cache = QuoteCache()
+
+    def fail():
+        raise ValueError("Impossível precificar")
+
+    with pytest.raises(ValueError):
+        cache.get_or_compute("a", fail)
+    assert cache.get_or_compute("a", lambda: 1) == 1
+    assert cache.stats()["misses"] == 2
+
+
+def test_disabled_cache_always_computes():
+    cache = QuoteCache()
+    cache.enabled = False
+    cache.get_or_compute("a", lambda: 1)
+    assert cache.get_or_compute("a", lambda: 2) == 2
+    assert cache.stats()["size"] == 0
+
+
+def test_make_key_depends_on_inputs_and_tax_table():
+    product = ProductInput(name="Nobreak", ncm="8504.40.40", cost_price=1000.0)
+    context = CustomerContext(uf="BA", type="Contribuinte")
+    key = QuoteCache.make_key("product", product, context, PricingScenario())
+
+    assert key == QuoteCache.make_key("product", product, context, PricingScenario())
+    assert key != QuoteCache.make_key("product", product, context, PricingScenario(target_margin=0.3))
+    assert key != QuoteCache.make_key("product", product, context, PricingScenario(), tax_table_version="2000.01")
+
+
+@pytest.fixture
+def shared_cache():
+    QUOTE_CACHE.clear()
+    yield QUOTE_CACHE
+    QUOTE_CACHE.clear()
+
+
+def test_product_pricer_reuses_cached_quote(shared_cache):
+    product = ProductInput(name="Nobreak", ncm="8504.40.40", cost_price=1000.0)
+    context = CustomerContext(uf="BA", type="Contribuinte")
+    first = ProductPricer(product, context, PricingScenario()).calculate_selling_price(record=False)
+    first["financials"]["net_profit"] = -1.0
+    second = ProductPricer(product, context, PricingScenario()).calculate_selling_price(record=False)
+
+    assert shared_cache.stats()["hits"] == 1
+    assert second["financials"]["net_profit"] > 0
+    # Modo ponto fixo e outra tabela fiscal não reaproveitam a cotação em float
+    ProductPricer(product, context, PricingScenario(), fixed_point=True).calculate_selling_price(record=False)
+    old_table = TaxConstants.CURRENT_TABLE.revise("2000.01", date(2000, 1, 1))
+    ProductPricer(product, context, PricingScenario(), tax_table=old_table).calculate_selling_price(record=False)
+    assert shared_cache.stats()["misses"] == 3
+
+
+def test_service_pricer_reuses_cached_quote(shared_cache):
+    service = ServiceInput(service_type="Locação (UPS Estoque)", ups_power="3 kVA", ups_type="Monofásico",
+                           technical_hours_per_visit=1.0, distance_km_round_trip=40.0)
+    for _ in range(3):
+        ServicePricer(service, PricingScenario()).calculate_contract_price(record=False)
+    assert shared_cache.stats()["hits"] == 2
+    assert shared_cache.stats()["misses"] == 1
@@ -0,0 +1,140 @@
+# tests/test_quote_store.py
+"""Gravação, consulta e reabertura dos históricos colunares de cotações."""
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.models import ProductInput, CustomerContext, PricingScenario, ServiceInput
+from src.pricing_engine import ProductPricer, BatchProductPricer
+from src.quote_store import ColumnarQuoteStore, ProductQuoteStore, ServiceQuoteStore
+from src.service_engine import ServicePricer
+
+SCENARIO = PricingScenario(target_margin=0.2)
+
+
+def _quote(store, uf, cost_price, target_margin, quoted_at):
+    product = ProductInput(name="Nobreak", ncm="8504.40.40", cost_price=cost_price)
+    context = CustomerContext(uf=uf, type="Contribuinte")
+    scenario = PricingScenario(target_margin=target_margin)
+    result = ProductPricer(product, context, scenario).calculate_selling_price(record=False)
+    return store.append_quote(product, context, scenario, result, "2026.01", quoted_at=quoted_at)
+
+
+@pytest.fixture
+def products(tmp_path):
+    store = ProductQuoteStore(str(tmp_path / "products"))
+    _quote(store, "BA", 1000.0, 0.20, "2026-01-10")
+    _quote(store, "SP", 500.0, 0.25, "2026-02-10")
+    _quote(store, "BA", 750.0, 0.30, "2026-03-10")
+    return store
+
+
+def test_append_and_scan(products):
+    assert len(products) == 3
+    assert list(products.scan(uf="BA")) == [0, 2]
+    assert list(products.scan(uf=["BA", "SP"])) == [0, 1, 2]
+    assert list(products.scan(uf="RJ")) == []
+    assert list(products.scan(start="2026-02-01")) == [1, 2]
+    assert list(products.scan(start="2026-02-01", end="2026-03-10")) == [1]
+    assert list(products.scan(cost_price=(600.0, None))) == [0, 2]
+    assert list(products.scan(uf="BA", cost_price=(None, 900.0))) == [2]
+    with pytest.raises(KeyError):
+        products.scan(unknown=(0, 1))
+
+
+def test_margin_filter_uses_realized_margin(products):
+    realized = products.to_pandas()["net_margin_pct"].to_numpy() / 100
+    np.testing.assert_allclose(products.realized_margin(), realized)
+    low, high = realized[1] - 0.001, realized[1] + 0.001
+    assert list(products.scan(margin=(low, high))) == [1]
+    assert list(products.scan(margin=(None, None))) == [0, 1, 2]
+
+
+def test_reopen_after_flush(products, tmp_path):
+    products.flush()
+    reopened = ProductQuoteStore(str(tmp_path / "products"))
+    assert len(reopened) == 3
+    pd.testing.assert_frame_equal(reopened.to_pandas(), products.to_pandas())
+
+    # Novas linhas após reabrir reaproveitam os dicionários gravados
+    _quote(reopened, "BA", 200.0, 0.2, "2026-04-10")
+    assert list(reopened.scan(uf="BA")) == [0, 2, 3]
+    assert reopened.dictionaries["uf"].values == ["BA", "SP"]
+
+
+def test_unflushed_rows_are_not_published(products, tmp_path):
+    products.flush()
+    _quote(products, "SP", 300.0, 0.2, "2026-05-10")
+    assert len(ProductQuoteStore(str(tmp_path / "products"))) == 3
+
+
+def test_append_batch_matches_scalar_record(tmp_path):
+    store = ProductQuoteStore(str(tmp_path / "products"))
+    # Alíquota interna explícita: sem ela o lote usa a da tabela e o escalar o padrão do modelo
+    catalog = pd.DataFrame([dict(name="Nobreak", ncm="8504.40.40", cost_price=1000.0, uf="BA", type="Contribuinte",
+                                 internal_icms_dest=0.205)])
+    priced = BatchProductPricer(SCENARIO).calculate_selling_prices(catalog)
+    store.append_batch(catalog, priced, SCENARIO, "2026.01")
+    product = ProductInput(name="Nobreak", ncm="8504.40.40", cost_price=1000.0)
+    context = CustomerContext(uf="BA", type="Contribuinte", internal_icms_dest=0.205)
+    result = ProductPricer(product, context, SCENARIO).calculate_selling_price(record=False)
+    store.append_quote(product, context, SCENARIO, result, "2026.01")
+
+    frame = store.to_pandas().drop(columns="quoted_at")
+    batch, scalar = frame.iloc[0], frame.iloc[1]
+    pd.testing.assert_series_equal(batch, scalar, check_names=False)
+
+
+def test_migration_adds_new_columns(tmp_path):
+    directory = tmp_path / "services"
+    store = ServiceQuoteStore(str(directory))
+    service = ServiceInput(service_type="Locação (UPS Estoque)", ups_power="3 kVA", ups_type="Monofásico",
+                           technical_hours_per_visit=1.0, distance_km_round_trip=40.0)
+    result = ServicePricer(service, SCENARIO).calculate_contract_price(record=False)
+    store.append_quote(service, SCENARIO, result)
+    store.flush()
+
+    # Simula um histórico gravado antes da coluna route_km_round_trip existir
+    meta_path = directory / "meta.json"
+    meta = json.loads(meta_path.read_text(encoding="utf-8"))
+    meta["schema"] = [entry for entry in meta["schema"] if entry[0] != "route_km_round_trip"]
+    meta_path.write_text(json.dumps(meta), encoding="utf-8")
+    (directory / "route_km_round_trip.bin").unlink()
+
+    reopened = ServiceQuoteStore(str(directory))
+    assert len(reopened) == 1
+    assert np.isnan(reopened.column("route_km_round_trip")[0])
+    assert reopened.column("monthly_price")[0] == result["monthly_price"]
+
+
+def test_changed_schema_is_rejected(tmp_path):
+    directory = tmp_path / "services"
+    ServiceQuoteStore(str(directory)).flush()
+    meta_path = directory / "meta.json"
+    meta = json.loads(meta_path.read_text(encoding="utf-8"))
+    meta["schema"] = [[name, "<i8" if name == "monthly_price" else descr] for name, descr in meta["schema"]]
+    meta_path.write_text(json.dumps(meta), encoding="utf-8")
+    with pytest.raises(ValueError):
+        ServiceQuoteStore(str(directory))
+
+
+def test_base_store_is_abstract(tmp_path):
+    with pytest.raises(TypeError):
+        ColumnarQuoteStore(str(tmp_path / "base"))
+
+
+def test_service_store_route_km_and_margin(tmp_path):
+    store = ServiceQuoteStore(str(tmp_path / "services"))
+    for route_km, margin in ((None, 0.2), (150.0, 0.35)):
+        service = ServiceInput(service_type="Contrato Manutenção (Preventiva + Corretiva)", ups_power="3 kVA",
+                               ups_type="Monofásico", technical_hours_per_visit=1.0, distance_km_round_trip=40.0,
+                               num_locations=3, route_km_round_trip=route_km)
+        scenario = PricingScenario(target_margin=margin)
+        store.append_quote(service, scenario, ServicePricer(service, scenario).calculate_contract_price(record=False))
+
+    route_km = store.column("route_km_round_trip")
+    assert np.isnan(route_km[0]) and route_km[1] == 150.0
+    np.testing.assert_allclose(store.realized_margin(), [0.2, 0.35], atol=1e-4)
+    assert list(store.scan(margin=(0.3, None))) == [1]
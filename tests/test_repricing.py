@@ -0,0 +1,99 @@
+# tests/test_repricing.py
+"""Índice de dependências do QuoteBook: só as cotações afetadas são refeitas, com o mesmo resultado."""
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from config.tax_rates import TaxConstants, TaxTableHistory
+from src.models import PricingScenario
+from src.repricing import QuoteBook
+
+BASE = TaxConstants.CURRENT_TABLE
+
+
+@pytest.fixture
+def history():
+    return TaxTableHistory([BASE])
+
+
+@pytest.fixture
+def book(history, catalog_rows):
+    # Metade das linhas sem alíquota interna informada (resolvida pela tabela da versão)
+    catalog = pd.DataFrame(catalog_rows)
+    book = QuoteBook(PricingScenario(target_margin=0.2), history)
+    book.add(catalog.iloc[::2], BASE)
+    book.add(catalog.iloc[1::2].drop(columns="internal_icms_dest"), BASE)
+    return book
+
+
+def _quote(book, **row):
+    defaults = dict(name="Nobreak", ncm="8504.40.40", cost_price=1000.0, ipi_rate=0.0975, mva_st=0.0)
+    return int(book.add([{**defaults, **row}])[0])
+
+
+def test_dependency_index(history):
+    history.register(BASE.revise("2026.02", date(2026, 1, 2)))
+    book = QuoteBook(history=history)
+    internal = _quote(book, origin_uf="BA", uf="BA", type="Contribuinte")
+    interstate = _quote(book, origin_uf="SP", uf="BA", type="Contribuinte")
+    difal_derived = _quote(book, origin_uf="SP", uf="BA", type="Nao_Contribuinte")
+    difal_explicit = _quote(book, origin_uf="SP", uf="BA", type="Nao_Contribuinte", internal_icms_dest=0.205)
+    st_derived = _quote(book, origin_uf="SP", uf="BA", type="Contribuinte", mva_st=0.46)
+
+    assert list(book.dependents([("internal", "BA")])) == [internal, difal_derived, st_derived]
+    assert list(book.dependents([("padrao",)])) == [internal]
+    assert list(book.dependents([("federal",)])) == [internal, interstate, difal_derived, difal_explicit, st_derived]
+    assert list(book.dependents([("internal", "SP")])) == []
+
+
+def test_affected_by_rate_change(book):
+    inputs = book.inputs
+    ba_change = BASE.revise("2026.07", date(2026, 7, 1), {"BA": 0.21})
+    affected = book.affected(ba_change)
+
+    assert len(affected)
+    assert set(inputs.loc[affected, "uf"]) == {"BA"}
+    # Venda interna na BA depende sempre; interestadual só se usa a alíquota interna da tabela
+    internal_ba = inputs.index[(inputs["uf"] == "BA") & (inputs["origin_uf"] == "BA")]
+    assert set(internal_ba) <= set(affected)
+    explicit = inputs.index[(inputs["uf"] == "BA") & (inputs["origin_uf"] != "BA") & inputs["internal_icms_dest"].notna()]
+    assert not set(explicit) & set(affected)
+
+    assert len(book.affected(BASE.revise("2026.08", date(2026, 8, 1), pis_rate=0.0070))) == len(book)
+    assert len(book.affected(BASE.revise("2026.09", date(2026, 9, 1)))) == 0
+
+
+def test_incremental_reprice_matches_full_reprice(book, history):
+    before = book.results["selling_price_suggested"].copy()
+    new_table = history.register(BASE.revise("2026.07", date(2026, 7, 1), {"BA": 0.21, "SP": 0.19}))
+    moved = book.reprice(new_table)
+
+    full = book.reproduce(version="2026.07")
+    pd.testing.assert_frame_equal(book.results, full, check_dtype=False)
+    assert set(book.table_versions) == {"2026.07"}
+
+    changed = before.index[before.to_numpy() != full["selling_price_suggested"].to_numpy()]
+    assert sorted(moved["quote_id"]) == sorted(changed)
+    assert set(moved["uf"]) <= {"BA", "SP"}
+    assert (moved["new_table"] == "2026.07").all()
+    np.testing.assert_allclose(moved["delta"], (moved["new_price"] - moved["old_price"]).round(2))
+
+
+def test_reproduce_old_version(book, history):
+    original = book.results.copy()
+    book.reprice(history.register(BASE.revise("2026.07", date(2026, 7, 1), {"BA": 0.21})))
+
+    pd.testing.assert_frame_equal(book.reproduce(version=BASE.version), original, check_dtype=False)
+    ids = book.inputs.index[:10]
+    pd.testing.assert_frame_equal(book.reproduce(ids), book.results.loc[ids], check_dtype=False)
+
+
+def test_add_validates_input(history):
+    book = QuoteBook(history=history)
+    with pytest.raises(ValueError):
+        book.add([dict(name="Nobreak", ncm="8504.40.40", cost_price=-1.0, uf="BA", type="Contribuinte")])
+    with pytest.raises(ValueError):
+        book.add([dict(name="Nobreak", ncm="8504.40.40", cost_price=10.0, uf="BA", type="Outro")])
+    assert len(book) == 0
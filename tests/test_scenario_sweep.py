@@ -0,0 +1,59 @@
+# tests/test_scenario_sweep.py
+"""Grade de cenários: expansão, equivalência com o ProductPricer e caminho em processos."""
+import numpy as np
+import pandas as pd
+
+from config.tax_rates import TaxConstants
+from src.models import ProductInput, CustomerContext, PricingScenario
+from src.pricing_engine import ProductPricer
+from src.scenario_sweep import ScenarioSweep
+
+PRODUCT = ProductInput(name="Nobreak", ncm="8504.40.40", cost_price=1000.0, ipi_rate=0.15, mva_st=0.58)
+
+
+def test_expand_order_and_size():
+    sweep = ScenarioSweep(PRODUCT, margins=(0.1, 0.2), commissions=(0.03,), admin_rates=(0.1, 0.12),
+                          dest_ufs=("SP", "BA"))
+    grid = sweep.expand()
+    assert sweep.size == len(grid) == 2 * 2 * 2 * 2
+    # Último eixo (tipo de cliente) varia mais rápido
+    assert grid["type"].tolist()[:2] == ["Contribuinte", "Nao_Contribuinte"]
+    assert grid["uf"].tolist()[:4] == ["SP", "SP", "BA", "BA"]
+    assert grid["target_margin"].tolist() == [0.1] * 8 + [0.2] * 8
+    assert (grid["cost_price"] == PRODUCT.cost_price).all()
+
+
+def test_default_and_array_ufs():
+    assert ScenarioSweep(PRODUCT).axes["uf"].tolist() == list(TaxConstants.ESTADOS)
+    assert ScenarioSweep(PRODUCT, dest_ufs=np.array(["SP", "BA"])).axes["uf"].tolist() == ["SP", "BA"]
+    assert ScenarioSweep(PRODUCT, dest_ufs=[]).size == 0
+
+
+def test_run_matches_product_pricer():
+    sweep = ScenarioSweep(PRODUCT, margins=(0.15, 0.3), commissions=(0.02, 0.05), dest_ufs=("SP", "BA", "AM"))
+    result = sweep.run(max_workers=1)
+    assert len(result) == sweep.size
+
+    for row in result.itertuples():
+        context = CustomerContext(uf=row.uf, type=row.type, internal_icms_dest=TaxConstants.ICMS_INTERNO_ESTADOS[row.uf])
+        scenario = PricingScenario(target_margin=row.target_margin, commission_rate=row.commission_rate,
+                                   admin_cost_rate=row.admin_cost_rate)
+        expected = ProductPricer(PRODUCT, context, scenario).calculate_selling_price(record=False)
+        assert row.selling_price_suggested == expected["selling_price_suggested"]
+        assert row.net_profit == expected["financials"]["net_profit"]
+
+
+def test_impossible_combinations_are_nan():
+    result = ScenarioSweep(PRODUCT, margins=(0.2, 0.9), dest_ufs=("SP",)).run(max_workers=1)
+    blocked = result["target_margin"] == 0.9
+    assert result.loc[blocked, "selling_price_suggested"].isna().all()
+    assert result.loc[~blocked, "selling_price_suggested"].notna().all()
+
+
+def test_process_pool_matches_single_process(monkeypatch):
+    sweep = ScenarioSweep(PRODUCT, margins=np.linspace(0.05, 0.4, 8), commissions=(0.02, 0.03),
+                          admin_rates=(0.1, 0.1165))
+    serial = sweep.run(max_workers=1)
+    monkeypatch.setattr(sweep, "PARALLEL_THRESHOLD", 0)
+    parallel = sweep.run(max_workers=2, chunk_size=100)
+    pd.testing.assert_frame_equal(parallel, serial)
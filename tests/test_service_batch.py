@@ -0,0 +1,64 @@
+# tests/test_service_batch.py
+"""BatchServicePricer x ServicePricer: cada contrato da carteira bate com a cotação escalar."""
+import random
+
+import pandas as pd
+import pytest
+
+from src.models import PricingScenario, ServiceInput
+from src.service_engine import ServicePricer, BatchServicePricer
+
+SCENARIO = PricingScenario(target_margin=0.3)
+
+
+@pytest.fixture(scope="module")
+def portfolio() -> list:
+    rng = random.Random(3)
+    return [
+        dict(service_type=rng.choice(BatchServicePricer.SERVICE_TYPES), ups_power="3 kVA", ups_type="Monofásico",
+             ups_quantity=rng.randint(1, 10), technical_hours_per_visit=rng.choice([0.5, 1, 2.25]),
+             distance_km_round_trip=rng.uniform(0, 300), num_locations=rng.randint(1, 5),
+             visits_per_year=rng.randint(0, 24), equipment_capex_unit=rng.uniform(0, 9000),
+             contract_duration_months=rng.randint(1, 48), parts_cost_estimation_monthly=rng.uniform(0, 100))
+        for _ in range(300)
+    ]
+
+
+def test_batch_matches_scalar(portfolio):
+    priced = BatchServicePricer(SCENARIO).calculate_contract_prices(pd.DataFrame(portfolio))
+
+    for i, row in enumerate(portfolio):
+        result = ServicePricer(ServiceInput(**row), SCENARIO).calculate_contract_price(record=False)
+        assert priced["monthly_price"][i] == result["monthly_price"]
+        assert priced["total_contract_value"][i] == result["total_contract_value"]
+        breakdown = [priced[column][i] for column in BatchServicePricer.BREAKDOWN_COLUMNS]
+        assert breakdown == list(result["breakdown"].values())
+
+
+def test_per_contract_scenario_and_deduction_cap():
+    # Deduções >= 95% são limitadas a 90%, como no ServicePricer
+    rows = [dict(service_type="Contrato Manutenção (Preventiva + Corretiva)", ups_power="3 kVA",
+                 ups_type="Monofásico", technical_hours_per_visit=2.0, distance_km_round_trip=50.0,
+                 target_margin=margin) for margin in (0.3, 0.9)]
+    priced = BatchServicePricer(SCENARIO).calculate_contract_prices(pd.DataFrame(rows))
+
+    for i, row in enumerate(rows):
+        scenario = PricingScenario(target_margin=row.pop("target_margin"))
+        result = ServicePricer(ServiceInput(**row), scenario).calculate_contract_price(record=False)
+        assert priced["monthly_price"][i] == result["monthly_price"]
+
+
+def test_unknown_service_type_and_missing_column():
+    row = dict(service_type="Outro", technical_hours_per_visit=1.0, distance_km_round_trip=10.0)
+    with pytest.raises(ValueError):
+        BatchServicePricer().calculate_contract_prices(pd.DataFrame([row]))
+    with pytest.raises(ValueError):
+        BatchServicePricer().calculate_contract_prices(pd.DataFrame([dict(service_type="Outro")]))
+
+
+def test_portfolio_totals(portfolio):
+    priced = BatchServicePricer(SCENARIO).calculate_contract_prices(pd.DataFrame(portfolio))
+    totals = BatchServicePricer.portfolio_totals(priced)
+    assert totals["contracts"] == len(portfolio)
+    assert totals["monthly_price"] == round(float(priced["monthly_price"].sum()), 2)
+    assert totals["Lucro Líquido"] == round(float(priced["Lucro Líquido"].sum()), 2)